@@ -1,19 +1,31 @@
 import os
-import json
-import shutil
+import sys
+import copy
+import time
+import atexit
 import threading
 import traceback
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 from flask_cors import CORS
+from werkzeug.utils import import_string, cached_property
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from models import Base, Student, Scenario
-from models import student_scenario
-
-from libs.hints import HINTS, INPUT_KIND_MAP, SKIP_NAMES, load_hints, guess_platform, guess_source, guess_manufacturer, is_mobile_camera, normalize
-from libs.obs_actions import ObsActions, ObsNotRunningError, ObsConnectionError
+from libs import metrics
+from libs.hints import HINTS, INPUT_KIND_MAP, SKIP_NAMES, load_hints, guess_platform, describe_device
+from libs.obs_actions import ObsNotRunningError, ObsConnectionError
 from libs.obs_export_import import OBSExportImport
+from libs.obs_reconciler import ObsReconciler
+from libs.obs_profiles import ObsProfileReader
+from libs.obs_connection import ObsConnectionManager
+from libs.device_inventory import DeviceInventory
+from libs.obs_probes import ObsProbes, PROBE_PREFIX
+from libs.obs_queue import ObsRequestQueue, ObsTimeoutError
+from libs.config_store import ConfigStore, serialize, atomic_write
+from libs.json_stream import FORMATS as JSON_FORMATS
+from libs.template_renderer import TemplateRenderer
+from libs.backup_store import BackupStore, BACKUP_FILES
+from libs.jobs import JobManager, JobCancelled, sse_format
+from libs.obs_fleet import ObsFleet
+from libs.obs_collections import SceneCollections
 
 app = Flask(__name__)
 CORS(app)
@@ -22,23 +34,24 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 SETTINGS_PATH = os.path.join(BASE_DIR, "__settings__", "settings.json")
 CONFIG_PATH = os.path.join(BASE_DIR, "__settings__", "config.json")
 HINTS_PATH = os.path.join(BASE_DIR, "__settings__", "hints.json")
+COLLECTIONS_PATH = os.path.join(BASE_DIR, "__settings__", "scene_collections.json")
+
+config_store = ConfigStore()
+template_renderer = TemplateRenderer(config_store)
+atexit.register(config_store.flush)
 
 def get_global_config(path):
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            cfg = json.load(f)
+        cfg = config_store.load(path)
     except Exception:
         traceback.print_exc()
         cfg = {}
 
     return cfg
 
-def write_global_config(path, cfg):
-    try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(cfg, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        traceback.print_exc()
+def write_global_config(path, cfg, delay=0):
+    # atomic replace; delay > 0 lets rapid edits of the same file collapse into one write
+    config_store.write(path, cfg, delay=delay)
 
 def get_scenario_config(path, scenario_name):
     cfg = {}
@@ -46,56 +59,94 @@ def get_scenario_config(path, scenario_name):
     scenario_path = os.path.join(path, "scenarios", scenario_name, "__settings__", "config.json")
     if os.path.exists(scenario_path):
         try:
-            with open(scenario_path, "r", encoding="utf-8") as f:
-                cfg = json.load(f)
+            cfg = config_store.load(scenario_path)
         except Exception:
             traceback.print_exc()
             cfg = {}
 
     return cfg
 
-def write_scenario_config(path, scenario_name, cfg, backup_dir=None):
-    try:
-        settings_dir = os.path.join(path, "scenarios", scenario_name, "__settings__")
-
-        filename = os.path.join(backup_dir, "config.json") if backup_dir else "config.json"
-        config_path = os.path.join(settings_dir, filename)
-
-        if backup_dir:
-            backup_path = os.path.join(settings_dir, backup_dir)
-            os.makedirs(backup_path, exist_ok=True)
-
-            for fname in ["scenario_template.json", "scenario.json"]:
-                src = os.path.join(settings_dir, fname)
-                dst = os.path.join(backup_path, fname)
-                if os.path.exists(src):
-                    shutil.copy2(src, dst)
-
-        with open(config_path, "w", encoding="utf-8") as f:
-            json.dump(cfg, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        traceback.print_exc()
+def write_scenario_config(path, scenario_name, cfg, backup_dir=None, delay=0):
+    settings_dir = os.path.join(path, "scenarios", scenario_name, "__settings__")
+
+    if backup_dir:
+        # the snapshot holds the new config next to the current template and scenario
+        store = get_backup_store(settings_dir)
+        store.add(backup_dir, store.snapshot_files({"config.json": serialize(cfg)}))
+        return
+
+    write_global_config(os.path.join(settings_dir, "config.json"), cfg, delay)
+
+backup_stores = {}
+backup_stores_lock = threading.Lock()
+
+def get_backup_store(settings_dir):
+    with backup_stores_lock:
+        store = backup_stores.get(settings_dir)
+        if store is None:
+            retention = global_cfg.get("backups", {})
+            store = BackupStore(
+                settings_dir,
+                keep_last=retention.get("keep_last", 20),
+                keep_hourly=retention.get("keep_hourly", 24),
+                keep_daily=retention.get("keep_daily", 30)
+            )
+            backup_stores[settings_dir] = store
+        return store
 
 settings = get_global_config(SETTINGS_PATH)
-db_password = os.getenv("DB_PASSWORD")
 
-DATABASE_URL = (
-    f"postgresql+psycopg2://{settings["db"]['user']}:{db_password}@"
-    f"{settings["db"]['host']}:{settings["db"]['port']}/{settings["db"]['database']}"
-)
-
-engine = create_engine(DATABASE_URL, echo=True)
-SessionLocal = sessionmaker(bind=engine)
+@app.teardown_appcontext
+def remove_db_session(exc=None):
+    # nothing to release until a database route has pulled the db module in
+    db = sys.modules.get("db")
+    if db is not None:
+        db.db_session.remove()
 
 global_cfg = get_global_config(CONFIG_PATH)
 load_hints(HINTS_PATH)
-devices_lock = threading.Lock()
+profile_reader = ObsProfileReader(settings.get("obs", {}).get("config_dir"))
+# OBS handles one operation at a time; deadlines per operation come from config.json
+obs_queue = ObsRequestQueue(global_cfg.get("obs_deadlines"), global_cfg.get("obs_deadline", 30))
+jobs = JobManager(global_cfg.get("jobs_keep", 50))
 
-def get_obs_instance():
-    return ObsActions.ensure_obs_ready(global_cfg, settings)
+obs_connection = ObsConnectionManager(global_cfg, settings)
+# classroom machines listed under "fleet" in config.json, each with its own connection
+fleet = ObsFleet(global_cfg.get("fleet_workers", 8), global_cfg.get("fleet_connect_timeout", 5))
+
+# one OBS scene collection per scenario, rebuilt only when the rendered scenario changes
+scene_collections = SceneCollections(config_store, COLLECTIONS_PATH, global_cfg.get("scene_collection_prefix", ""),
+                                     profile_reader)
 
-obs = None
-get_obs_instance()
+def sync_fleet():
+    fleet.sync(get_global_config(CONFIG_PATH).get("fleet", []))
+
+def get_obs_instance():
+    return obs_connection.get()
+
+@app.before_request
+def start_obs_warm_up():
+    # connecting happens in the background health thread, never at import time;
+    # start() is a no-op once the thread runs
+    obs_connection.start()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.http_request_seconds.observe(time.perf_counter() - started, method=request.method, route=route)
+        metrics.http_requests.inc(method=request.method, route=route, status=response.status_code)
+    return response
+
+@app.route("/api/ready", methods=["GET"])
+def get_ready():
+    status = obs_connection.status()
+    return jsonify(status), 200 if status["ready"] else 503
 
 def make_stub(name="Нет устройства", input_kind="stub"):
     return {
@@ -149,13 +200,29 @@ def update_config():
     scenario_name = data.get("scenario_name")
     backup_dir = data.get("backup_dir")
 
-    if global_cfg:
-        write_global_config(CONFIG_PATH, global_cfg)
-    if scenario_name and scenario_cfg:
-        write_scenario_config(BASE_DIR, scenario_name, scenario_cfg, backup_dir)
+    try:
+        if global_cfg:
+            write_global_config(CONFIG_PATH, global_cfg, config_store.debounce)
+        if scenario_name and scenario_cfg:
+            write_scenario_config(BASE_DIR, scenario_name, scenario_cfg, backup_dir, config_store.debounce)
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"ok": False, "message": str(e)}), 500
 
     return jsonify({"ok": True})
 
+@app.route("/api/backup/<scenario>", methods=["GET"])
+def list_backups(scenario):
+    try:
+        settings_dir = os.path.join(BASE_DIR, "scenarios", scenario, "__settings__")
+        if not os.path.isdir(settings_dir):
+            return jsonify({"status": "error", "message": "Сценарий не найден"}), 404
+
+        return jsonify({"status": "ok", "backups": get_backup_store(settings_dir).list()})
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"status": "error", "message": str(e)}), 500
+
 @app.route("/api/backup/restore/<scenario>", methods=["POST"])
 def restore_backup(scenario):
     try:
@@ -164,22 +231,21 @@ def restore_backup(scenario):
             return jsonify({"status": "error", "message": "Сценарий не найден"}), 404
 
         settings_dir = os.path.join(scenario_dir, "__settings__")
+        data = request.get_json(silent=True) or {}
+        name = data.get("name") or request.args.get("name")
 
-        backup_dirs = [d for d in os.listdir(settings_dir)
-                       if d.startswith("backup_") and os.path.isdir(os.path.join(settings_dir, d))]
-        if not backup_dirs:
-            return jsonify({"status": "error", "message": "Нет ни одной папки бэкапа"}), 404
-
-        backup_dirs.sort()
-        latest_backup = backup_dirs[-1]
-        backup_path = os.path.join(settings_dir, latest_backup)
+        snapshot, files = get_backup_store(settings_dir).read(name)
+        if snapshot is None:
+            if name:
+                return jsonify({"status": "error", "message": f"Бэкап {name} не найден"}), 404
+            return jsonify({"status": "error", "message": "Нет ни одного бэкапа"}), 404
 
         restored_files = []
-        for fname in ["config.json", "scenario_template.json", "scenario.json"]:
-            src = os.path.join(backup_path, fname)
-            dst = os.path.join(settings_dir, fname)
-            if os.path.exists(src):
-                shutil.copy2(src, dst)
+        for fname in BACKUP_FILES:
+            if fname in files:
+                dst = os.path.join(settings_dir, fname)
+                config_store.invalidate(dst)
+                atomic_write(dst, files[fname])
                 restored_files.append(fname)
 
         if not restored_files:
@@ -187,7 +253,7 @@ def restore_backup(scenario):
 
         return jsonify({
             "status": "ok",
-            "message": f"Восстановлены файлы {', '.join(restored_files)} из {latest_backup}"
+            "message": f"Восстановлены файлы {', '.join(restored_files)} из {snapshot['name']}"
         })
     except Exception as e:
         traceback.print_exc()
@@ -243,8 +309,7 @@ def get_input_kind(kind: str, platform: str) -> str:
 
 def build_device_info(kind, name, device_id, input_kind=None):
     platform = guess_platform(input_kind or get_input_kind(kind, None))
-    source = guess_source(name, device_id)
-    manufacturer = guess_manufacturer(name, device_id)
+    source, manufacturer, mobile, hints_list = describe_device(input_kind or "dshow_input", name, device_id)
     info = {
         "name": name,
         "kind": kind,
@@ -255,414 +320,580 @@ def build_device_info(kind, name, device_id, input_kind=None):
         "inputKind": input_kind or get_input_kind(kind, platform)
     }
     if kind == "camera":
-        mobile, hints_list = is_mobile_camera(input_kind or "dshow_input", name, device_id)
         info["is_mobile"] = mobile     # True/False
-        info["hints"] = hints_list     # list of successful heuristics for transparency
+        info["hints"] = list(hints_list)  # list of successful heuristics for transparency
         info["scrcpy"] = False
     return info
 
+def scan_devices():
+    obs = get_obs_instance()
+
+    with obs_queue.turn("devices", obs=obs):
+        cameras, microphones = [], []
+
+        cam_items, mic_items = device_probes.list_property_items([
+            ("dshow_input", ["video_device_id"]),
+            ("wasapi_input_capture", ["device_id", "device", "audio_device_id"])
+        ])
+
+        for dev in cam_items or []:
+            cameras.append(build_device_info("camera", dev["itemName"], dev["itemValue"], "dshow_input"))
+        for dev in mic_items or []:
+            microphones.append(build_device_info("microphone", dev["itemName"], dev["itemValue"], "wasapi_input_capture"))
+
+        resp = obs.client.get_input_list()
+        for inp in resp.inputs:
+            if inp["inputName"].startswith(PROBE_PREFIX):
+                continue
+
+            kind, data = classify_device(inp, HINTS)
+            if kind == "camera":
+                cameras.append(build_device_info("camera", data[1], data[2], data[0]))
+            elif kind == "microphone":
+                microphones.append(build_device_info("microphone", data[1], data[2], data[0]))
+
+        return {"cameras": cameras, "microphones": microphones}
+
+device_probes = ObsProbes()
+obs_connection.add_listener(device_probes.attach)
+atexit.register(device_probes.cleanup)
+
+device_inventory = DeviceInventory(scan_devices, ttl=global_cfg.get("devices_ttl", 300))
+obs_connection.add_listener(lambda obs: device_inventory.on_obs_connected(obs_connection.cfg))
+
 @app.route("/api/devices", methods=["GET"])
 def get_devices():
+    refresh = request.args.get("refresh", "0").lower() in ("1", "true", "yes")
     try:
-        obs = get_obs_instance()
+        inventory = device_inventory.get(refresh=refresh)
+        return jsonify({"status": "ok", **inventory})
     except ObsNotRunningError:
         return jsonify({"status": "error", "message": "OBS не запущен."}), 500
     except ObsConnectionError as e:
         return jsonify({"status": "error", "message": f"Ошибка подключения: {e}"}), 500
+    except ObsTimeoutError as e:
+        return obs_timeout(e)
+    except Exception as e:
+        traceback.print_exc()
+        obs_connection.report_error(e)
+        return jsonify({"status": "error", "message": str(e)}), 500
 
-    with devices_lock:
+@app.errorhandler(ObsTimeoutError)
+def obs_timeout(e):
+    if e.started:
+        obs_connection.mark_failed(e)
+    return jsonify({"status": "error", "message": str(e)}), 504
+
+@app.route("/api/obs/status", methods=["GET"])
+def get_obs_status():
+    return jsonify({"connection": obs_connection.status(), "queue": obs_queue.status()})
+
+def collect_metrics():
+    state = obs_connection.state
+    for name in ("disconnected", "connecting", "connected", "failed"):
+        metrics.obs_connection_state.set(int(state == name), state=name)
+
+    queue = obs_queue.status()
+    metrics.obs_queue_waiting.set(len(queue["waiting"]))
+    metrics.obs_queue_active.replace([(1, {"operation": queue["active"]})] if queue["active"] else [])
+
+    counts = {}
+    for job in jobs.list():
+        counts[(job["kind"], job["state"])] = counts.get((job["kind"], job["state"]), 0) + 1
+    metrics.jobs_by_state.replace([
+        (count, {"kind": kind, "state": state}) for (kind, state), count in counts.items()
+    ])
+
+    metrics.fleet_host_ready.replace([(int(host["ready"]), {"host": host["name"]}) for host in fleet.status()])
+
+    for stat, value in template_renderer.status().items():
+        metrics.template_cache.set(value, stat=stat)
+
+    # pool numbers only once a database route has loaded the db module
+    db = sys.modules.get("db")
+    if db is not None:
+        for stat, value in db.pool_stats().items():
+            metrics.db_pool.set(value, stat=stat)
+
+metrics.registry.add_collector(collect_metrics)
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    return Response(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
+
+def template_variables(template, config_data):
+    # ${output_width}, ${base_height}, ... come from the template's own profile;
+    # ${boundsWidth}/${boundsHeight} from camera_settings, where a later camera wins
+    # (the Math template sizes its second camera with them), and any setting can be
+    # addressed by index as ${camera_settings.1.boundsWidth}
+    camera_settings = config_data.get("camera_settings", [])
+    variables = {"boundsWidth": 320, "boundsHeight": 240}
+    for cam in camera_settings:
+        variables.update(cam or {})
+
+    profile_settings = template.get("profile", {}).get("settings", {})
+    variables.update(profile_settings.get("audio", {}))
+    variables.update(profile_settings.get("video", {}))
+    variables["camera_settings"] = camera_settings
+    return variables
+
+def build_export_data(scenario_name, scenario_dir, use_template):
+    config_path = os.path.join(scenario_dir, "__settings__", "config.json")
+    config_data = get_global_config(config_path)
+
+    if scenario_name == "Math":
+        cameras = config_data.get("cameras", [])
+    else:
+        cameras = []
+        cameras.append(config_data.get("camera", {}))
+    microphone = config_data.get("microphone", {})
+
+    scenario_path = os.path.join(scenario_dir, "__settings__", "scenario.json")
+
+    if use_template:
+        scenario_template_path = os.path.join(scenario_dir, "__settings__", "scenario_template.json")
+        template = template_renderer.compile(scenario_template_path)
+        scenario_data = template_renderer.render(template, template_variables(template.document, config_data))
+    else:
+        scenario_data = get_global_config(scenario_path)
+
+    inputs = scenario_data.get("inputs", [])
+
+    for idx, cam in enumerate(cameras):
+        if not cam.get("is_stub", False):
+            found = next((i for i in inputs if i["inputName"] == "DefaultCamera"), None)
+            if found:
+                found["inputKind"] = cam.get("inputKind", found.get("inputKind"))
+                found["inputSettings"] = {"video_device_id": cam.get("device_id", "unknown")}
+            else:
+                inputs.append({
+                    "inputName": "DefaultCamera",
+                    "inputKind": cam.get("inputKind", "dshow_input"),
+                    "inputSettings": {"video_device_id": cam.get("device_id", "unknown")}
+                })
+
+    if microphone:
+        found = next((i for i in inputs if i["inputName"] == "DefaultMicrophone"), None)
+        if found:
+            found["inputKind"] = microphone.get("inputKind", found.get("inputKind"))
+            found["inputSettings"] = {"device_id": microphone.get("device_id", "unknown")}
+        else:
+            inputs.append({
+                "inputName": "DefaultMicrophone",
+                "inputKind": microphone.get("inputKind", "wasapi_input_capture"),
+                "inputSettings": {"device_id": microphone.get("device_id", "unknown")}
+            })
+
+    scenario_data["inputs"] = inputs
+    return scenario_data, scenario_path
+
+def run_export(job, obs, scenario_name, scenario_dir, use_template, dry_run, allow_delete_scenes):
+    scenario_data, scenario_path = build_export_data(scenario_name, scenario_dir, use_template)
+    job.progress("queued")
+
+    with obs_queue.turn("export", obs=obs, check=job.check_cancelled):
+        job.start()
+        reconciler = ObsReconciler(obs, allow_delete_scenes=allow_delete_scenes, progress=job.progress,
+                                   profile_reader=profile_reader)
+        if dry_run:
+            return {"status": "ok", "dry_run": True, **reconciler.apply(scenario_data, dry_run=True)}
+
+        write_global_config(scenario_path, scenario_data)
         try:
-            cameras, microphones = [], []
-
-            temp_scene = obs.ensure_unique_scene_name("TempSceneForDevices")
-            scenes = obs.client.get_scene_list().scenes
-            if not any(s["sceneName"] == temp_scene for s in scenes):
-                obs.client.create_scene(temp_scene)
-            obs.client.set_current_program_scene(temp_scene)
-
-            cam_source = obs.ensure_unique_input_name("TempVideoCapture")
-            mic_source = obs.ensure_unique_input_name("TempAudioCapture")
-
-            obs.client.create_input(
-                sceneName=temp_scene,
-                inputName=cam_source,
-                inputKind="dshow_input",
-                inputSettings={},
-                sceneItemEnabled=True
-            )
-            obs.client.create_input(
-                sceneName=temp_scene,
-                inputName=mic_source,
-                inputKind="wasapi_input_capture",
-                inputSettings={},
-                sceneItemEnabled=True
-            )
-
-            try:
-                cam_items = obs.client.get_input_properties_list_property_items(cam_source, "video_device_id").property_items
-                for dev in cam_items:
-                    cameras.append(build_device_info("camera", dev["itemName"], dev["itemValue"], "dshow_input"))
-            except Exception:
-                traceback.print_exc()
-
+            plan = reconciler.apply(scenario_data)
+        except Exception:
+            # even a partly applied plan changed the collection
             try:
-                mic_items = get_audio_property_items(obs.client, mic_source, "wasapi_input_capture")
-                for dev in mic_items:
-                    microphones.append(build_device_info("microphone", dev["itemName"], dev["itemValue"], "wasapi_input_capture"))
+                scene_collections.modified(obs)
             except Exception:
                 traceback.print_exc()
+            raise
+        if any(plan["summary"].values()):
+            scene_collections.modified(obs)
+
+    return {"status": "ok", "message": "Сцены и источники обновлены в OBS", "summary": plan["summary"]}
+
+def run_import(job, obs, scenario_name, scenario_dir, fmt=None, chunk_size=None):
+    scenario_path = os.path.join(scenario_dir, "__settings__", "scenario.json")
+    config_path = os.path.join(scenario_dir, "__settings__", "config.json")
+    job.progress("queued")
+
+    with obs_queue.turn("import", obs=obs, check=job.check_cancelled):
+        job.start()
+        obs_export_import = OBSExportImport(obs, profile_reader, progress=job.progress)
+        # scenes go to disk chunk by chunk; the temp file replaces scenario.json only
+        # once OBS has been read completely, so a cancelled import leaves it as it was
+        header = obs_export_import.save_to_file(scenario_path, fmt, chunk_size)
+        config_store.invalidate(scenario_path)
+
+        cameras, microphones = [], []
+
+        device_inputs = [
+            inp for inp in header.get("inputs", [])
+            if inp["inputName"] in {"DefaultCamera", "DefaultCamera1", "DefaultCamera2", "DefaultMicrophone"}
+        ]
+        for done, inp in enumerate(device_inputs):
+            # scenario.json is already replaced, stopping here would leave config.json behind
+            job.progress("devices", done, len(device_inputs), checkpoint=False, input=inp["inputName"])
+            if inp["inputName"] in {"DefaultCamera", "DefaultCamera1", "DefaultCamera2"}:
+                video_id = inp["inputSettings"].get("video_device_id")
+                try:
+                    cam_items = obs.client.get_input_properties_list_property_items(inp["inputName"], "video_device_id").property_items
+                    for dev in cam_items:
+                        if dev["itemValue"] == video_id:
+                            cameras.append(build_device_info("camera", dev["itemName"], dev["itemValue"], inp["inputKind"]))
+                            break
+                except Exception:
+                    traceback.print_exc()
+
+            elif inp["inputName"] == "DefaultMicrophone":
+                mic_id = inp["inputSettings"].get("device_id")
+                try:
+                    mic_items = get_audio_property_items(obs.client, inp["inputName"], "wasapi_input_capture")
+                    for dev in mic_items:
+                        if dev["itemValue"] == mic_id:
+                            microphones.append(build_device_info("microphone", dev["itemName"], dev["itemValue"], inp["inputKind"]))
+                            break
+                except Exception:
+                    traceback.print_exc()
+
+    job.progress("save", checkpoint=False)
+    config_data = get_global_config(config_path)
+    if cameras:
+        if scenario_name == "Math":
+            config_data["cameras"].append(cameras[0])
+            config_data["cameras"].append(cameras[1])
+        else:
+            config_data["camera"] = cameras[0]
+    if microphones:
+        config_data["microphone"] = microphones[0]
+
+    write_global_config(config_path, config_data)
+
+    return {"status": "ok", "message": "Настройки импортированы из OBS"}
+
+def obs_job(fn, *args):
+    # runs in the job thread; errors are reported the same way the handlers used to
+    def run(job):
+        try:
+            return fn(job, *args)
+        except ObsTimeoutError as e:
+            if e.started:
+                obs_connection.mark_failed(e)
+            raise
+        except (JobCancelled, RuntimeError):
+            raise
+        except Exception as e:
+            obs_connection.report_error(e)
+            raise
+    return run
+
+def job_response(job, created, wait=False):
+    if wait:
+        job.wait()
+        if job.state == "done":
+            return jsonify(job.result)
+        status = 409 if job.state == "cancelled" else {"RuntimeError": 400, "ObsTimeoutError": 504}.get(job.error_type, 500)
+        return jsonify({"status": "error", "message": job.error, "job_id": job.id}), status
 
-            resp = obs.client.get_input_list()
-            for inp in resp.inputs:
-                if inp["inputName"] in {"TempVideoCapture", "TempAudioCapture"}:
-                    continue
-
-                kind, data = classify_device(inp, HINTS)
-                if kind == "camera":
-                    cameras.append(build_device_info("camera", data[1], data[2], data[0]))
-                elif kind == "microphone":
-                    microphones.append(build_device_info("microphone", data[1], data[2], data[0]))
+    return jsonify({
+        "status": "ok",
+        "job_id": job.id,
+        "state": job.state,
+        "deduplicated": not created
+    }), 202
 
-            obs.client.remove_scene(temp_scene)
+def find_scenario(data):
+    scenario_name = data.get("scenario_name")
+    if not scenario_name:
+        return None, (jsonify({"status": "error", "message": "Не указан сценарий"}), 400)
 
-            # try:
-            #     obs.client.save_project()
-            # except Exception:
-            #     traceback.print_exc()
+    scenario_dir = os.path.join(BASE_DIR, "scenarios", scenario_name)
+    if not os.path.isdir(scenario_dir):
+        return None, (jsonify({"status": "error", "message": "Сценарий не найден"}), 404)
+    return scenario_dir, None
 
-            return jsonify({"status": "ok", "cameras": cameras, "microphones": microphones})
-        except Exception as e:
-            traceback.print_exc()
-            return jsonify({"status": "error", "message": str(e)}), 500
+def submit_obs_job():
+    data = request.get_json(force=True) or {}
+    scenario_name = data.get("scenario_name")
+    scenario_dir, error = find_scenario(data)
+    if error:
+        return None, data, error
 
-@app.route("/api/export", methods=["POST"])
-def export_to_obs():
     try:
         obs = get_obs_instance()
     except ObsNotRunningError:
-        return jsonify({"status": "error", "message": "OBS не запущен."}), 500
+        return None, data, (jsonify({"status": "error", "message": "OBS не запущен."}), 500)
     except ObsConnectionError as e:
-        return jsonify({"status": "error", "message": f"Ошибка подключения: {e}"}), 500
+        return None, data, (jsonify({"status": "error", "message": f"Ошибка подключения: {e}"}), 500)
 
-    with devices_lock:
-        try:
-            data = request.get_json(force=True) or {}
-            global_cfg = data.get("global", {})
-            scenario_cfg = data.get("scenario", {})
-            scenario_name = data.get("scenario_name")
-            use_template = data.get("use_template")
-
-            if global_cfg.get("allow_delete_scenes", True):
-                obs.clear_scenes()
-                # obs.clear_profiles()
-
-            scenario_dir = os.path.join(BASE_DIR, "scenarios", scenario_name)
-            if not os.path.isdir(scenario_dir):
-                return jsonify({"status": "error", "message": "Сценарий не найден"}), 404
-
-            config_path = os.path.join(scenario_dir, "__settings__", "config.json")
-            config_data = get_global_config(config_path)
-
-            camera_settings = config_data.get("camera_settings", [])
-            if scenario_name == "Math":
-                cameras = config_data.get("cameras", [])
-            else:
-                cameras = []
-                cameras.append(config_data.get("camera", {}))
-            microphone = config_data.get("microphone", {})
-
-            scenario_path = os.path.join(scenario_dir, "__settings__", "scenario.json")
-
-            if use_template:
-                scenario_template_path = os.path.join(scenario_dir, "__settings__", "scenario_template.json")
-                scenario_template_data = get_global_config(scenario_template_path)
-
-                video_settings = scenario_template_data["profile"]["settings"]["video"]
-                out_w = video_settings["output_width"]
-                out_h = video_settings["output_height"]
-
-                for scene in scenario_template_data["scenes"]:
-                    for idx, item in enumerate(scene["items"]):
-                        if item.get("sourceName", "").startswith("DefaultCamera"):
-                            transform = item.get("transform", {})
-                            if transform.get("boundsWidth") == "${output_width}":
-                                transform["boundsWidth"] = out_w
-                            if transform.get("boundsHeight") == "${output_height}":
-                                transform["boundsHeight"] = out_h
-
-                            if scenario_name == "Math" and idx == 1:
-                                if transform.get("boundsWidth") == "${boundsWidth}":
-                                    transform["boundsWidth"] = camera_settings[idx].get("boundsWidth", 320)
-                                if transform.get("boundsHeight") == "${boundsHeight}":
-                                    transform["boundsHeight"] = camera_settings[idx].get("boundsHeight", 240)
-
-                write_global_config(scenario_path, scenario_template_data)
-
-            scenario_data = get_global_config(scenario_path)
-
-            inputs = scenario_data.get("inputs", [])
-
-            for idx, cam in enumerate(cameras):
-                if not cam.get("is_stub", False):
-                    found = next((i for i in inputs if i["inputName"] == "DefaultCamera"), None)
-                    if found:
-                        found["inputKind"] = cam.get("inputKind", found.get("inputKind"))
-                        found["inputSettings"] = {"video_device_id": cam.get("device_id", "unknown")}
-                    else:
-                        inputs.append({
-                            "inputName": "DefaultCamera",
-                            "inputKind": cam.get("inputKind", "dshow_input"),
-                            "inputSettings": {"video_device_id": cam.get("device_id", "unknown")}
-                        })
-
-            if microphone:
-                found = next((i for i in inputs if i["inputName"] == "DefaultMicrophone"), None)
-                if found:
-                    found["inputKind"] = microphone.get("inputKind", found.get("inputKind"))
-                    found["inputSettings"] = {"device_id": microphone.get("device_id", "unknown")}
-                else:
-                    inputs.append({
-                        "inputName": "DefaultMicrophone",
-                        "inputKind": microphone.get("inputKind", "wasapi_input_capture"),
-                        "inputSettings": {"device_id": microphone.get("device_id", "unknown")}
-                    })
-
-            scenario_data["inputs"] = inputs
-            write_global_config(scenario_path, scenario_data)
-
-            obs_export_import = OBSExportImport(obs)
-            obs_export_import.load_from_file(scenario_path)
-
-            return jsonify({"status": "ok", "message": "Сцены и источники обновлены в OBS"})
-        except RuntimeError as e:
-            return jsonify({"status": "error", "message": str(e)}), 400
-        except Exception as e:
-            traceback.print_exc()
-            return jsonify({"status": "error", "message": str(e)}), 500
+    return (obs, scenario_name, scenario_dir), data, None
+
+@app.route("/api/export", methods=["POST"])
+def export_to_obs():
+    target, data, error = submit_obs_job()
+    if error:
+        return error
+    obs, scenario_name, scenario_dir = target
+
+    dry_run = bool(data.get("dry_run", False))
+    allow_delete_scenes = data.get("global", {}).get("allow_delete_scenes", True)
+    # the same scenario submitted again while its export is queued or running
+    # joins the existing job
+    job, created = jobs.submit("export", f"{scenario_name}:{'dry' if dry_run else 'apply'}", obs_job(
+        run_export, obs, scenario_name, scenario_dir, data.get("use_template"), dry_run, allow_delete_scenes
+    ))
+    return job_response(job, created, data.get("wait", False))
 
 @app.route("/api/import", methods=["POST"])
 def import_from_obs():
+    target, data, error = submit_obs_job()
+    if error:
+        return error
+    obs, scenario_name, scenario_dir = target
+
+    # "format": json (default), compact or gzip; "chunk_size": scenes read from OBS per round-trip
+    fmt = data.get("format") or "json"
+    if fmt not in JSON_FORMATS:
+        return jsonify({"status": "error", "message": f"Неизвестный формат: {fmt}"}), 400
     try:
-        obs = get_obs_instance()
-    except ObsNotRunningError:
-        return jsonify({"status": "error", "message": "OBS не запущен."}), 500
-    except ObsConnectionError as e:
-        return jsonify({"status": "error", "message": f"Ошибка подключения: {e}"}), 500
+        chunk_size = int(data.get("chunk_size") or global_cfg.get("import_chunk_size", 20))
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "chunk_size должен быть числом"}), 400
+
+    job, created = jobs.submit("import", scenario_name, obs_job(
+        run_import, obs, scenario_name, scenario_dir, fmt, chunk_size
+    ))
+    return job_response(job, created, data.get("wait", False))
+
+def run_fleet_export(job, hosts, scenario_name, scenario_dir, use_template, dry_run, allow_delete_scenes):
+    scenario_data, scenario_path = build_export_data(scenario_name, scenario_dir, use_template)
+    # every host has its own queue, there is nothing to wait for here
+    job.start()
+    if not dry_run:
+        write_global_config(scenario_path, scenario_data)
+
+    def apply(obs):
+        # every host gets its own copy, the reconciler fills in scene item ids
+        reconciler = ObsReconciler(obs, allow_delete_scenes=allow_delete_scenes)
+        plan = reconciler.apply(copy.deepcopy(scenario_data), dry_run=dry_run)
+        return plan if dry_run else {"summary": plan["summary"]}
+
+    finished = []
+    def on_result(host, result):
+        finished.append(host)
+        job.progress("hosts", len(finished), len(hosts), host=host, host_status=result["status"], checkpoint=False)
+
+    job.progress("hosts", 0, len(hosts))
+    results = fleet.run(hosts, "export", apply, obs_queue.deadline_for("fleet_export"), on_result)
+
+    ok = sum(1 for result in results.values() if result["status"] == "ok")
+    return {
+        "status": "ok",
+        "dry_run": dry_run,
+        "message": f"Сценарий применён на {ok} из {len(results)} хостов",
+        "results": results
+    }
+
+@app.route("/api/fleet", methods=["GET"])
+def get_fleet_status():
+    sync_fleet()
+    return jsonify(fleet.status())
 
-    with devices_lock:
+@app.route("/api/fleet/export", methods=["POST"])
+def export_to_fleet():
+    data = request.get_json(force=True) or {}
+    scenario_name = data.get("scenario_name")
+    scenario_dir, error = find_scenario(data)
+    if error:
+        return error
+
+    sync_fleet()
+    hosts = data.get("hosts") or fleet.names()
+    if not hosts:
+        return jsonify({"status": "error", "message": "Список хостов пуст"}), 400
+
+    dry_run = bool(data.get("dry_run", False))
+    allow_delete_scenes = data.get("global", {}).get("allow_delete_scenes", True)
+    key = f"{scenario_name}:{'dry' if dry_run else 'apply'}:{','.join(sorted(hosts))}"
+    job, created = jobs.submit("fleet_export", key, lambda job: run_fleet_export(
+        job, hosts, scenario_name, scenario_dir, data.get("use_template"), dry_run, allow_delete_scenes
+    ))
+    return job_response(job, created, data.get("wait", False))
+
+def run_switch(job, obs, scenario_name, scenario_dir, use_template, force):
+    scenario_data, scenario_path = build_export_data(scenario_name, scenario_dir, use_template)
+    job.progress("queued")
+
+    with obs_queue.turn("switch", obs=obs, check=job.check_cancelled):
+        job.start()
+        write_global_config(scenario_path, scenario_data)
+        result = scene_collections.activate(obs, scenario_name, scenario_data, force=force, progress=job.progress)
+
+    message = "Коллекция сцен пересобрана и включена" if result["rebuilt"] else "Сценарий включён"
+    return {"status": "ok", "message": message, **result}
+
+@app.route("/api/switch", methods=["POST"])
+def switch_scenario():
+    target, data, error = submit_obs_job()
+    if error:
+        return error
+    obs, scenario_name, scenario_dir = target
+
+    force = bool(data.get("force", False))
+    job, created = jobs.submit("switch", scenario_name, obs_job(
+        run_switch, obs, scenario_name, scenario_dir, data.get("use_template", True), force
+    ))
+    return job_response(job, created, data.get("wait", False))
+
+scenario_digests = {}
+scenario_digests_lock = threading.Lock()
+
+def scenario_digest(scenario_name, scenario_dir, use_template):
+    # build_export_data depends only on these files, so the rendered scenario is
+    # built and hashed again only after one of them changed
+    settings_dir = os.path.join(scenario_dir, "__settings__")
+    key = []
+    for fname in ("config.json", "scenario_template.json" if use_template else "scenario.json"):
         try:
-            data = request.get_json(force=True) or {}
-            global_cfg = data.get("global", {})
-            scenario_cfg = data.get("scenario", {})
-            scenario_name = data.get("scenario_name")
-
-            scenario_dir = os.path.join(BASE_DIR, "scenarios", scenario_name)
-            if not os.path.isdir(scenario_dir):
-                return jsonify({"status": "error", "message": "Сценарий не найден"}), 404
-
-            scenario_path = os.path.join(scenario_dir, "__settings__", "scenario.json")
-            config_path = os.path.join(scenario_dir, "__settings__", "config.json")
-
-            obs_export_import = OBSExportImport(obs)
-            obs_export_import.save_to_file(scenario_path)
-
-            scenario_data = get_global_config(scenario_path)
-            cameras, microphones = [], []
-
-            for inp in scenario_data.get("inputs", []):
-                if inp["inputName"] in {"DefaultCamera", "DefaultCamera1", "DefaultCamera2"}:
-                    video_id = inp["inputSettings"].get("video_device_id")
-                    try:
-                        cam_items = obs.client.get_input_properties_list_property_items(inp["inputName"], "video_device_id").property_items
-                        for dev in cam_items:
-                            if dev["itemValue"] == video_id:
-                                cameras.append(build_device_info("camera", dev["itemName"], dev["itemValue"], inp["inputKind"]))
-                                break
-                    except Exception:
-                        traceback.print_exc()
-
-                elif inp["inputName"] == "DefaultMicrophone":
-                    mic_id = inp["inputSettings"].get("device_id")
-                    try:
-                        mic_items = get_audio_property_items(obs.client, inp["inputName"], "wasapi_input_capture")
-                        for dev in mic_items:
-                            if dev["itemValue"] == mic_id:
-                                microphones.append(build_device_info("microphone", dev["itemName"], dev["itemValue"], inp["inputKind"]))
-                                break
-                    except Exception:
-                        traceback.print_exc()
-
-            config_data = get_global_config(config_path)
-            if cameras:
-                if scenario_name == "Math":
-                    config_data["cameras"].append(cameras[0])
-                    config_data["cameras"].append(cameras[1])
-                else:
-                    config_data["camera"] = cameras[0]
-            if microphones:
-                config_data["microphone"] = microphones[0]
-
-            write_global_config(config_path, config_data)
-
-            return jsonify({"status": "ok", "message": "Настройки импортированы из OBS"})
-        except RuntimeError as e:
-            return jsonify({"status": "error", "message": str(e)}), 400
-        except Exception as e:
+            key.append(config_store.digest(os.path.join(settings_dir, fname)))
+        except OSError:
+            key.append(None)
+    key = tuple(key)
+
+    with scenario_digests_lock:
+        cached = scenario_digests.get((scenario_name, use_template))
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    scenario_data, _ = build_export_data(scenario_name, scenario_dir, use_template)
+    digest = SceneCollections.digest(scenario_data)
+    with scenario_digests_lock:
+        scenario_digests[(scenario_name, use_template)] = (key, digest)
+    return digest
+
+def collections_listing(use_template, status) -> dict:
+    # status: SceneCollections.status(), with "current"/"available" filled in when OBS was asked
+    scenarios = {}
+    scenarios_dir = os.path.join(BASE_DIR, "scenarios")
+    for name in sorted(os.listdir(scenarios_dir)):
+        scenario_dir = os.path.join(scenarios_dir, name)
+        if not os.path.isdir(scenario_dir):
+            continue
+        try:
+            digest = scenario_digest(name, scenario_dir, use_template)
+            in_sync = scene_collections.in_sync(name, digest, status["collections"])
+        except Exception:
             traceback.print_exc()
-            return jsonify({"status": "error", "message": str(e)}), 500
-
-@app.route("/api/students", methods=["GET"])
-def get_students():
-    db = SessionLocal()
-    students = db.query(Student).all()
-    db.close()
-    return jsonify([{
-        "id": s.id,
-        "first_name": s.first_name,
-        "last_name": s.last_name,
-        "email": s.email,
-        "city": s.city,
-        "address": s.address,
-        "phone": s.phone,
-        "chapter": s.chapter,
-        "paragraph": s.paragraph,
-        "section": s.section,
-        "position": s.position,
-        "task_number": s.task_number
-    } for s in students])
-
-@app.route("/api/students", methods=["POST"])
-def create_student():
-    data = request.get_json(force=True)
-    db = SessionLocal()
-    student = Student(**data)
-    db.add(student)
-    db.commit()
-    db.refresh(student)
-    db.close()
-    return jsonify({"id": student.id, "status": "created"})
-
-@app.route("/api/students/<int:student_id>", methods=["PUT"])
-def update_student(student_id):
-    data = request.get_json(force=True)
-    db = SessionLocal()
-    student = db.query(Student).filter(Student.id == student_id).first()
-    if not student:
-        db.close()
-        return jsonify({"error": "Student not found"}), 404
-    for key, value in data.items():
-        setattr(student, key, value)
-    db.commit()
-    db.refresh(student)
-    db.close()
-    return jsonify({"id": student.id, "status": "updated"})
-
-@app.route("/api/students/<int:student_id>", methods=["DELETE"])
-def delete_student(student_id):
-    db = SessionLocal()
-    student = db.query(Student).filter(Student.id == student_id).first()
-    if not student:
-        db.close()
-        return jsonify({"error": "Student not found"}), 404
-    db.delete(student)
-    db.commit()
-    db.close()
-    return jsonify({"id": student_id, "status": "deleted"})
-
-@app.route("/api/scenarios", methods=["GET"])
-def get_scenarios():
-    db = SessionLocal()
-    scenarios = db.query(Scenario).all()
-    db.close()
-    return jsonify([{
-        "id": s.id,
-        "name": s.name,
-        "description": s.description
-    } for s in scenarios])
-
-@app.route("/api/scenarios/<int:scenario_id>", methods=["GET"])
-def get_scenario(scenario_id):
-    db = SessionLocal()
-    scenario = db.query(Scenario).filter(Scenario.id == scenario_id).first()
-    db.close()
-    if not scenario:
-        return jsonify({"error": "Scenario not found"}), 404
-
-    scenario_path = os.path.join(BASE_DIR, "scenarios", scenario.name)
-    if not os.path.exists(scenario_path):
-        return jsonify({"error": "Сценарий не реализован"}), 400
+            in_sync = False
+        scenarios[name] = {"collection": scene_collections.name_for(name), "in_sync": in_sync}
+    return {"status": "ok", "scenarios": scenarios, **status}
 
-    return jsonify({
-        "id": scenario.id,
-        "name": scenario.name,
-        "description": scenario.description
-    })
+@app.route("/api/collections", methods=["GET"])
+def get_collections():
+    use_template = request.args.get("use_template", "1").lower() in ("1", "true", "yes")
+    try:
+        # OBS is asked only when already connected, the listing must not wait for a launch.
+        # Nor for a running export or import: after a short wait it shows the collection
+        # list OBS reported last
+        status = None
+        obs = obs_connection.instance
+        if obs is not None:
+            try:
+                with obs_queue.turn("collections", deadline=global_cfg.get("collections_wait", 0.5), obs=obs):
+                    status = scene_collections.status(obs)
+            except ObsTimeoutError as e:
+                if e.started:
+                    obs_connection.mark_failed(e)
+        if status is None:
+            status = scene_collections.status()
+
+        return jsonify(collections_listing(use_template, status))
+    except Exception as e:
+        traceback.print_exc()
+        obs_connection.report_error(e)
+        return jsonify({"status": "error", "message": str(e)}), 500
 
-@app.route("/api/scenarios", methods=["POST"])
-def create_scenario():
-    data = request.get_json(force=True)
-    db = SessionLocal()
-    scenario = Scenario(**data)
-    db.add(scenario)
-    db.commit()
-    db.refresh(scenario)
-    db.close()
-    return jsonify({"id": scenario.id, "status": "created"})
-
-@app.route("/api/scenarios/<int:scenario_id>", methods=["PUT"])
-def update_scenario(scenario_id):
-    data = request.get_json(force=True)
-    db = SessionLocal()
-    scenario = db.query(Scenario).filter(Scenario.id == scenario_id).first()
-    if not scenario:
-        db.close()
-        return jsonify({"error": "Scenario not found"}), 404
-    for key, value in data.items():
-        setattr(scenario, key, value)
-    db.commit()
-    db.refresh(scenario)
-    db.close()
-    return jsonify({"id": scenario.id, "status": "updated"})
-
-@app.route("/api/scenarios/<int:scenario_id>", methods=["DELETE"])
-def delete_scenario(scenario_id):
-    db = SessionLocal()
-    scenario = db.query(Scenario).filter(Scenario.id == scenario_id).first()
-    if not scenario:
-        db.close()
-        return jsonify({"error": "Scenario not found"}), 404
-
-    scenario_path = os.path.join(BASE_DIR, "scenarios", scenario.name)
-    if os.path.exists(scenario_path):
-        db.close()
-        return jsonify({"error": "Нельзя удалить сценарий: существует папка с реализацией"}), 400
-
-    db.delete(scenario)
-    db.commit()
-    db.close()
-    return jsonify({"id": scenario_id, "status": "deleted"})
-
-@app.route("/api/students/<int:student_id>/scenarios/<int:scenario_id>", methods=["POST"])
-def assign_scenario(student_id, scenario_id):
-    db = SessionLocal()
-    student = db.query(Student).filter(Student.id == student_id).first()
-    scenario = db.query(Scenario).filter(Scenario.id == scenario_id).first()
-
-    if not student or not scenario:
-        db.close()
-        return jsonify({"error": "Student or Scenario not found"}), 404
-
-    if scenario not in student.scenarios:
-        student.scenarios.append(scenario)
-        db.commit()
-        db.refresh(student)
-
-    db.close()
-    return jsonify({
-        "status": "ok",
-        "student_id": student_id,
-        "scenario_id": scenario_id
+@app.route("/api/jobs", methods=["GET"])
+def list_jobs():
+    return jsonify(jobs.list())
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Задача не найдена"}), 404
+    return jsonify(job.to_dict())
+
+@app.route("/api/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Задача не найдена"}), 404
+    if not jobs.cancel(job):
+        return jsonify({"status": "error", "message": "Задача уже завершена", "state": job.state}), 409
+    # a job still waiting for its OBS turn leaves the queue now
+    obs_queue.wake()
+    return jsonify({"status": "ok", "state": job.state}), 202
+
+@app.route("/api/jobs/<job_id>/events", methods=["GET"])
+def stream_job_events(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Задача не найдена"}), 404
+
+    # EventSource resends the last id it saw after a reconnect
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id") or 0
+    try:
+        last_id = int(last_id)
+    except ValueError:
+        last_id = 0
+
+    events = job.events_after(last_id, heartbeat=global_cfg.get("jobs_heartbeat", 15))
+    return Response(stream_with_context(sse_format(e) for e in events), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
     })
 
+# database routes live in db_routes and are imported on first use, so SQLAlchemy,
+# the models and pydantic stay out of startup
+class LazyView:
+    def __init__(self, import_name):
+        self.__module__, self.__name__ = import_name.rsplit(".", 1)
+        self.import_name = import_name
+
+    @cached_property
+    def view(self):
+        return import_string(self.import_name)
+
+    def __call__(self, *args, **kwargs):
+        return self.view(*args, **kwargs)
+
+DB_ROUTES = [
+    ("/api/students", "GET", "get_students"),
+    ("/api/students/bulk", "POST", "bulk_import_students"),
+    ("/api/students/export", "GET", "export_students_stream"),
+    ("/api/students", "POST", "create_student"),
+    ("/api/students/<int:student_id>", "GET", "get_student"),
+    ("/api/students/<int:student_id>", "PUT", "update_student"),
+    ("/api/students/<int:student_id>", "DELETE", "delete_student"),
+    ("/api/scenarios", "GET", "get_scenarios"),
+    ("/api/scenarios/<int:scenario_id>", "GET", "get_scenario"),
+    ("/api/scenarios", "POST", "create_scenario"),
+    ("/api/scenarios/<int:scenario_id>", "PUT", "update_scenario"),
+    ("/api/scenarios/<int:scenario_id>", "DELETE", "delete_scenario"),
+    ("/api/students/<int:student_id>/scenarios/<int:scenario_id>", "POST", "assign_scenario"),
+    ("/api/scenarios/<int:scenario_id>/students", "POST", "assign_scenario_bulk"),
+    ("/api/scenarios/<int:scenario_id>/students", "GET", "get_scenario_students"),
+    ("/api/db/pool", "GET", "get_db_pool"),
+]
+
+for rule, method, view in DB_ROUTES:
+    app.add_url_rule(rule, view_func=LazyView(f"db_routes.{view}"), methods=[method])
+
 if __name__ == "__main__":
+    # with the debug reloader only the child process serves requests
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        obs_connection.start()
+    # the development server; asgi.py is the serving mode that keeps OBS waits off the workers
     app.run(host="127.0.0.1", port=5000, debug=True)
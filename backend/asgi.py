@@ -0,0 +1,253 @@
+# ASGI entry point: uvicorn asgi:application --host 127.0.0.1 --port 5000
+#
+# The collections listing the UI polls and job progress streams are served on the
+# event loop: OBS is read over its own asyncio connection, outside the OBS queue, and
+# a stream waits for job events without holding a thread. Every other route runs the
+# Flask app on a pool of worker threads, one request per thread, so student and
+# scenario routes keep being served while an export or import holds the OBS queue.
+import io
+import os
+import re
+import json
+import time
+import asyncio
+import traceback
+from urllib.parse import parse_qs
+from concurrent.futures import ThreadPoolExecutor
+
+from app import app, global_cfg, config_store, obs_connection, obs_queue, jobs, scene_collections, collections_listing
+from libs import metrics
+from libs.jobs import sse_format
+from libs.obs_actions import ObsConnectionError
+from libs.obs_async import AsyncObsClient, ObsRequestError
+from libs.obs_queue import ObsTimeoutError
+
+CORS_HEADERS = [(b"access-control-allow-origin", b"*")]
+
+class WsgiBridge:
+    # each request gets a pool thread of its own for as long as it runs; the response
+    # body is handed back to the loop chunk by chunk, so streamed responses stay streamed
+    def __init__(self, wsgi_app, workers: int):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="wsgi")
+
+    @staticmethod
+    def environ(scope, body) -> dict:
+        server = scope.get("server") or ("localhost", 80)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope["query_string"].decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+            "REMOTE_ADDR": (scope.get("client") or ("", 0))[0],
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": body,
+            "wsgi.errors": io.StringIO(),
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False
+        }
+        for name, value in scope.get("headers", []):
+            name = name.decode("latin-1").upper().replace("-", "_")
+            key = name if name in ("CONTENT_TYPE", "CONTENT_LENGTH") else f"HTTP_{name}"
+            value = value.decode("latin-1")
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    async def __call__(self, scope, receive, send):
+        body = io.BytesIO()
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body.write(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body.seek(0)
+
+        loop = asyncio.get_running_loop()
+        environ = self.environ(scope, body)
+
+        def push(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def run():
+            response = {}
+
+            def start_response(status, headers, exc_info=None):
+                if exc_info and response.get("sent"):
+                    raise exc_info[1].with_traceback(exc_info[2])
+                response["start"] = {
+                    "type": "http.response.start",
+                    "status": int(status.split(" ", 1)[0]),
+                    "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+                }
+
+            result = self.wsgi_app(environ, start_response)
+            try:
+                for chunk in result:
+                    if not response.get("sent"):
+                        push(response["start"])
+                        response["sent"] = True
+                    if chunk:
+                        push({"type": "http.response.body", "body": chunk, "more_body": True})
+                if not response.get("sent"):
+                    push(response["start"])
+                push({"type": "http.response.body", "body": b""})
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+
+        await loop.run_in_executor(self.executor, run)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+async def send_json(send, payload, status=200):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    await send({"type": "http.response.start", "status": status, "headers": [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode())
+    ] + CORS_HEADERS})
+    await send({"type": "http.response.body", "body": body})
+
+class ObsAsgiApp:
+    def __init__(self, wsgi_app, workers: int):
+        self.bridge = WsgiBridge(wsgi_app, workers)
+        self.obs = AsyncObsClient(
+            obs_connection.cfg.get("ws_host", "127.0.0.1"),
+            obs_connection.cfg.get("ws_port", 4455),
+            os.getenv("WS_PASSWORD"),
+            connect_timeout=global_cfg.get("fleet_connect_timeout", 5)
+        )
+        self.routes = [
+            ("GET", re.compile(r"^/api/collections$"), "/api/collections", self.get_collections),
+            ("GET", re.compile(r"^/api/jobs/(?P<job_id>[^/]+)/events$"), "/api/jobs/<job_id>/events",
+             self.stream_job_events)
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        if scope["type"] != "http":
+            return
+
+        for method, pattern, rule, handler in self.routes:
+            m = pattern.match(scope["path"])
+            if m and scope["method"] == method:
+                started = time.perf_counter()
+                status = await handler(scope, receive, send, **m.groupdict())
+                metrics.http_request_seconds.observe(time.perf_counter() - started, method=method, route=rule)
+                metrics.http_requests.inc(method=method, route=rule, status=status)
+                return
+        await self.bridge(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                obs_connection.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.obs.close()
+                await asyncio.to_thread(obs_connection.stop)
+                config_store.flush()
+                self.bridge.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def read_collection_list(self) -> bool:
+        # only while the health thread holds a connection: it alone launches OBS
+        if not obs_connection.is_ready():
+            return False
+        try:
+            listing = await self.obs.call("GetSceneCollectionList", timeout=obs_queue.deadline_for("collections"))
+        except (ObsConnectionError, ObsTimeoutError, ObsRequestError) as e:
+            print(f"Не удалось получить список коллекций сцен: {e}")
+            return False
+        scene_collections.remember(listing["currentSceneCollectionName"], listing["sceneCollections"])
+        return True
+
+    async def get_collections(self, scope, receive, send):
+        query = parse_qs(scope["query_string"].decode("latin-1"))
+        use_template = query.get("use_template", ["1"])[0].lower() in ("1", "true", "yes")
+        try:
+            live = await self.read_collection_list()
+            # otherwise the list OBS reported last
+            status = {**scene_collections.status(), "live": live}
+            # digests may render templates, which is file and CPU work
+            payload = await asyncio.get_running_loop().run_in_executor(
+                self.bridge.executor, collections_listing, use_template, status)
+        except Exception as e:
+            traceback.print_exc()
+            await send_json(send, {"status": "error", "message": str(e)}, 500)
+            return 500
+        await send_json(send, payload)
+        return 200
+
+    async def stream_job_events(self, scope, receive, send, job_id):
+        job = jobs.get(job_id)
+        if job is None:
+            await send_json(send, {"status": "error", "message": "Задача не найдена"}, 404)
+            return 404
+
+        # EventSource resends the last id it saw after a reconnect
+        headers = dict(scope.get("headers", []))
+        query = parse_qs(scope["query_string"].decode("latin-1"))
+        try:
+            last_id = int(headers.get(b"last-event-id", b"").decode() or query.get("last_event_id", ["0"])[0])
+        except ValueError:
+            last_id = 0
+        heartbeat = global_cfg.get("jobs_heartbeat", 15)
+
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+
+        def notify():
+            loop.call_soon_threadsafe(wake.set)
+
+        async def wait_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"text/event-stream; charset=utf-8"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no")
+        ] + CORS_HEADERS})
+
+        job.watch(notify)
+        disconnected = asyncio.create_task(wait_disconnect())
+        try:
+            while not disconnected.done():
+                # cleared before reading, so an event emitted in between still wakes us
+                wake.clear()
+                pending, finished = job.since(last_id)
+                for event in pending:
+                    last_id = event["id"]
+                    await send({"type": "http.response.body", "body": sse_format(event).encode("utf-8"),
+                                "more_body": True})
+                if finished:
+                    break
+                if pending:
+                    continue
+
+                woken = asyncio.create_task(wake.wait())
+                done, _ = await asyncio.wait({woken, disconnected}, timeout=heartbeat,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                woken.cancel()
+                if not done:
+                    await send({"type": "http.response.body", "body": sse_format(None).encode("utf-8"),
+                                "more_body": True})
+            if not disconnected.done():
+                await send({"type": "http.response.body", "body": b""})
+        finally:
+            job.unwatch(notify)
+            disconnected.cancel()
+        return 200
+
+application = ObsAsgiApp(app, global_cfg.get("asgi_workers", 16))
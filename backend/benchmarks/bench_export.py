@@ -0,0 +1,63 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_obs_server import FakeObsServer, FakeObsState
+from libs.obs_actions import ObsActions
+from libs.obs_export_import import OBSExportImport
+
+ITEMS_PER_SCENE = 10
+
+def sequential_export(obs):
+    # request pattern of the previous exporter: one blocking call per list, filter and transform
+    client = obs.client
+    scenes = client.send("GetSceneList", raw=True)["scenes"]
+    for scene in scenes:
+        scene_name = scene["sceneName"]
+        for f in client.send("GetSourceFilterList", {"sourceName": scene_name}, raw=True)["filters"]:
+            client.send("GetSourceFilter", {"sourceName": scene_name, "filterName": f["filterName"]}, raw=True)
+        for item in client.send("GetSceneItemList", {"sceneName": scene_name}, raw=True)["sceneItems"]:
+            for f in client.send("GetSourceFilterList", {"sourceName": item["sourceName"]}, raw=True)["filters"]:
+                client.send("GetSourceFilter", {"sourceName": item["sourceName"], "filterName": f["filterName"]}, raw=True)
+            client.send("GetSceneItemTransform", {"sceneName": scene_name, "sceneItemId": item["sceneItemId"]}, raw=True)
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def run(sizes, latency, repeat):
+    results = []
+    for size in sizes:
+        state = FakeObsState()
+        state.populate(max(1, size // ITEMS_PER_SCENE), min(size, ITEMS_PER_SCENE))
+        server = FakeObsServer(state=state, latency=latency).start()
+        try:
+            obs = ObsActions(host="127.0.0.1", port=server.port)
+            exporter = OBSExportImport(obs)
+            results.append({
+                "items": size,
+                "sequential_ms": round(measure(lambda: sequential_export(obs), repeat) * 1000, 2),
+                "batched_ms": round(measure(exporter.export_scene_collection, repeat) * 1000, 2)
+            })
+            obs.client.disconnect()
+        finally:
+            server.stop()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="export_scene_collection latency against a fake OBS")
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument("--latency", type=float, default=0.0005, help="seconds per websocket message")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    results = run([int(s) for s in args.sizes.split(",")], args.latency, args.repeat)
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,114 @@
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from libs import hints
+from libs.hints import HINTS, load_hints, normalize
+
+HINTS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "__settings__", "hints.json")
+
+NAMES = [
+    "Integrated Camera", "HD Pro Webcam C920", "Logitech BRIO", "DroidCam Source 3", "Iriun Webcam",
+    "iPhone Camera", "Galaxy S23 Camera", "OBS Virtual Camera", "Razer Kiyo", "FaceTime HD Camera",
+    "USB Video Device", "EpocCam", "Camo", "Redmi Note 12", "Microphone (Realtek Audio)", "Pixel 8 Webcam"
+]
+IDS = [
+    "\\\\?\\usb#vid_046d&pid_085b&mi_00#7&1a2b3c", "rtsp://192.168.1.10:554/stream", "droidcam:0",
+    "com.apple.avfoundation.avcapturedevice.built-in_video", "{0.0.1.00000000}.{a1b2c3}", "http://10.0.0.5:4747/video",
+    "ivcam-virtual", "default", "ndi://studio-cam", "adb-emulator-5554"
+]
+
+# the pre-matcher implementation, kept here as the baseline
+def legacy_guess_source(name, device_id):
+    n, d = normalize(name), normalize(device_id)
+    if any(tag in d for tag in ["rtsp://", "rtmp://", "http://", "https://"]) or any(tag in d for tag in ["rtsp", "rtmp", "ipcam", "ip webcam"]):
+        return "network"
+    if any(tag in n for tag in HINTS.get("mobile_apps", [])) or any(tag in d for tag in HINTS.get("mobile_apps", [])):
+        return "virtual_driver"
+    if any(tag in d for tag in ["usb", "vid_", "pid_", "vendor", "product"]) or re.search(r"(vid|pid|usb)", d):
+        return "usb"
+    return "unknown"
+
+def legacy_guess_manufacturer(name, device_id):
+    n, d = normalize(name), normalize(device_id)
+    for m in HINTS["manufacturers"]:
+        if m in n or m in d:
+            return m.capitalize()
+    for alias, brand in HINTS["aliases"].items():
+        if alias in n or alias in d:
+            return brand
+    if any(tag in (n + " " + d) for tag in ["iphone", "ipad", "facetime"]):
+        return "Apple"
+    return None
+
+def legacy_is_mobile_camera(kind, name, device_id):
+    found = []
+    n, d = normalize(name), normalize(device_id)
+    if any(h in n for h in HINTS["name_hints"]):
+        found.append("name_hint")
+    if any(h in d for h in HINTS["id_hints"]):
+        found.append("id_hint")
+    if any(app in n for app in HINTS["mobile_apps"]):
+        found.append("mobile_app")
+    if any(tag in d for tag in ["rtsp", "http", "ipcam"]):
+        found.append("network")
+    manufacturer = legacy_guess_manufacturer(name, device_id)
+    if manufacturer:
+        found.append(f"manufacturer:{manufacturer}")
+    if any(pc in n for pc in HINTS["pc_webcams"]):
+        found.append("pc_webcam_brand")
+    if any(h in n for h in ["integrated", "built-in", "facetime hd camera"]):
+        found.append("integrated_laptop")
+    positive = any(h in found for h in ["name_hint", "id_hint", "mobile_app", "network", "manufacturer:Apple"])
+    negative = "integrated_laptop" in found or "pc_webcam_brand" in found
+    return (positive and not negative, found)
+
+def legacy_describe(kind, name, device_id):
+    mobile, found = legacy_is_mobile_camera(kind, name, device_id)
+    return (legacy_guess_source(name, device_id), legacy_guess_manufacturer(name, device_id), mobile, tuple(found))
+
+def synthetic_devices(count, unique, seed=42):
+    rnd = random.Random(seed)
+    pool = [
+        ("dshow_input", f"{rnd.choice(NAMES)} #{i % 7}", f"{rnd.choice(IDS)}-{i}")
+        for i in range(unique)
+    ]
+    return [rnd.choice(pool) for _ in range(count)]
+
+def timed(fn, devices):
+    started = time.perf_counter()
+    results = [fn(*dev) for dev in devices]
+    return time.perf_counter() - started, results
+
+def run(count, unique):
+    load_hints(HINTS_PATH)
+    devices = synthetic_devices(count, unique)
+
+    legacy_s, expected = timed(legacy_describe, devices)
+    hints.MATCHER.scan.cache_clear()
+    hints.describe_device.cache_clear()
+    cold_s, actual = timed(hints.describe_device, devices)
+    warm_s, _ = timed(hints.describe_device, devices)
+
+    mismatches = sum(1 for a, b in zip(expected, actual) if a != b)
+    return {
+        "devices": count,
+        "unique_devices": unique,
+        "legacy_ms": round(legacy_s * 1000, 2),
+        "matcher_cold_ms": round(cold_s * 1000, 2),
+        "matcher_memoized_ms": round(warm_s * 1000, 2),
+        "mismatches": mismatches
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="libs/hints classification over synthetic devices")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--unique", type=int, default=10000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.count, args.unique), indent=2))
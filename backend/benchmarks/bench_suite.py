@@ -0,0 +1,205 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.fake_obs_server import FakeObsServer, FakeObsState
+from libs.obs_actions import ObsActions
+from libs.obs_export_import import OBSExportImport
+
+# end-to-end timings against the in-process fake OBS; every case reports p50/p99 so
+# that two runs (or a run and a saved baseline) can be compared on any machine
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    pos = (len(ordered) - 1) * q
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+def summarize(case, timings, server):
+    total = sum(timings)
+    counts = server.counts()
+    return {
+        "case": case,
+        "iterations": len(timings),
+        "p50_ms": round(percentile(timings, 0.5) * 1000, 3),
+        "p99_ms": round(percentile(timings, 0.99) * 1000, 3),
+        "mean_ms": round(total / len(timings) * 1000, 3),
+        "max_ms": round(max(timings) * 1000, 3),
+        "throughput_per_s": round(len(timings) / total, 2) if total else None,
+        # websocket messages and OBS requests per iteration
+        "messages": counts["messages"] / len(timings),
+        "requests": counts["requests"] / len(timings)
+    }
+
+def measure(case, server, fn, iterations, warmup, setup=None):
+    timings = []
+    for i in range(warmup + iterations):
+        if setup is not None:
+            setup()
+        if i == warmup:
+            server.reset_counts()
+        started = time.perf_counter()
+        fn()
+        if i >= warmup:
+            timings.append(time.perf_counter() - started)
+    return summarize(case, timings, server)
+
+def make_state(args):
+    state = FakeObsState()
+    state.populate(args.scenes, args.items, args.filters)
+    return state
+
+def bench_export(server, args):
+    obs = ObsActions("127.0.0.1", server.port)
+    try:
+        exporter = OBSExportImport(obs)
+        return measure("export_scene_collection", server, exporter.export_scene_collection,
+                       args.iterations, args.warmup)
+    finally:
+        obs.client.disconnect()
+
+def bench_import(server, args):
+    # every run starts from an OBS that has the inputs but no scenes or filters yet
+    obs = ObsActions("127.0.0.1", server.port)
+    try:
+        server.state = make_state(args)
+        data = OBSExportImport(obs).export_scene_collection()
+
+        def reset():
+            state = make_state(args)
+            state.scenes = {"Scene": []}
+            state.filters = {}
+            server.state = state
+
+        importer = OBSExportImport(obs)
+        return measure("import_scene_collection", server, lambda: importer.import_scene_collection(data),
+                       args.iterations, args.warmup, setup=reset)
+    finally:
+        obs.client.disconnect()
+        server.state = make_state(args)
+
+def bench_api(server, args, scenarios_dir):
+    import app as backend
+
+    # the app talks to the fake server and works on a scratch copy of the scenarios
+    backend.obs_connection.cfg = {"ws_host": "127.0.0.1", "ws_port": server.port}
+    backend.BASE_DIR = os.path.dirname(scenarios_dir)
+    backend.obs_connection.connect()
+    client = backend.app.test_client()
+
+    def get(url):
+        res = client.get(url)
+        assert res.status_code == 200, res.get_data(as_text=True)
+
+    def post(url, body):
+        res = client.post(url, json=body)
+        assert res.status_code == 200, res.get_data(as_text=True)
+
+    def fresh_obs():
+        server.state = make_state(args)
+
+    export_body = {"scenario_name": args.scenario, "use_template": True, "wait": True}
+    results = [
+        measure("api_devices", server, lambda: get("/api/devices?refresh=1"), args.iterations, args.warmup),
+        measure("api_export", server, lambda: post("/api/export", export_body),
+                args.iterations, args.warmup, setup=fresh_obs),
+        # the second and later exports of the same scenario find nothing to change
+        measure("api_export_unchanged", server, lambda: post("/api/export", export_body),
+                args.iterations, args.warmup),
+        measure("api_export_dry_run", server, lambda: post("/api/export", {**export_body, "dry_run": True}),
+                args.iterations, args.warmup)
+    ]
+    backend.device_probes.cleanup()
+    backend.device_inventory.unsubscribe()
+    backend.obs_connection.stop()
+    return results
+
+def compare(results, baseline, tolerance):
+    # a case regresses when its p50 or p99 is more than tolerance above the baseline
+    previous = {r["case"]: r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        old = previous.get(r["case"])
+        if old is None:
+            continue
+        for key in ("p50_ms", "p99_ms"):
+            if old[key] and r[key] > old[key] * (1 + tolerance):
+                regressions.append({"case": r["case"], "metric": key, "baseline": old[key], "current": r[key]})
+    return regressions
+
+def run(args):
+    server = FakeObsServer(state=make_state(args), latency=args.latency,
+                           request_latency=args.request_latency).start()
+    scratch = tempfile.mkdtemp(prefix="obs-bench-")
+    try:
+        scenarios_dir = os.path.join(scratch, "scenarios")
+        shutil.copytree(os.path.join(BACKEND_DIR, "scenarios"), scenarios_dir)
+
+        cases = set(args.cases.split(","))
+        results = []
+        if "export" in cases:
+            results.append(bench_export(server, args))
+        if "import" in cases:
+            results.append(bench_import(server, args))
+        if "api" in cases:
+            results.extend(bench_api(server, args, scenarios_dir))
+    finally:
+        server.stop()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+            "scenes": args.scenes,
+            "items_per_scene": args.items,
+            "filters_per_item": args.filters,
+            "latency": args.latency,
+            "request_latency": args.request_latency,
+            "iterations": args.iterations
+        },
+        "results": results
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="end-to-end benchmarks against a fake OBS")
+    parser.add_argument("--cases", default="export,import,api")
+    parser.add_argument("--scenes", type=int, default=10)
+    parser.add_argument("--items", type=int, default=10, help="items per scene")
+    parser.add_argument("--filters", type=int, default=1, help="filters per item")
+    parser.add_argument("--latency", type=float, default=0.0005, help="seconds per websocket message")
+    parser.add_argument("--request-latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--scenario", default="Streaming")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs the baseline")
+    args = parser.parse_args()
+
+    report = run(args)
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["regressions"] = compare(report["results"], json.load(f), args.tolerance)
+        exit_code = 1 if report["regressions"] else 0
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    sys.exit(exit_code)
@@ -0,0 +1,568 @@
+import argparse
+import base64
+import hashlib
+import json
+import socketserver
+import struct
+import threading
+import time
+from collections import Counter
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+DEFAULT_TRANSFORM = {
+    "positionX": 0.0,
+    "positionY": 0.0,
+    "rotation": 0.0,
+    "scaleX": 1.0,
+    "scaleY": 1.0,
+    "alignment": 5,
+    "boundsType": "OBS_BOUNDS_NONE",
+    "boundsAlignment": 0,
+    "boundsWidth": 0.0,
+    "boundsHeight": 0.0,
+    "cropLeft": 0,
+    "cropRight": 0,
+    "cropTop": 0,
+    "cropBottom": 0,
+    "sourceWidth": 1920.0,
+    "sourceHeight": 1080.0,
+    "width": 1920.0,
+    "height": 1080.0
+}
+
+class FakeObsError(Exception):
+    def __init__(self, code, comment):
+        super().__init__(comment)
+        self.code = code
+        self.comment = comment
+
+class FakeObsState:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.scenes = {"Scene": []}
+        self.current_scene = "Scene"
+        self.inputs = {}
+        self.filters = {}
+        self.next_item_id = 1
+        self.current_transition = "Fade"
+        self.transitions = {"Fade": {"kind": "fade_transition", "settings": {}}}
+        self.profiles = {"Untitled": self.make_profile()}
+        self.current_profile = "Untitled"
+        self.profile_switches = 0
+        # inactive scene collections keep their scenes, inputs and filters here
+        self.current_collection = "Untitled"
+        self.collections = {"Untitled": None}
+        self.collection_switches = 0
+        self.property_items = {
+            ("dshow_input", "video_device_id"): [
+                {"itemName": "Integrated Camera", "itemValue": "Integrated Camera:\\\\?\\usb#vid_04f2&pid_b6dd", "itemEnabled": True},
+                {"itemName": "DroidCam Source 3", "itemValue": "DroidCam Source 3:", "itemEnabled": True}
+            ],
+            ("wasapi_input_capture", "device_id"): [
+                {"itemName": "Default", "itemValue": "default", "itemEnabled": True},
+                {"itemName": "Microphone (USB Audio Device)", "itemValue": "{0.0.1.00000000}.{usb-mic}", "itemEnabled": True}
+            ]
+        }
+
+    def populate(self, scene_count, items_per_scene, filters_per_item=1):
+        with self.lock:
+            for s in range(scene_count):
+                scene_name = f"Scene{s + 1}"
+                self.scenes[scene_name] = []
+                self.filters[scene_name] = []
+                for i in range(items_per_scene):
+                    input_name = f"Input{s + 1}_{i + 1}"
+                    self.inputs[input_name] = {"kind": "color_source_v3", "settings": {"color": 4278190080 + i}}
+                    self.filters[input_name] = [{
+                        "filterName": f"Filter{f + 1}",
+                        "filterKind": "color_filter_v2",
+                        "filterEnabled": True,
+                        "filterIndex": f,
+                        "filterSettings": {"opacity": 1.0, "gamma": 0.1 * f}
+                    } for f in range(filters_per_item)]
+                    self.add_item(scene_name, input_name)
+
+    @staticmethod
+    def make_profile(base=(1920, 1080), output=(1280, 720), fps=(30, 1), sample_rate=48000, channels="Stereo"):
+        return {
+            "video": {
+                "baseWidth": base[0],
+                "baseHeight": base[1],
+                "outputWidth": output[0],
+                "outputHeight": output[1],
+                "fpsNumerator": fps[0],
+                "fpsDenominator": fps[1]
+            },
+            "params": {"Audio": {"SampleRate": str(sample_rate), "ChannelSetup": channels}}
+        }
+
+    def add_item(self, scene_name, source_name, enabled=True):
+        item = {
+            "sceneItemId": self.next_item_id,
+            "sourceName": source_name,
+            "sceneItemEnabled": enabled,
+            "sceneItemTransform": dict(DEFAULT_TRANSFORM)
+        }
+        self.next_item_id += 1
+        self.scenes[scene_name].append(item)
+        return item
+
+    def find_item(self, scene_name, item_id):
+        for item in self.require_scene(scene_name):
+            if item["sceneItemId"] == item_id:
+                return item
+        raise FakeObsError(600, f"No scene items were found in scene `{scene_name}` with the ID `{item_id}`.")
+
+    def require_scene(self, name):
+        if name not in self.scenes:
+            raise FakeObsError(600, f"No source was found by the name of `{name}`.")
+        return self.scenes[name]
+
+    def require_input(self, name):
+        if name not in self.inputs:
+            raise FakeObsError(600, f"No source was found by the name of `{name}`.")
+        return self.inputs[name]
+
+    def require_source(self, name):
+        if name not in self.scenes and name not in self.inputs:
+            raise FakeObsError(600, f"No source was found by the name of `{name}`.")
+        return self.filters.setdefault(name, [])
+
+    def handle(self, request_type, data):
+        handler = getattr(self, f"req_{request_type}", None)
+        if handler is None:
+            raise FakeObsError(204, f"Your request type is not valid: {request_type}")
+        with self.lock:
+            return handler(data or {})
+
+    def req_GetVersion(self, data):
+        return {"obsVersion": "30.0.0", "obsWebSocketVersion": "5.3.0", "rpcVersion": 1}
+
+    def req_GetSceneList(self, data):
+        names = list(self.scenes)
+        return {
+            "currentProgramSceneName": self.current_scene,
+            "currentPreviewSceneName": None,
+            "scenes": [{"sceneName": n, "sceneIndex": len(names) - 1 - i} for i, n in enumerate(names)]
+        }
+
+    def req_CreateScene(self, data):
+        if data["sceneName"] in self.scenes or data["sceneName"] in self.inputs:
+            raise FakeObsError(601, "A source already exists by that scene name.")
+        self.scenes[data["sceneName"]] = []
+        return {}
+
+    def req_RemoveScene(self, data):
+        self.require_scene(data["sceneName"])
+        del self.scenes[data["sceneName"]]
+        self.filters.pop(data["sceneName"], None)
+        if self.current_scene == data["sceneName"]:
+            self.current_scene = next(iter(self.scenes), None)
+        return {}
+
+    def req_SetCurrentProgramScene(self, data):
+        self.require_scene(data["sceneName"])
+        self.current_scene = data["sceneName"]
+        return {}
+
+    def req_GetInputList(self, data):
+        kind = data.get("inputKind")
+        return {"inputs": [
+            {"inputName": n, "inputKind": i["kind"], "unversionedInputKind": i["kind"]}
+            for n, i in self.inputs.items() if kind is None or i["kind"] == kind
+        ]}
+
+    def req_CreateInput(self, data):
+        scene = data["sceneName"]
+        self.require_scene(scene)
+        if data["inputName"] in self.inputs or data["inputName"] in self.scenes:
+            raise FakeObsError(601, "A source already exists by that input name.")
+        self.inputs[data["inputName"]] = {"kind": data["inputKind"], "settings": dict(data.get("inputSettings") or {})}
+        item = self.add_item(scene, data["inputName"], data.get("sceneItemEnabled", True))
+        return {"inputUuid": data["inputName"], "sceneItemId": item["sceneItemId"]}
+
+    def req_RemoveInput(self, data):
+        self.require_input(data["inputName"])
+        del self.inputs[data["inputName"]]
+        self.filters.pop(data["inputName"], None)
+        for items in self.scenes.values():
+            items[:] = [i for i in items if i["sourceName"] != data["inputName"]]
+        return {}
+
+    def req_GetInputSettings(self, data):
+        inp = self.require_input(data["inputName"])
+        return {"inputKind": inp["kind"], "inputSettings": dict(inp["settings"])}
+
+    def req_GetInputDefaultSettings(self, data):
+        return {"defaultInputSettings": {}}
+
+    def req_SetInputSettings(self, data):
+        inp = self.require_input(data["inputName"])
+        if data.get("overlay", True):
+            inp["settings"].update(data["inputSettings"])
+        else:
+            inp["settings"] = dict(data["inputSettings"])
+        return {}
+
+    def req_GetInputPropertiesListPropertyItems(self, data):
+        inp = self.require_input(data["inputName"])
+        key = (inp["kind"], data["propertyName"])
+        if key not in self.property_items:
+            raise FakeObsError(600, "Unable to find a property by that name.")
+        return {"propertyItems": [dict(i) for i in self.property_items[key]]}
+
+    def req_GetSceneItemList(self, data):
+        items = self.require_scene(data["sceneName"])
+        return {"sceneItems": [{
+            "sceneItemId": item["sceneItemId"],
+            "sceneItemIndex": idx,
+            "sceneItemEnabled": item["sceneItemEnabled"],
+            "sourceName": item["sourceName"],
+            "inputKind": self.inputs.get(item["sourceName"], {}).get("kind"),
+            "isGroup": None,
+            "sceneItemTransform": dict(item["sceneItemTransform"])
+        } for idx, item in enumerate(items)]}
+
+    def req_CreateSceneItem(self, data):
+        self.require_scene(data["sceneName"])
+        if data["sourceName"] not in self.inputs and data["sourceName"] not in self.scenes:
+            raise FakeObsError(600, f"No source was found by the name of `{data['sourceName']}`.")
+        item = self.add_item(data["sceneName"], data["sourceName"], data.get("sceneItemEnabled", True))
+        return {"sceneItemId": item["sceneItemId"]}
+
+    def req_RemoveSceneItem(self, data):
+        item = self.find_item(data["sceneName"], data["sceneItemId"])
+        self.scenes[data["sceneName"]].remove(item)
+        return {}
+
+    def req_GetSceneItemTransform(self, data):
+        item = self.find_item(data["sceneName"], data["sceneItemId"])
+        return {"sceneItemTransform": dict(item["sceneItemTransform"])}
+
+    def req_SetSceneItemTransform(self, data):
+        item = self.find_item(data["sceneName"], data["sceneItemId"])
+        item["sceneItemTransform"].update(data["sceneItemTransform"])
+        return {}
+
+    def req_SetSceneItemIndex(self, data):
+        items = self.scenes[data["sceneName"]]
+        item = self.find_item(data["sceneName"], data["sceneItemId"])
+        items.remove(item)
+        items.insert(data["sceneItemIndex"], item)
+        return {}
+
+    def req_GetSourceFilterList(self, data):
+        return {"filters": [dict(f) for f in self.require_source(data["sourceName"])]}
+
+    def req_GetSourceFilter(self, data):
+        for f in self.require_source(data["sourceName"]):
+            if f["filterName"] == data["filterName"]:
+                return {k: v for k, v in f.items() if k != "filterName"}
+        raise FakeObsError(600, f"No filter was found in the source `{data['sourceName']}`.")
+
+    def req_CreateSourceFilter(self, data):
+        filters = self.require_source(data["sourceName"])
+        if any(f["filterName"] == data["filterName"] for f in filters):
+            raise FakeObsError(601, "A filter already exists by that name.")
+        filters.append({
+            "filterName": data["filterName"],
+            "filterKind": data["filterKind"],
+            "filterEnabled": True,
+            "filterIndex": len(filters),
+            "filterSettings": dict(data.get("filterSettings") or {})
+        })
+        return {}
+
+    def req_RemoveSourceFilter(self, data):
+        filters = self.require_source(data["sourceName"])
+        filters[:] = [f for f in filters if f["filterName"] != data["filterName"]]
+        return {}
+
+    def req_SetSourceFilterSettings(self, data):
+        for f in self.require_source(data["sourceName"]):
+            if f["filterName"] == data["filterName"]:
+                f["filterSettings"].update(data["filterSettings"])
+                return {}
+        raise FakeObsError(600, f"No filter was found in the source `{data['sourceName']}`.")
+
+    COLLECTION_FIELDS = ("scenes", "current_scene", "inputs", "filters")
+
+    def switch_collection(self, name, fresh=False):
+        self.collections[self.current_collection] = {f: getattr(self, f) for f in self.COLLECTION_FIELDS}
+        saved = None if fresh else self.collections.get(name)
+        if saved is None:
+            saved = {"scenes": {"Scene": []}, "current_scene": "Scene", "inputs": {}, "filters": {}}
+        for field, value in saved.items():
+            setattr(self, field, value)
+        self.collections[name] = None
+        self.current_collection = name
+        self.collection_switches += 1
+
+    def req_GetSceneCollectionList(self, data):
+        return {"currentSceneCollectionName": self.current_collection, "sceneCollections": list(self.collections)}
+
+    def req_SetCurrentSceneCollection(self, data):
+        if data["sceneCollectionName"] not in self.collections:
+            raise FakeObsError(600, "No scene collection was found by that name.")
+        if data["sceneCollectionName"] != self.current_collection:
+            self.switch_collection(data["sceneCollectionName"])
+        return {}
+
+    def req_CreateSceneCollection(self, data):
+        if data["sceneCollectionName"] in self.collections:
+            raise FakeObsError(601, "A scene collection already exists by that name.")
+        self.switch_collection(data["sceneCollectionName"], fresh=True)
+        return {}
+
+    def req_GetProfileList(self, data):
+        return {"currentProfileName": self.current_profile, "profiles": list(self.profiles)}
+
+    def req_SetCurrentProfile(self, data):
+        if data["profileName"] not in self.profiles:
+            raise FakeObsError(600, "No profiles were found by that name.")
+        if data["profileName"] != self.current_profile:
+            self.profile_switches += 1
+        self.current_profile = data["profileName"]
+        return {}
+
+    def req_CreateProfile(self, data):
+        if data["profileName"] in self.profiles:
+            raise FakeObsError(601, "A profile already exists by that name.")
+        self.profiles[data["profileName"]] = self.make_profile()
+        self.current_profile = data["profileName"]
+        return {}
+
+    def req_GetVideoSettings(self, data):
+        return dict(self.profiles[self.current_profile]["video"])
+
+    def req_SetVideoSettings(self, data):
+        self.profiles[self.current_profile]["video"].update(data)
+        return {}
+
+    def req_GetProfileParameter(self, data):
+        params = self.profiles[self.current_profile]["params"].get(data["parameterCategory"], {})
+        return {"parameterValue": params.get(data["parameterName"]), "defaultParameterValue": None}
+
+    def req_SetProfileParameter(self, data):
+        params = self.profiles[self.current_profile]["params"].setdefault(data["parameterCategory"], {})
+        params[data["parameterName"]] = data["parameterValue"]
+        return {}
+
+    def req_GetSceneTransitionList(self, data):
+        return {
+            "currentSceneTransitionName": self.current_transition,
+            "currentSceneTransitionKind": self.transitions[self.current_transition]["kind"],
+            "transitions": [
+                {"transitionName": n, "transitionKind": t["kind"], "transitionFixed": False, "transitionConfigurable": True}
+                for n, t in self.transitions.items()
+            ]
+        }
+
+    def req_GetCurrentSceneTransition(self, data):
+        t = self.transitions[self.current_transition]
+        return {
+            "transitionName": self.current_transition,
+            "transitionKind": t["kind"],
+            "transitionSettings": dict(t["settings"])
+        }
+
+class FakeObsServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0, state=None, latency=0.0, request_latency=0.0,
+                 request_latencies=None):
+        super().__init__((host, port), FakeObsHandler)
+        self.state = state or FakeObsState()
+        # latency is paid once per websocket message, request_latency once per request inside
+        # it; request_latencies overrides the latter per request type, e.g. {"CreateInput": 0.05}
+        self.latency = latency
+        self.request_latency = request_latency
+        self.request_latencies = dict(request_latencies or {})
+        self.thread = None
+
+        self.counts_lock = threading.Lock()
+        self.messages = 0
+        self.request_counts = Counter()
+
+    def reset_counts(self):
+        with self.counts_lock:
+            self.messages = 0
+            self.request_counts.clear()
+
+    def counts(self) -> dict:
+        with self.counts_lock:
+            return {"messages": self.messages, "requests": sum(self.request_counts.values()),
+                    "by_type": dict(self.request_counts)}
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def process(self, request_type, request_id, data):
+        with self.counts_lock:
+            self.request_counts[request_type] += 1
+        delay = self.request_latencies.get(request_type, self.request_latency)
+        if delay:
+            time.sleep(delay)
+        try:
+            response_data = self.state.handle(request_type, data)
+            status = {"result": True, "code": 100}
+        except FakeObsError as e:
+            response_data = None
+            status = {"result": False, "code": e.code, "comment": e.comment}
+        except (KeyError, TypeError) as e:
+            response_data = None
+            status = {"result": False, "code": 300, "comment": f"Missing request field: {e}"}
+
+        res = {"requestType": request_type, "requestId": request_id, "requestStatus": status}
+        if response_data is not None:
+            res["responseData"] = response_data
+        return res
+
+class FakeObsHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sock = self.request
+        if not self.handshake(sock):
+            return
+
+        self.send(sock, {"op": 0, "d": {"obsWebSocketVersion": "5.3.0", "rpcVersion": 1}})
+        while True:
+            message = self.recv(sock)
+            if message is None:
+                return
+
+            server = self.server
+            with server.counts_lock:
+                server.messages += 1
+            if server.latency:
+                time.sleep(server.latency)
+
+            op, d = message.get("op"), message.get("d", {})
+            if op == 1:
+                self.send(sock, {"op": 2, "d": {"negotiatedRpcVersion": 1}})
+            elif op == 6:
+                res = server.process(d["requestType"], d.get("requestId"), d.get("requestData"))
+                self.send(sock, {"op": 7, "d": res})
+            elif op == 8:
+                results = []
+                for req in d.get("requests", []):
+                    res = server.process(req["requestType"], req.get("requestId"), req.get("requestData"))
+                    results.append(res)
+                    if d.get("haltOnFailure") and not res["requestStatus"]["result"]:
+                        break
+                self.send(sock, {"op": 9, "d": {"requestId": d.get("requestId"), "results": results}})
+
+    def handshake(self, sock):
+        data = b""
+        while b"\r\n\r\n" not in data:
+            chunk = sock.recv(4096)
+            if not chunk:
+                return False
+            data += chunk
+
+        headers = {}
+        for line in data.decode("latin-1").split("\r\n")[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+
+        accept = base64.b64encode(
+            hashlib.sha1((headers["sec-websocket-key"] + WS_GUID).encode()).digest()
+        ).decode()
+        sock.sendall((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode())
+        return True
+
+    def recv_exact(self, sock, size):
+        buf = b""
+        while len(buf) < size:
+            chunk = sock.recv(size - len(buf))
+            if not chunk:
+                return None
+            buf += chunk
+        return buf
+
+    def recv(self, sock):
+        payload = b""
+        while True:
+            try:
+                header = self.recv_exact(sock, 2)
+            except (ConnectionError, OSError):
+                return None
+            if header is None:
+                return None
+
+            fin, opcode = header[0] & 0x80, header[0] & 0x0F
+            masked, length = header[1] & 0x80, header[1] & 0x7F
+            if length == 126:
+                length = struct.unpack(">H", self.recv_exact(sock, 2))[0]
+            elif length == 127:
+                length = struct.unpack(">Q", self.recv_exact(sock, 8))[0]
+            mask = self.recv_exact(sock, 4) if masked else None
+            data = self.recv_exact(sock, length) or b""
+            if mask and data:
+                key = (mask * (len(data) // 4 + 1))[:len(data)]
+                data = (int.from_bytes(data, "big") ^ int.from_bytes(key, "big")).to_bytes(len(data), "big")
+
+            if opcode == 0x8:
+                return None
+            if opcode == 0x9:
+                self.send_frame(sock, 0xA, data)
+                continue
+            if opcode in (0x0, 0x1, 0x2):
+                payload += data
+                if fin:
+                    return json.loads(payload.decode("utf-8"))
+
+    def send(self, sock, message):
+        self.send_frame(sock, 0x1, json.dumps(message).encode("utf-8"))
+
+    def send_frame(self, sock, opcode, data):
+        header = bytes([0x80 | opcode])
+        if len(data) < 126:
+            header += bytes([len(data)])
+        elif len(data) < 65536:
+            header += bytes([126]) + struct.pack(">H", len(data))
+        else:
+            header += bytes([127]) + struct.pack(">Q", len(data))
+        try:
+            sock.sendall(header + data)
+        except (ConnectionError, OSError):
+            pass
+
+if __name__ == "__main__":
+    # a stand-in OBS for running the whole backend on a machine without OBS:
+    # point ws_host/ws_port in __settings__/config.json at it
+    parser = argparse.ArgumentParser(description="fake obs-websocket v5 server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4455)
+    parser.add_argument("--scenes", type=int, default=3)
+    parser.add_argument("--items", type=int, default=5, help="items per scene")
+    parser.add_argument("--filters", type=int, default=1, help="filters per item")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per websocket message")
+    parser.add_argument("--request-latency", type=float, default=0.0, help="seconds per request")
+    args = parser.parse_args()
+
+    state = FakeObsState()
+    state.populate(args.scenes, args.items, args.filters)
+    server = FakeObsServer(args.host, args.port, state, args.latency, args.request_latency)
+    print(f"fake OBS on ws://{args.host}:{server.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -1,18 +1,121 @@
 import os
 import json
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from models import Base
+import time
+import threading
+from flask.globals import app_ctx
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.pool import QueuePool
 
-with open(os.path.join("__settings__", "settings.json")) as f:
-    settings = json.load(f)["db"]
+from libs import metrics
 
-db_password = os.getenv("DB_PASSWORD")
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SETTINGS_PATH = os.path.join(BASE_DIR, "__settings__", "settings.json")
 
-DATABASE_URL = (
-    f"postgresql+psycopg2://{settings['user']}:{db_password}@"
-    f"{settings['host']}:{settings['port']}/{settings['database']}"
-)
+def load_db_settings(path=SETTINGS_PATH) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["db"]
 
-engine = create_engine(DATABASE_URL, echo=True)
+def database_url(db) -> str:
+    db_password = os.getenv("DB_PASSWORD")
+    return (
+        f"postgresql+psycopg2://{db['user']}:{db_password}@"
+        f"{db['host']}:{db['port']}/{db['database']}"
+    )
+
+class PoolMetrics:
+    def __init__(self, slow_threshold: float = 0.1):
+        self.slow_threshold = slow_threshold
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.slow = 0
+        self.timeouts = 0
+
+    def record(self, wait: float, timed_out: bool = False):
+        with self.lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            if wait >= self.slow_threshold:
+                self.slow += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "checkouts": self.checkouts,
+                "wait_total_seconds": self.wait_total,
+                "wait_avg_seconds": self.wait_total / self.checkouts if self.checkouts else 0.0,
+                "wait_max_seconds": self.wait_max,
+                "slow_checkouts": self.slow,
+                "timeouts": self.timeouts
+            }
+
+pool_metrics = PoolMetrics()
+
+class MeteredQueuePool(QueuePool):
+    # times how long a checkout waits for a free connection (including connecting);
+    # a class attribute so the pool survives engine.dispose(), which recreates it
+    metrics = pool_metrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - start)
+        return conn
+
+def make_engine(db):
+    return create_engine(
+        database_url(db),
+        echo=db.get("echo", False),
+        poolclass=MeteredQueuePool,
+        pool_size=db.get("pool_size", 5),
+        max_overflow=db.get("max_overflow", 10),
+        pool_timeout=db.get("pool_timeout", 30),
+        pool_recycle=db.get("pool_recycle", 1800),
+        pool_pre_ping=db.get("pool_pre_ping", True)
+    )
+
+def instrument(engine):
+    # execution time per statement kind and table, see metrics.statement_label
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        metrics.db_query_seconds.observe(time.perf_counter() - started,
+                                         statement=metrics.statement_label(statement))
+
+    @event.listens_for(engine, "handle_error")
+    def on_error(ctx):
+        if ctx.connection is not None and ctx.connection.info.get("query_started"):
+            ctx.connection.info["query_started"].pop()
+        metrics.db_query_errors.inc(statement=metrics.statement_label(ctx.statement))
+
+    return engine
+
+settings = load_db_settings()
+
+engine = instrument(make_engine(settings))
 SessionLocal = sessionmaker(bind=engine)
+# one session per Flask app context, removed in teardown no matter how the view exits
+db_session = scoped_session(SessionLocal, scopefunc=lambda: id(app_ctx._get_current_object()))
+
+def pool_stats() -> dict:
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        **pool_metrics.snapshot()
+    }
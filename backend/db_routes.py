@@ -0,0 +1,227 @@
+import os
+import traceback
+from flask import Response, jsonify, request, stream_with_context
+from sqlalchemy import select, func, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+
+from db import db_session, pool_stats
+from models import Student, Scenario, student_scenario
+from libs.student_listing import STUDENT_FIELDS, list_students, parse_fields
+from libs.student_bulk import detect_format, import_students, export_students
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def get_students():
+    # without limit/cursor the response stays a plain list, with them it is one keyset page
+    db = db_session()
+    try:
+        return jsonify(list_students(db, request.args))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+def bulk_import_students():
+    # CSV (header row) or NDJSON body; valid rows go through COPY and are upserted on email
+    fmt = detect_format(request.mimetype, request.args.get("format"))
+    db = db_session()
+    try:
+        report = import_students(db, request.stream, fmt)
+    except Exception as e:
+        traceback.print_exc()
+        db.rollback()
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"status": "ok", **report})
+
+def export_students_stream():
+    fmt = detect_format(None, request.args.get("format") or "csv")
+    try:
+        fields = parse_fields(request.args.get("fields"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    rows = export_students(db_session(), fmt, fields)
+    return Response(stream_with_context(rows), mimetype=mimetype, headers={
+        "Content-Disposition": f"attachment; filename=students.{fmt}"
+    })
+
+def create_student():
+    data = request.get_json(force=True)
+    db = db_session()
+    student = Student(**data)
+    db.add(student)
+    db.commit()
+    db.refresh(student)
+    return jsonify({"id": student.id, "status": "created"})
+
+def get_student(student_id):
+    db = db_session()
+    student = db.execute(
+        select(Student).options(selectinload(Student.scenarios)).where(Student.id == student_id)
+    ).scalar_one_or_none()
+    if not student:
+        return jsonify({"error": "Student not found"}), 404
+
+    return jsonify({
+        **{name: getattr(student, name) for name in STUDENT_FIELDS},
+        "scenarios": [{"id": sc.id, "name": sc.name} for sc in student.scenarios]
+    })
+
+def update_student(student_id):
+    data = request.get_json(force=True)
+    db = db_session()
+    student = db.query(Student).filter(Student.id == student_id).first()
+    if not student:
+        return jsonify({"error": "Student not found"}), 404
+    for key, value in data.items():
+        setattr(student, key, value)
+    db.commit()
+    db.refresh(student)
+    return jsonify({"id": student.id, "status": "updated"})
+
+def delete_student(student_id):
+    db = db_session()
+    student = db.query(Student).filter(Student.id == student_id).first()
+    if not student:
+        return jsonify({"error": "Student not found"}), 404
+    db.delete(student)
+    db.commit()
+    return jsonify({"id": student_id, "status": "deleted"})
+
+def get_scenarios():
+    db = db_session()
+    # student counts come from one grouped outer join instead of loading every collection
+    rows = db.execute(
+        select(Scenario.id, Scenario.name, Scenario.description, func.count(student_scenario.c.student_id))
+        .outerjoin(student_scenario, student_scenario.c.scenario_id == Scenario.id)
+        .group_by(Scenario.id)
+        .order_by(Scenario.id)
+    )
+    return jsonify([{
+        "id": scenario_id,
+        "name": name,
+        "description": description,
+        "student_count": count
+    } for scenario_id, name, description, count in rows])
+
+def get_scenario(scenario_id):
+    db = db_session()
+    scenario = db.query(Scenario).filter(Scenario.id == scenario_id).first()
+    if not scenario:
+        return jsonify({"error": "Scenario not found"}), 404
+
+    scenario_path = os.path.join(BASE_DIR, "scenarios", scenario.name)
+    if not os.path.exists(scenario_path):
+        return jsonify({"error": "Сценарий не реализован"}), 400
+
+    return jsonify({
+        "id": scenario.id,
+        "name": scenario.name,
+        "description": scenario.description
+    })
+
+def create_scenario():
+    data = request.get_json(force=True)
+    db = db_session()
+    scenario = Scenario(**data)
+    db.add(scenario)
+    db.commit()
+    db.refresh(scenario)
+    return jsonify({"id": scenario.id, "status": "created"})
+
+def update_scenario(scenario_id):
+    data = request.get_json(force=True)
+    db = db_session()
+    scenario = db.query(Scenario).filter(Scenario.id == scenario_id).first()
+    if not scenario:
+        return jsonify({"error": "Scenario not found"}), 404
+    for key, value in data.items():
+        setattr(scenario, key, value)
+    db.commit()
+    db.refresh(scenario)
+    return jsonify({"id": scenario.id, "status": "updated"})
+
+def delete_scenario(scenario_id):
+    db = db_session()
+    scenario = db.query(Scenario).filter(Scenario.id == scenario_id).first()
+    if not scenario:
+        return jsonify({"error": "Scenario not found"}), 404
+
+    scenario_path = os.path.join(BASE_DIR, "scenarios", scenario.name)
+    if os.path.exists(scenario_path):
+        return jsonify({"error": "Нельзя удалить сценарий: существует папка с реализацией"}), 400
+
+    db.delete(scenario)
+    db.commit()
+    return jsonify({"id": scenario_id, "status": "deleted"})
+
+def assign_scenario(student_id, scenario_id):
+    db = db_session()
+    stmt = (
+        pg_insert(student_scenario)
+        .values(student_id=student_id, scenario_id=scenario_id)
+        .on_conflict_do_nothing()
+    )
+    try:
+        result = db.execute(stmt)
+        db.commit()
+    except IntegrityError:
+        # the foreign keys reject an unknown student or scenario
+        db.rollback()
+        return jsonify({"error": "Student or Scenario not found"}), 404
+
+    return jsonify({
+        "status": "ok",
+        "student_id": student_id,
+        "scenario_id": scenario_id,
+        "assigned": result.rowcount > 0
+    })
+
+def assign_scenario_bulk(scenario_id):
+    data = request.get_json(force=True) or {}
+    try:
+        student_ids = sorted({int(i) for i in data.get("student_ids", [])})
+    except (TypeError, ValueError):
+        return jsonify({"error": "student_ids must be a list of integers"}), 400
+
+    db = db_session()
+    if db.get(Scenario, scenario_id) is None:
+        return jsonify({"error": "Scenario not found"}), 404
+
+    assigned = 0
+    if student_ids:
+        # unknown ids simply produce no row, existing links are skipped by the conflict clause
+        stmt = (
+            pg_insert(student_scenario)
+            .from_select(
+                ["student_id", "scenario_id"],
+                select(Student.id, literal(scenario_id)).where(Student.id.in_(student_ids))
+            )
+            .on_conflict_do_nothing()
+        )
+        assigned = db.execute(stmt).rowcount
+        db.commit()
+
+    return jsonify({
+        "status": "ok",
+        "scenario_id": scenario_id,
+        "requested": len(student_ids),
+        "assigned": assigned
+    })
+
+def get_scenario_students(scenario_id):
+    db = db_session()
+    if db.get(Scenario, scenario_id) is None:
+        return jsonify({"error": "Scenario not found"}), 404
+
+    rows = db.execute(
+        select(Student.id, Student.first_name, Student.last_name, Student.email)
+        .join(student_scenario, student_scenario.c.student_id == Student.id)
+        .where(student_scenario.c.scenario_id == scenario_id)
+        .order_by(Student.last_name, Student.id)
+    )
+    return jsonify([dict(row._mapping) for row in rows])
+
+def get_db_pool():
+    return jsonify(pool_stats())
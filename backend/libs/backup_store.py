@@ -0,0 +1,219 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import traceback
+
+from libs.config_store import atomic_write
+
+BACKUP_FILES = ("config.json", "scenario_template.json", "scenario.json")
+LEGACY_PREFIX = "backup_"
+
+class BackupStore:
+    # <settings_dir>/backups/blobs/<sha256> holds every file version once,
+    # <settings_dir>/backups/manifest.jsonl is an append-only log of snapshots
+    def __init__(self, settings_dir, keep_last: int = 20, keep_hourly: int = 24, keep_daily: int = 30):
+        self.settings_dir = settings_dir
+        self.root = os.path.join(settings_dir, "backups")
+        self.blobs_dir = os.path.join(self.root, "blobs")
+        self.manifest_path = os.path.join(self.root, "manifest.jsonl")
+
+        self.keep_last = keep_last
+        self.keep_hourly = keep_hourly
+        self.keep_daily = keep_daily
+
+        # name -> {"name", "created", "files": {filename: sha256}}, in creation order
+        self.snapshots = None
+        self.manifest_lines = 0
+        self.lock = threading.RLock()
+
+    def load(self):
+        if self.snapshots is not None:
+            return
+
+        self.snapshots = {}
+        self.manifest_lines = 0
+        if not os.path.exists(self.manifest_path):
+            os.makedirs(self.blobs_dir, exist_ok=True)
+            self.import_legacy()
+            return
+
+        with open(self.manifest_path, "rb") as f:
+            payload = f.read()
+
+        offset = 0
+        for raw in payload.splitlines(keepends=True):
+            start, offset = offset, offset + len(raw)
+            line = raw.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                print(f"Повреждённая строка в {self.manifest_path} пропущена")
+                if not raw.endswith(b"\n"):
+                    # a torn last line after a crash: cut it off, otherwise the next
+                    # append would be glued to it and lost on the next replay
+                    self.truncate(start)
+                continue
+            if not raw.endswith(b"\n"):
+                self.truncate(offset, terminate=True)
+            self.manifest_lines += 1
+            if record.get("op") == "remove":
+                self.snapshots.pop(record["name"], None)
+            else:
+                self.snapshots.pop(record["name"], None)
+                self.snapshots[record["name"]] = {
+                    "name": record["name"],
+                    "created": record["created"],
+                    "files": record["files"]
+                }
+
+    def truncate(self, size, terminate=False):
+        with open(self.manifest_path, "r+b") as f:
+            f.truncate(size)
+            if terminate:
+                f.seek(size)
+                f.write(b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def import_legacy(self):
+        # one-time pass over the old backup_* folders; after this the manifest is the index
+        try:
+            entries = [e for e in os.scandir(self.settings_dir) if e.is_dir() and e.name.startswith(LEGACY_PREFIX)]
+        except OSError:
+            entries = []
+
+        for entry in sorted(entries, key=lambda e: e.name):
+            files = {}
+            for fname in BACKUP_FILES:
+                path = os.path.join(entry.path, fname)
+                if os.path.exists(path):
+                    with open(path, "rb") as f:
+                        files[fname] = f.read()
+            if files:
+                self.add(entry.name, files, created=entry.stat().st_mtime, prune=False)
+
+        if not self.snapshots:
+            # still create the manifest so the folders are not scanned again
+            open(self.manifest_path, "a", encoding="utf-8").close()
+
+    def blob_path(self, digest):
+        return os.path.join(self.blobs_dir, digest)
+
+    def put_blob(self, payload: bytes) -> str:
+        digest = hashlib.sha256(payload).hexdigest()
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            atomic_write(path, payload)
+        return digest
+
+    def read_blob(self, digest) -> bytes:
+        with open(self.blob_path(digest), "rb") as f:
+            return f.read()
+
+    def append(self, records):
+        with open(self.manifest_path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.manifest_lines += len(records)
+
+    def add(self, name, files, created=None, prune=True) -> dict:
+        # files: {filename: bytes}
+        with self.lock:
+            self.load()
+
+            base, n = name, 1
+            while name in self.snapshots:
+                n += 1
+                name = f"{base}_{n}"
+
+            snapshot = {
+                "name": name,
+                "created": created if created is not None else time.time(),
+                "files": {fname: self.put_blob(payload) for fname, payload in files.items()}
+            }
+            self.append([{"op": "add", **snapshot}])
+            self.snapshots[name] = snapshot
+
+            if prune:
+                try:
+                    self.prune()
+                except Exception:
+                    traceback.print_exc()
+            return snapshot
+
+    def snapshot_files(self, extra=None) -> dict:
+        # the current state of the scenario, with extra {filename: bytes} taking precedence
+        files = {}
+        for fname in BACKUP_FILES:
+            path = os.path.join(self.settings_dir, fname)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    files[fname] = f.read()
+        files.update(extra or {})
+        return files
+
+    def get(self, name=None):
+        with self.lock:
+            self.load()
+            if name is None:
+                return next(reversed(self.snapshots.values()), None)
+            return self.snapshots.get(name)
+
+    def list(self) -> list:
+        with self.lock:
+            self.load()
+            return [dict(s, files=sorted(s["files"])) for s in reversed(self.snapshots.values())]
+
+    def read(self, name=None) -> tuple:
+        snapshot = self.get(name)
+        if snapshot is None:
+            return None, {}
+        return snapshot, {fname: self.read_blob(digest) for fname, digest in snapshot["files"].items()}
+
+    def retained(self) -> set:
+        ordered = sorted(self.snapshots.values(), key=lambda s: s["created"], reverse=True)
+        keep = {s["name"] for s in ordered[:self.keep_last]}
+
+        for fmt, limit in (("%Y-%m-%d %H", self.keep_hourly), ("%Y-%m-%d", self.keep_daily)):
+            buckets = set()
+            for s in ordered:
+                if len(buckets) >= limit:
+                    break
+                bucket = time.strftime(fmt, time.localtime(s["created"]))
+                if bucket not in buckets:
+                    # the newest snapshot of each hour / day survives
+                    buckets.add(bucket)
+                    keep.add(s["name"])
+        return keep
+
+    def prune(self) -> list:
+        with self.lock:
+            self.load()
+            keep = self.retained()
+            removed = [name for name in self.snapshots if name not in keep]
+            if not removed:
+                return []
+
+            self.append([{"op": "remove", "name": name} for name in removed])
+            for name in removed:
+                del self.snapshots[name]
+
+            live = {digest for s in self.snapshots.values() for digest in s["files"].values()}
+            for entry in os.scandir(self.blobs_dir):
+                if entry.is_file() and not entry.name.startswith(".") and entry.name not in live:
+                    os.unlink(entry.path)
+
+            if self.manifest_lines > 2 * len(self.snapshots) + 100:
+                self.compact()
+            return removed
+
+    def compact(self):
+        payload = "".join(json.dumps({"op": "add", **s}, ensure_ascii=False) + "\n" for s in self.snapshots.values())
+        atomic_write(self.manifest_path, payload.encode("utf-8"))
+        self.manifest_lines = len(self.snapshots)
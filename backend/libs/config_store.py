@@ -0,0 +1,191 @@
+import os
+import copy
+import gzip
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import traceback
+from contextlib import contextmanager
+
+from libs import metrics
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+def serialize(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+def fsync_dir(directory):
+    # makes the rename durable on POSIX; directories can't be opened on Windows
+    if os.name != "posix":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def atomic_write(path, payload: bytes):
+    atomic_write_with(path, lambda f: f.write(payload))
+
+def atomic_write_with(path, write):
+    # write(f) fills a temp file next to path, which then replaces path in one rename
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    fsync_dir(directory)
+
+class ConfigStore:
+    def __init__(self, debounce: float = 0.5):
+        self.debounce = debounce
+        # path -> ((mtime_ns, size), parsed document, sha256 of the file bytes)
+        self.cache = {}
+        # path -> [document, payload, timer] for writes waiting out the debounce window
+        self.pending = {}
+        self.path_locks = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def file_key(path):
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    @staticmethod
+    @contextmanager
+    def timed(path, op):
+        name = os.path.basename(path)
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            metrics.config_io_errors.inc(file=name, op=op)
+            raise
+        finally:
+            metrics.config_io_seconds.observe(time.perf_counter() - started, file=name, op=op)
+
+    def path_lock(self, path):
+        with self.lock:
+            return self.path_locks.setdefault(path, threading.Lock())
+
+    def entry(self, path):
+        # (document, sha256 of its bytes); the document is shared, callers must not mutate it
+        path = os.path.abspath(path)
+
+        with self.lock:
+            pending = self.pending.get(path)
+            if pending is not None:
+                return pending[0], hashlib.sha256(pending[1]).hexdigest()
+
+        key = self.file_key(path)
+        with self.lock:
+            cached = self.cache.get(path)
+        if cached is None or cached[0] != key:
+            with self.timed(path, "read"):
+                with open(path, "rb") as f:
+                    raw = f.read()
+                # an import may save scenario.json compressed
+                text = gzip.decompress(raw) if raw[:2] == GZIP_MAGIC else raw
+                data = json.loads(text.decode("utf-8"))
+            # the file may have changed while it was being read; keep the older stamp
+            # so the next load re-reads it
+            cached = (key, data, hashlib.sha256(raw).hexdigest())
+            with self.lock:
+                self.cache[path] = cached
+        return cached[1], cached[2]
+
+    def load(self, path):
+        # callers mutate what they get back, the cached document must stay intact
+        return copy.deepcopy(self.entry(path)[0])
+
+    def digest(self, path) -> str:
+        return self.entry(path)[1]
+
+    def write(self, path, data, delay=None):
+        # delay > 0 coalesces writes to the same path: the last document within
+        # the window is the one that reaches the disk
+        path = os.path.abspath(path)
+        data = copy.deepcopy(data)
+        payload = serialize(data)
+        delay = self.debounce if delay is None else delay
+
+        if delay <= 0:
+            with self.lock:
+                pending = self.pending.pop(path, None)
+            if pending is not None:
+                pending[2].cancel()
+            self.write_file(path, data, payload)
+            return
+
+        with self.lock:
+            pending = self.pending.get(path)
+            if pending is not None:
+                pending[0], pending[1] = data, payload
+                return
+            timer = threading.Timer(delay, self.flush, args=(path,))
+            timer.daemon = True
+            self.pending[path] = [data, payload, timer]
+        timer.start()
+
+    def flush(self, path=None):
+        paths = [os.path.abspath(path)] if path else list(self.pending)
+        for p in paths:
+            with self.lock:
+                pending = self.pending.pop(p, None)
+            if pending is None:
+                continue
+            pending[2].cancel()
+            try:
+                self.write_file(p, pending[0], pending[1])
+            except Exception:
+                traceback.print_exc()
+
+    def write_file(self, path, data, payload):
+        digest = hashlib.sha256(payload).hexdigest()
+
+        with self.path_lock(path):
+            with self.lock:
+                cached = self.cache.get(path)
+            try:
+                unchanged = cached is not None and cached[2] == digest and cached[0] == self.file_key(path)
+            except OSError:
+                unchanged = False
+            if unchanged:
+                return False
+
+            try:
+                with self.timed(path, "write"):
+                    atomic_write(path, payload)
+            except BaseException:
+                with self.lock:
+                    self.cache.pop(path, None)
+                raise
+
+            with self.lock:
+                self.cache[path] = (self.file_key(path), data, digest)
+            return True
+
+    def invalidate(self, path=None):
+        # the file was replaced behind our back: a debounced write must not clobber it
+        with self.lock:
+            if path is None:
+                dropped = list(self.pending.values())
+                self.pending.clear()
+                self.cache.clear()
+            else:
+                path = os.path.abspath(path)
+                dropped = [self.pending.pop(path)] if path in self.pending else []
+                self.cache.pop(path, None)
+        for pending in dropped:
+            pending[2].cancel()
@@ -0,0 +1,98 @@
+import os
+import time
+import threading
+import traceback
+
+from libs.obs_probes import PROBE_PREFIX
+
+class DeviceInventory:
+    def __init__(self, scan, ttl: float = 300.0, ignored_prefixes=(PROBE_PREFIX,)):
+        self.scan = scan
+        self.ttl = ttl
+        self.ignored_prefixes = tuple(ignored_prefixes)
+
+        self.data = None
+        self.loaded_at = 0.0
+        self.generation = 0
+
+        self.lock = threading.Lock()
+        self.scan_lock = threading.Lock()
+        self.events = None
+
+    def is_fresh(self) -> bool:
+        return self.data is not None and time.monotonic() - self.loaded_at < self.ttl
+
+    def get(self, refresh: bool = False) -> dict:
+        if not refresh and self.is_fresh():
+            return self.data
+
+        with self.scan_lock:
+            if not refresh and self.is_fresh():
+                return self.data
+
+            with self.lock:
+                generation = self.generation
+            data = self.scan()
+
+            with self.lock:
+                # an event that arrived mid-scan means the result may already be stale
+                if generation == self.generation:
+                    self.data = data
+                    self.loaded_at = time.monotonic()
+            return data
+
+    def invalidate(self, reason=None):
+        with self.lock:
+            self.generation += 1
+            self.data = None
+            self.loaded_at = 0.0
+        if reason:
+            print(f"Список устройств сброшен: {reason}")
+
+    def is_ignored(self, input_name) -> bool:
+        return bool(input_name) and input_name.startswith(self.ignored_prefixes)
+
+    def on_input_created(self, data):
+        if not self.is_ignored(data.input_name):
+            self.invalidate(f"InputCreated {data.input_name}")
+
+    def on_input_removed(self, data):
+        if not self.is_ignored(data.input_name):
+            self.invalidate(f"InputRemoved {data.input_name}")
+
+    def on_input_settings_changed(self, data):
+        if not self.is_ignored(data.input_name):
+            self.invalidate(f"InputSettingsChanged {data.input_name}")
+
+    def subscribe(self, cfg):
+        from obsws_python import EventClient, Subs
+
+        self.unsubscribe()
+        try:
+            self.events = EventClient(
+                host=cfg.get("ws_host", "127.0.0.1"),
+                port=cfg.get("ws_port", 4455),
+                password=os.getenv("WS_PASSWORD"),
+                subs=Subs.INPUTS
+            )
+            self.events.callback.register([
+                self.on_input_created,
+                self.on_input_removed,
+                self.on_input_settings_changed
+            ])
+        except Exception:
+            self.events = None
+            traceback.print_exc()
+
+    def unsubscribe(self):
+        events, self.events = self.events, None
+        if events is not None:
+            try:
+                events.disconnect()
+            except Exception:
+                pass
+
+    def on_obs_connected(self, cfg):
+        # a (re)connected OBS may have different devices, and the old event socket is gone
+        self.invalidate()
+        self.subscribe(cfg)
@@ -1,6 +1,6 @@
-import os
-import json
 import re
+import json
+import functools
 
 HINTS = {}
 
@@ -21,22 +21,84 @@ INPUT_KIND_MAP = {
 
 SKIP_NAMES = {"DefaultCamera", "DefaultCamera1", "DefaultCamera2", "DefaultMicrophone"}
 
+HINT_LISTS = [
+    "manufacturers", "name_hints", "id_hints", "mobile_apps",
+    "pc_webcams", "camera_hints", "microphone_hints"
+]
+
+NETWORK_TAGS = ["rtsp://", "rtmp://", "http://", "https://", "rtsp", "rtmp", "ipcam", "ip webcam"]
+USB_TAGS = ["usb", "vid_", "pid_", "vendor", "product", "vid", "pid"]
+APPLE_TAGS = ["iphone", "ipad", "facetime"]
+STREAM_TAGS = ["rtsp", "http", "ipcam"]
+INTEGRATED_TAGS = ["integrated", "built-in", "facetime hd camera"]
+
+class HintMatcher:
+    def __init__(self, categories: dict):
+        # tag -> [(category, position in category)]; the position keeps the
+        # "first entry of the list wins" order of the hint files
+        self.tags = {}
+        for category, tags in categories.items():
+            for idx, tag in enumerate(tags):
+                if tag:
+                    self.tags.setdefault(tag, []).append((category, idx))
+
+        # every tag that is a prefix of another one matches wherever the longer one does
+        self.owners = {
+            tag: [owner for t in self.tags if tag.startswith(t) for owner in self.tags[t]]
+            for tag in self.tags
+        }
+
+        # a lookahead alternation (longest tags first) reports a hit at every position,
+        # so one pass over the string finds all tags of all categories
+        alternation = "|".join(re.escape(t) for t in sorted(self.tags, key=len, reverse=True))
+        self.regex = re.compile(f"(?=({alternation}))") if alternation else None
+        self.scan = functools.lru_cache(maxsize=16384)(self.scan_uncached)
+
+    def scan_uncached(self, s: str) -> dict:
+        hits = {}
+        if self.regex is None or not s:
+            return hits
+        for tag in set(m.group(1) for m in self.regex.finditer(s)):
+            for category, idx in self.owners[tag]:
+                best = hits.get(category)
+                if best is None or idx < best:
+                    hits[category] = idx
+        return hits
+
+    def has(self, s: str, category: str) -> bool:
+        return category in self.scan(s)
+
+    def first(self, s: str, category: str):
+        return self.scan(s).get(category)
+
+MATCHER = HintMatcher({})
+
 def load_hints(path: str):
-    global HINTS
+    global MATCHER
     try:
         with open(path, "r", encoding="utf-8") as f:
-            HINTS = json.load(f)
-        HINTS["manufacturers"] = [m.lower() for m in HINTS.get("manufacturers", [])]
-        HINTS["aliases"] = {k.lower(): v for k, v in HINTS.get("aliases", {}).items()}
-        HINTS["name_hints"] = [s.lower() for s in HINTS.get("name_hints", [])]
-        HINTS["id_hints"] = [s.lower() for s in HINTS.get("id_hints", [])]
-        HINTS["mobile_apps"] = [s.lower() for s in HINTS.get("mobile_apps", [])]
-        HINTS["pc_webcams"] = [s.lower() for s in HINTS.get("pc_webcams", [])]
+            data = json.load(f)
+        for key in HINT_LISTS:
+            data[key] = [s.lower() for s in data.get(key, [])]
+        data["aliases"] = {k.lower(): v for k, v in data.get("aliases", {}).items()}
     except Exception:
-        HINTS = {
-            "manufacturers": [], "aliases": {}, "name_hints": [],
-            "id_hints": [], "mobile_apps": [], "pc_webcams": []
-        }
+        data = {key: [] for key in HINT_LISTS}
+        data["aliases"] = {}
+
+    # update in place: modules that did "from libs.hints import HINTS" keep seeing the data
+    HINTS.clear()
+    HINTS.update(data)
+
+    MATCHER = HintMatcher({
+        **{key: HINTS[key] for key in HINT_LISTS},
+        "aliases": list(HINTS["aliases"]),
+        "network": NETWORK_TAGS,
+        "usb": USB_TAGS,
+        "apple": APPLE_TAGS,
+        "stream": STREAM_TAGS,
+        "integrated": INTEGRATED_TAGS
+    })
+    describe_device.cache_clear()
 
 def normalize(s: str) -> str:
     return (s or "").strip().lower()
@@ -50,55 +112,66 @@ def guess_platform(kind: str) -> str:
     if "pulse" in k: return "linux"
     return "unknown"
 
+def first_hit(category: str, *strings):
+    found = [idx for idx in (MATCHER.first(s, category) for s in strings) if idx is not None]
+    return min(found) if found else None
+
 def guess_source(name: str, device_id: str) -> str:
     n, d = normalize(name), normalize(device_id)
-    if any(tag in d for tag in ["rtsp://", "rtmp://", "http://", "https://"]) or any(tag in d for tag in ["rtsp", "rtmp", "ipcam", "ip webcam"]):
+    if MATCHER.has(d, "network"):
         return "network"
-    if any(tag in n for tag in HINTS.get("mobile_apps", [])) or any(tag in d for tag in HINTS.get("mobile_apps", [])):
+    if MATCHER.has(n, "mobile_apps") or MATCHER.has(d, "mobile_apps"):
         return "virtual_driver"
-    if any(tag in d for tag in ["usb", "vid_", "pid_", "vendor", "product"]) or re.search(r"(vid|pid|usb)", d):
+    if MATCHER.has(d, "usb"):
         return "usb"
     return "unknown"
 
 def guess_manufacturer(name: str, device_id: str) -> str | None:
     n, d = normalize(name), normalize(device_id)
 
-    for m in HINTS["manufacturers"]:
-        if m in n or m in d:
-            return m.capitalize()
+    idx = first_hit("manufacturers", n, d)
+    if idx is not None:
+        return HINTS["manufacturers"][idx].capitalize()
 
-    for alias, brand in HINTS["aliases"].items():
-        if alias in n or alias in d:
-            return brand
+    idx = first_hit("aliases", n, d)
+    if idx is not None:
+        return list(HINTS["aliases"].values())[idx]
 
-    if any(tag in (n + " " + d) for tag in ["iphone", "ipad", "facetime"]):
+    if MATCHER.has(n, "apple") or MATCHER.has(d, "apple"):
         return "Apple"
 
     return None
 
 def is_mobile_camera(kind: str, name: str, device_id: str) -> tuple[bool, list[str]]:
+    mobile, hints = describe_device(kind, name, device_id)[2:]
+    return mobile, list(hints)
+
+@functools.lru_cache(maxsize=4096)
+def describe_device(kind: str, name: str, device_id: str) -> tuple:
+    # (source, manufacturer, is_mobile, hints); memoized because /api/devices
+    # classifies the same handful of devices over and over
     hints = []
-    n, d, k = normalize(name), normalize(device_id), normalize(kind)
+    n, d = normalize(name), normalize(device_id)
 
-    if any(h in n for h in HINTS["name_hints"]):
+    if MATCHER.has(n, "name_hints"):
         hints.append("name_hint")
-    if any(h in d for h in HINTS["id_hints"]):
+    if MATCHER.has(d, "id_hints"):
         hints.append("id_hint")
-    if any(app in n for app in HINTS["mobile_apps"]):
+    if MATCHER.has(n, "mobile_apps"):
         hints.append("mobile_app")
-    if any(tag in d for tag in ["rtsp", "http", "ipcam"]):
+    if MATCHER.has(d, "stream"):
         hints.append("network")
 
     manufacturer = guess_manufacturer(name, device_id)
     if manufacturer:
         hints.append(f"manufacturer:{manufacturer}")
 
-    if any(pc in n for pc in HINTS["pc_webcams"]):
+    if MATCHER.has(n, "pc_webcams"):
         hints.append("pc_webcam_brand")
 
-    if any(h in n for h in ["integrated", "built-in", "facetime hd camera"]):
+    if MATCHER.has(n, "integrated"):
         hints.append("integrated_laptop")
 
     positive = any(h in hints for h in ["name_hint", "id_hint", "mobile_app", "network", "manufacturer:Apple"])
     negative = "integrated_laptop" in hints or "pc_webcam_brand" in hints
-    return (positive and not negative, hints)
+    return (guess_source(name, device_id), manufacturer, positive and not negative, tuple(hints))
@@ -0,0 +1,203 @@
+import json
+import time
+import uuid
+import threading
+import traceback
+
+class JobCancelled(Exception):
+    pass
+
+class Job:
+    def __init__(self, kind, key):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.state = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.error_type = None
+
+        self.events = []
+        self.cancel_requested = False
+        self.cond = threading.Condition()
+        # callbacks run after every new event, for readers that cannot block on cond
+        self.watchers = []
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ("done", "failed", "cancelled")
+
+    def emit(self, event_type, data):
+        with self.cond:
+            self.events.append({"id": len(self.events) + 1, "event": event_type, "data": data})
+            self.cond.notify_all()
+            watchers = list(self.watchers)
+        for fn in watchers:
+            fn()
+
+    def watch(self, fn):
+        with self.cond:
+            self.watchers.append(fn)
+
+    def unwatch(self, fn):
+        with self.cond:
+            if fn in self.watchers:
+                self.watchers.remove(fn)
+
+    def since(self, last_id=0) -> tuple:
+        # (events past last_id, whether the job had finished when they were taken)
+        with self.cond:
+            return self.events[last_id:], self.finished
+
+    def progress(self, stage, done=None, total=None, checkpoint=True, **info):
+        # checkpoint=False marks a point where stopping would leave OBS half-updated
+        self.emit("progress", {"stage": stage, "done": done, "total": total, **info})
+        if checkpoint:
+            self.check_cancelled()
+
+    def check_cancelled(self):
+        if self.cancel_requested:
+            raise JobCancelled("Задача отменена")
+
+    def start(self):
+        # called by the job once it holds what it queued for (usually its OBS turn);
+        # a job cancelled while it was queued stops here without doing any work
+        with self.cond:
+            self.check_cancelled()
+            self.state = "running"
+            self.started_at = time.time()
+        self.emit("running", {})
+
+    def request_cancel(self) -> bool:
+        with self.cond:
+            if self.finished:
+                return False
+            self.cancel_requested = True
+            self.cond.notify_all()
+        self.emit("cancelling", {})
+        return True
+
+    def finish(self, state, result=None, error=None) -> bool:
+        with self.cond:
+            if self.finished:
+                return False
+            self.state = state
+            self.result = result
+            if error is not None:
+                self.error = str(error)
+                self.error_type = type(error).__name__
+            self.finished_at = time.time()
+        self.emit(state, self.to_dict())
+        return True
+
+    def wait(self, timeout=None) -> bool:
+        with self.cond:
+            return self.cond.wait_for(lambda: self.finished, timeout)
+
+    def events_after(self, last_id=0, heartbeat: float = 15.0):
+        # yields events past last_id as they arrive, None on idle heartbeats,
+        # and stops after the terminal event
+        while True:
+            with self.cond:
+                if len(self.events) <= last_id and not self.finished:
+                    self.cond.wait(heartbeat)
+                pending = self.events[last_id:]
+                finished = self.finished
+            if not pending and not finished:
+                yield None
+                continue
+            for event in pending:
+                last_id = event["id"]
+                yield event
+            if finished and last_id >= len(self.events):
+                return
+
+    def to_dict(self) -> dict:
+        last = next((e["data"] for e in reversed(self.events) if e["event"] == "progress"), None)
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "key": self.key,
+            "state": self.state,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "cancel_requested": self.cancel_requested,
+            "progress": last,
+            "result": self.result,
+            "error": self.error,
+            "error_type": self.error_type
+        }
+
+class JobManager:
+    def __init__(self, keep_finished: int = 50):
+        self.keep_finished = keep_finished
+        self.jobs = {}
+        self.active = {}
+        self.lock = threading.RLock()
+
+    def submit(self, kind, key, fn):
+        # fn(job) -> result dict; a job with the same kind and key that is still
+        # queued or running is returned instead of starting another one
+        with self.lock:
+            job = self.active.get((kind, key))
+            if job is not None:
+                return job, False
+
+            job = Job(kind, key)
+            self.jobs[job.id] = job
+            self.active[(kind, key)] = job
+            self.prune()
+
+        threading.Thread(target=self.run, args=(job, fn), name=f"job-{kind}-{job.id[:8]}", daemon=True).start()
+        return job, True
+
+    def run(self, job, fn):
+        # fn calls job.start() when its turn comes; until then the job is "queued"
+        try:
+            job.check_cancelled()
+            self.complete(job, "done", result=fn(job))
+        except JobCancelled as e:
+            self.complete(job, "cancelled", error=e)
+        except Exception as e:
+            if not isinstance(e, RuntimeError):
+                traceback.print_exc()
+            self.complete(job, "failed", error=e)
+
+    def complete(self, job, state, result=None, error=None):
+        # finishing and leaving the active map happen under one lock, so submit never
+        # hands out a job that has already finished
+        with self.lock:
+            if self.active.get((job.kind, job.key)) is job:
+                del self.active[(job.kind, job.key)]
+            job.finish(state, result, error)
+
+    def cancel(self, job) -> bool:
+        # a queued job is cancelled right away; its thread skips the work when its
+        # turn comes. A running one stops at its next checkpoint
+        with self.lock:
+            if not job.request_cancel():
+                return False
+            if job.state == "queued":
+                self.complete(job, "cancelled", error=JobCancelled("Задача отменена"))
+        return True
+
+    def prune(self):
+        finished = [job for job in self.jobs.values() if job.finished]
+        for job in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job.id]
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self) -> list:
+        with self.lock:
+            return [job.to_dict() for job in self.jobs.values()]
+
+def sse_format(event) -> str:
+    if event is None:
+        return ": keep-alive\n\n"
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
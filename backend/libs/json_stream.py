@@ -0,0 +1,75 @@
+import io
+import gzip
+import json
+from collections.abc import Iterator
+
+from libs.config_store import atomic_write_with, GZIP_MAGIC
+
+FORMATS = ("json", "compact", "gzip")
+BUFFER_SIZE = 64 * 1024
+
+class JsonObject:
+    # an object whose (key, value) pairs come from an iterator; any iterator value
+    # (a generator of scenes, for example) is written as an array as it is consumed
+    def __init__(self, pairs):
+        self.pairs = pairs
+
+def format_for(path, fmt=None) -> str:
+    if fmt is None:
+        fmt = "gzip" if str(path).endswith(".gz") else "json"
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат: {fmt}")
+    return fmt
+
+def iter_json(value, indent=2, level=0):
+    # yields the same text json.dumps(value, indent=indent, ensure_ascii=False) would
+    # produce, without holding the whole document in memory
+    if isinstance(value, JsonObject):
+        yield from iter_container("{", "}", value.pairs, indent, level, keyed=True)
+    elif isinstance(value, Iterator):
+        yield from iter_container("[", "]", value, indent, level, keyed=False)
+    else:
+        text = json.dumps(value, ensure_ascii=False, indent=indent,
+                          separators=(",", ": ") if indent is not None else (",", ":"))
+        if indent and level:
+            # newlines inside strings are escaped, so every raw newline is indentation
+            text = text.replace("\n", "\n" + " " * (indent * level))
+        yield text
+
+def iter_container(open_char, close_char, entries, indent, level, keyed):
+    def newline(depth):
+        return "\n" + " " * (indent * depth) if indent is not None else ""
+    key_sep = ": " if indent is not None else ":"
+
+    empty = True
+    yield open_char
+    for entry in entries:
+        yield ("" if empty else ",") + newline(level + 1)
+        if keyed:
+            key, entry = entry
+            yield json.dumps(key, ensure_ascii=False) + key_sep
+        yield from iter_json(entry, indent, level + 1)
+        empty = False
+    yield ("" if empty else newline(level)) + close_char
+
+def write_json(f, value, fmt="json"):
+    indent = 2 if fmt == "json" else None
+    if fmt == "gzip":
+        with gzip.GzipFile(fileobj=f, mode="wb", mtime=0) as gz, io.BufferedWriter(gz, BUFFER_SIZE) as out:
+            for chunk in iter_json(value, indent):
+                out.write(chunk.encode("utf-8"))
+    else:
+        for chunk in iter_json(value, indent):
+            f.write(chunk.encode("utf-8"))
+
+def save_json(path, value, fmt=None):
+    fmt = format_for(path, fmt)
+    atomic_write_with(path, lambda f: write_json(f, value, fmt))
+
+def load_json(path):
+    # compressed files are recognised by content, whatever their name
+    with open(path, "rb") as f:
+        compressed = f.read(2) == GZIP_MAGIC
+    opener = gzip.open if compressed else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,199 @@
+import re
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# a small in-process registry rendered in the Prometheus text format; every metric
+# is labelled with a fixed set of label names
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_labels(names, values, extra=None) -> str:
+    pairs = [f'{n}="{escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def key(self, labels) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} {self.kind}"
+        with self.lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            yield from self.render_sample(key, value)
+
+    def render_sample(self, key, value):
+        yield f"{self.name}{format_labels(self.labels, key)} {format_value(value)}"
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self.key(labels)] = value
+
+    def replace(self, samples):
+        # samples: [(value, {label: value})]; swapped in whole, so a scrape never sees
+        # the series half rebuilt
+        values = {self.key(labels): value for value, labels in samples}
+        with self.lock:
+            self.values = values
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, description, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                # per-bucket counts (not cumulative), sum, count
+                entry = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            idx = bisect.bisect_left(self.buckets, value)
+            if idx < len(self.buckets):
+                entry[0][idx] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render_sample(self, key, value):
+        counts, total, count = value
+        cumulative = 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            yield f"{self.name}_bucket{format_labels(self.labels, key, ('le', format_value(bound)))} {cumulative}"
+        yield f"{self.name}_bucket{format_labels(self.labels, key, ('le', '+Inf'))} {count}"
+        yield f"{self.name}_sum{format_labels(self.labels, key)} {format_value(total)}"
+        yield f"{self.name}_count{format_labels(self.labels, key)} {count}"
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        # callbacks that refresh gauges right before a scrape
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, description, labels=()) -> Counter:
+        return self.register(Counter(name, description, labels))
+
+    def gauge(self, name, description, labels=()) -> Gauge:
+        return self.register(Gauge(name, description, labels))
+
+    def histogram(self, name, description, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, description, labels, buckets))
+
+    def add_collector(self, fn):
+        self.collectors.append(fn)
+
+    def render(self) -> str:
+        for fn in self.collectors:
+            try:
+                fn()
+            except Exception as e:
+                print(f"Не удалось собрать метрики: {e}")
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+obs_request_seconds = registry.histogram(
+    "obs_request_duration_seconds", "OBS websocket round-trip time by request type", ["request_type"])
+obs_request_errors = registry.counter(
+    "obs_request_errors_total", "OBS requests that failed or were rejected", ["request_type"])
+obs_batch_requests = registry.counter(
+    "obs_batch_requests_total", "Requests sent inside OBS request batches", ["request_type"])
+obs_connect_seconds = registry.histogram(
+    "obs_connect_duration_seconds", "Time spent connecting to OBS, including launching it, successful or not",
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0))
+obs_queue_wait_seconds = registry.histogram(
+    "obs_queue_wait_seconds", "Time an OBS operation waited for its turn in the queue", ["operation"])
+obs_queue_expired = registry.counter(
+    "obs_queue_expired_total", "OBS operations that ran out of time, waiting or inside OBS", ["operation"])
+
+http_request_seconds = registry.histogram(
+    "http_request_duration_seconds", "Request handling time by route", ["method", "route"])
+http_requests = registry.counter(
+    "http_requests_total", "Handled requests by route and status", ["method", "route", "status"])
+
+db_query_seconds = registry.histogram(
+    "db_query_duration_seconds", "SQL statement execution time", ["statement"])
+db_query_errors = registry.counter(
+    "db_query_errors_total", "SQL statements that raised", ["statement"])
+
+config_io_seconds = registry.histogram(
+    "config_io_duration_seconds", "Settings file read and write time", ["file", "op"])
+config_io_errors = registry.counter(
+    "config_io_errors_total", "Settings file reads and writes that failed", ["file", "op"])
+
+# refreshed by collectors at scrape time
+obs_connection_state = registry.gauge(
+    "obs_connection_state", "1 for the current state of the OBS connection", ["state"])
+obs_queue_waiting = registry.gauge(
+    "obs_queue_waiting", "OBS operations waiting for their turn")
+obs_queue_active = registry.gauge(
+    "obs_queue_active", "1 while an OBS operation holds the queue", ["operation"])
+jobs_by_state = registry.gauge(
+    "jobs", "Background jobs by kind and state", ["kind", "state"])
+fleet_host_ready = registry.gauge(
+    "obs_fleet_host_ready", "1 if the fleet host has a live connection", ["host"])
+template_cache = registry.gauge(
+    "template_cache", "Compiled templates, cached renders and render cache hits/misses", ["stat"])
+db_pool = registry.gauge(
+    "db_pool", "Database connection pool state", ["stat"])
+
+TABLE_RE = re.compile(r'\b(?:FROM|INTO|UPDATE|TABLE)\s+"?(\w+)', re.IGNORECASE)
+
+def statement_label(statement) -> str:
+    # "SELECT students", "INSERT student_scenarios": bounded cardinality, unlike the SQL text
+    words = (statement or "").split(None, 1)
+    if not words:
+        return "other"
+    verb = words[0].upper()
+    m = TABLE_RE.search(statement)
+    return f"{verb} {m.group(1)}" if m else verb
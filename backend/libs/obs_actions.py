@@ -1,11 +1,19 @@
 import os
-import psutil
+import sys
+import json
+import uuid
+import random
+import select
+import shutil
 import subprocess
 import time
 import traceback
 import socket
 import threading
-from obsws_python import ReqClient
+
+from libs import metrics
+from libs.obs_probes import PROBE_SCENE
+from libs.obs_process import ObsProcessTracker, default_obs_path
 
 class ObsNotRunningError(Exception):
     pass
@@ -16,13 +24,50 @@ class ObsConnectionError(Exception):
 class ObsActions:
     obs_instance = None
     obs_lock = threading.Lock()
+    process = ObsProcessTracker()
+
+    # obs-websocket v5 RequestBatchExecutionType
+    BATCH_SERIAL_REALTIME = 0
+    BATCH_SERIAL_FRAME = 1
+    BATCH_PARALLEL = 2
+
+    def __init__(self, host="127.0.0.1", port=4455, password=None, timeout=None):
+        from obsws_python import ReqClient
 
-    def __init__(self, host="127.0.0.1", port=4455, password=None):
         try:
-            self.client = ReqClient(host=host, port=port, password=password)
+            self.client = ReqClient(host=host, port=port, password=password, timeout=timeout)
         except Exception as e:
             traceback.print_exc()
             raise RuntimeError(f"Ошибка подключения к OBS WebSocket: {e}")
+        # every ReqClient method goes through send, so timing it covers them all
+        self.client.send = self.timed_send(self.client.send)
+
+    @staticmethod
+    def timed_send(send):
+        def timed(param, data=None, raw=False):
+            started = time.perf_counter()
+            try:
+                return send(param, data, raw)
+            except Exception:
+                metrics.obs_request_errors.inc(request_type=param)
+                raise
+            finally:
+                metrics.obs_request_seconds.observe(time.perf_counter() - started, request_type=param)
+        return timed
+
+    def is_alive(self) -> bool:
+        # cheap liveness check: peeks at the socket without sending anything, so it
+        # is safe to call while another thread is waiting for a response
+        ws = self.client.base_client.ws
+        if not ws.connected or ws.sock is None:
+            return False
+        try:
+            readable, _, _ = select.select([ws.sock], [], [], 0)
+            if readable:
+                return ws.sock.recv(1, socket.MSG_PEEK) != b""
+            return True
+        except (OSError, ValueError):
+            return False
 
     def is_connected(self) -> bool:
         try:
@@ -46,38 +91,46 @@ class ObsActions:
         except Exception as e:
             print(f"Не удалось закрыть OBS через WebSocket: {e}")
 
-        for proc in psutil.process_iter(['name']):
-            if proc.info['name'] and 'obs64.exe' in proc.info['name'].lower():
-                print("Попытка мягко завершить OBS...")
-                proc.terminate()
-                try:
-                    proc.wait(timeout=grace_period)
-                    print("OBS завершён корректно.")
-                except psutil.TimeoutExpired:
-                    print("OBS не завершился, убиваю процесс...")
-                    proc.kill()
+        ObsActions.process.terminate(grace_period)
 
     @staticmethod
     def start_obs(settings):
-        obs_path = settings.get("obs", {}).get(
-            "path", r"C:\Program Files\obs-studio\bin\64bit\obs64.exe"
-        )
-        obs_dir = settings.get("obs", {}).get(
-            "dir", r"C:\Program Files\obs-studio\bin\64bit"
-        )
+        obs_path = settings.get("obs", {}).get("path", default_obs_path())
+        obs_dir = settings.get("obs", {}).get("dir", os.path.dirname(obs_path))
 
         if not os.path.exists(obs_path):
-            raise ObsNotRunningError(f"OBS exe не найден по пути: {obs_path}")
+            found = shutil.which(os.path.basename(obs_path))
+            if not found:
+                raise ObsNotRunningError(f"OBS exe не найден по пути: {obs_path}")
+            obs_path, obs_dir = found, os.path.dirname(found)
 
-        locale_file = os.path.join(
-            os.path.dirname(os.path.dirname(obs_dir)),
-            "data", "obs-studio", "locale", "en-US.ini"
-        )
-        if not os.path.exists(locale_file):
-            raise ObsNotRunningError(f"Файл локализации OBS не найден: {locale_file}")
+        # the Windows build refuses to start outside its bin dir without the locale data
+        if sys.platform.startswith("win"):
+            locale_file = os.path.join(
+                os.path.dirname(os.path.dirname(obs_dir)),
+                "data", "obs-studio", "locale", "en-US.ini"
+            )
+            if not os.path.exists(locale_file):
+                raise ObsNotRunningError(f"Файл локализации OBS не найден: {locale_file}")
 
         print(f"Запускаю OBS: {obs_path}")
-        subprocess.Popen([obs_path], cwd=obs_dir)
+        ObsActions.process.add_name(obs_path)
+        ObsActions.process.launched(subprocess.Popen([obs_path], cwd=obs_dir))
+
+    @staticmethod
+    def backoff_delay(base_delay, attempt, max_delay=30):
+        # full jitter keeps several clients from hammering OBS in lockstep
+        return min(max_delay, base_delay * (2 ** (attempt - 1))) * random.uniform(0.5, 1.0)
+
+    @staticmethod
+    def wait_for_port(host: str, port: int, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            if ObsActions.is_port_open(host, port):
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.25)
 
     @staticmethod
     def ensure_obs_ready(cfg, settings,
@@ -85,25 +138,25 @@ class ObsActions:
         host = cfg.get("ws_host", "127.0.0.1")
         port = cfg.get("ws_port", 4455)
         ws_password = os.getenv("WS_PASSWORD")
+        ObsActions.process.add_name(settings.get("obs", {}).get("path"))
 
         with ObsActions.obs_lock:
             last_error = None
             for attempt in range(1, retries + 1):
                 try:
-                    process_exists = any(
-                        proc.info['name'] and 'obs64.exe' in proc.info['name'].lower()
-                        for proc in psutil.process_iter(['name'])
-                    )
+                    if not ObsActions.is_port_open(host, port):
+                        process_exists = ObsActions.process.is_running()
 
-                    if process_exists and not ObsActions.is_port_open(host, port):
-                        print("Обнаружен зависший процесс OBS, перезапускаю...")
-                        ObsActions.kill_obs()
-                        ObsActions.start_obs(settings)
+                        if process_exists and not ObsActions.wait_for_port(host, port, base_delay):
+                            print("Обнаружен зависший процесс OBS, перезапускаю...")
+                            ObsActions.kill_obs()
+                            ObsActions.start_obs(settings)
 
-                    if not process_exists:
-                        ObsActions.start_obs(settings)
+                        if not process_exists:
+                            ObsActions.start_obs(settings)
+
+                        ObsActions.wait_for_port(host, port, base_delay * (2 ** (attempt - 1)))
 
-                    time.sleep(base_delay * (2 ** (attempt - 1)))
                     ObsActions.obs_instance = ObsActions(host=host, port=port, password=ws_password)
 
                     if ObsActions.obs_instance.is_connected():
@@ -114,8 +167,10 @@ class ObsActions:
                     last_error = e
                     ObsActions.obs_instance = None
                     traceback.print_exc()
-                    delay = base_delay * (2 ** (attempt - 1))
-                    print(f"Попытка {attempt} не удалась, повтор через {delay} сек...")
+
+                if attempt < retries:
+                    delay = ObsActions.backoff_delay(base_delay, attempt)
+                    print(f"Попытка {attempt} не удалась, повтор через {delay:.1f} сек...")
                     time.sleep(delay)
 
             raise ObsConnectionError(
@@ -126,14 +181,16 @@ class ObsActions:
         try:
             scenes = self.client.get_scene_list().scenes
             for scene in scenes:
-                self.client.remove_scene(scene["sceneName"])
+                if scene["sceneName"] != PROBE_SCENE:
+                    self.client.remove_scene(scene["sceneName"])
         except Exception as e:
             traceback.print_exc()
             raise RuntimeError(f"Ошибка при удалении сцен: {e}")
 
-    def ensure_unique_scene_name(self, base_name="TempScene"):
-        scenes = self.client.get_scene_list().scenes
-        existing_names = {s["sceneName"] for s in scenes}
+    def ensure_unique_scene_name(self, base_name="TempScene", existing_names=None):
+        if existing_names is None:
+            scenes = self.client.get_scene_list().scenes
+            existing_names = {s["sceneName"] for s in scenes}
         if base_name not in existing_names:
             return base_name
         i = 2
@@ -141,13 +198,61 @@ class ObsActions:
             i += 1
         return f"{base_name}{i}"
 
-    def ensure_unique_input_name(self, base_name="TempCapture"):
-        resp = self.client.get_input_list()
-        inputs = resp.inputs
-        existing_names = {inp["inputName"] for inp in inputs}
+    def ensure_unique_input_name(self, base_name="TempCapture", existing_names=None):
+        if existing_names is None:
+            resp = self.client.get_input_list()
+            inputs = resp.inputs
+            existing_names = {inp["inputName"] for inp in inputs}
         if base_name not in existing_names:
             return base_name
         i = 2
         while f"{base_name}{i}" in existing_names:
             i += 1
         return f"{base_name}{i}"
+
+    def send_batch(self, requests, halt_on_failure=False, execution_type=BATCH_SERIAL_REALTIME):
+        # requests: list of (requestType, requestData); results keep the same order,
+        # requests skipped after a halt_on_failure stop come back as None
+        if not requests:
+            return []
+
+        batch_id = uuid.uuid4().hex
+        batch = []
+        for idx, (request_type, request_data) in enumerate(requests):
+            req = {"requestType": request_type, "requestId": str(idx)}
+            if request_data is not None:
+                req["requestData"] = request_data
+            batch.append(req)
+
+        ws = self.client.base_client.ws
+        started = time.perf_counter()
+        try:
+            ws.send(json.dumps({
+                "op": 8,
+                "d": {
+                    "requestId": batch_id,
+                    "haltOnFailure": halt_on_failure,
+                    "executionType": execution_type,
+                    "requests": batch
+                }
+            }))
+
+            while True:
+                response = json.loads(ws.recv())
+                if response.get("op") == 9 and response["d"].get("requestId") == batch_id:
+                    break
+        except Exception:
+            metrics.obs_request_errors.inc(request_type="RequestBatch")
+            raise
+        finally:
+            metrics.obs_request_seconds.observe(time.perf_counter() - started, request_type="RequestBatch")
+
+        results = [None] * len(requests)
+        for res in response["d"].get("results", []):
+            results[int(res["requestId"])] = res
+
+        for (request_type, _), res in zip(requests, results):
+            metrics.obs_batch_requests.inc(request_type=request_type)
+            if res is not None and not res["requestStatus"]["result"]:
+                metrics.obs_request_errors.inc(request_type=request_type)
+        return results
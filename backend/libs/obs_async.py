@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import uuid
+import base64
+import struct
+import asyncio
+import hashlib
+
+from libs import metrics
+from libs.obs_actions import ObsConnectionError
+from libs.obs_queue import ObsTimeoutError
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+class ObsRequestError(Exception):
+    def __init__(self, request_type, code, comment):
+        super().__init__(f"{request_type}: {comment} (код {code})")
+        self.request_type = request_type
+        self.code = code
+
+def auth_string(password, salt, challenge) -> str:
+    secret = base64.b64encode(hashlib.sha256((password + salt).encode()).digest()).decode()
+    return base64.b64encode(hashlib.sha256((secret + challenge).encode()).digest()).decode()
+
+class AsyncObsClient:
+    # an obs-websocket v5 client on asyncio streams. It keeps its own connection, so
+    # reads from async handlers neither take a worker thread nor wait for the OBS
+    # queue; responses are matched by requestId and many requests can be in flight
+    def __init__(self, host="127.0.0.1", port=4455, password=None, connect_timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.connect_timeout = connect_timeout
+
+        self.reader = None
+        self.writer = None
+        self.reader_task = None
+        self.pending = {}
+        self.connect_lock = None
+
+    @property
+    def connected(self) -> bool:
+        return self.reader_task is not None and not self.reader_task.done()
+
+    async def ensure_connected(self):
+        if self.connect_lock is None:
+            self.connect_lock = asyncio.Lock()
+        async with self.connect_lock:
+            if not self.connected:
+                try:
+                    await asyncio.wait_for(self.open(), self.connect_timeout)
+                except Exception as e:
+                    await self.close()
+                    raise ObsConnectionError(f"Ошибка подключения к OBS WebSocket: {e}") from e
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+        key = base64.b64encode(os.urandom(16)).decode()
+        self.writer.write((
+            f"GET / HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n"
+            "Sec-WebSocket-Protocol: obswebsocket.json\r\n\r\n"
+        ).encode())
+        await self.writer.drain()
+
+        head = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+        if " 101 " not in head.split("\r\n", 1)[0]:
+            raise ObsConnectionError(f"OBS отклонил websocket-соединение: {head.splitlines()[0]}")
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        if accept not in head:
+            raise ObsConnectionError("Неверный ответ на websocket-рукопожатие")
+
+        hello = await self.recv()
+        identify = {"rpcVersion": 1, "eventSubscriptions": 0}
+        auth = (hello or {}).get("d", {}).get("authentication")
+        if auth:
+            if not self.password:
+                raise ObsConnectionError("OBS WebSocket требует пароль")
+            identify["authentication"] = auth_string(self.password, auth["salt"], auth["challenge"])
+        await self.send({"op": 1, "d": identify})
+
+        identified = await self.recv()
+        if (identified or {}).get("op") != 2:
+            raise ObsConnectionError("OBS не подтвердил подключение")
+        self.reader_task = asyncio.create_task(self.read_loop())
+
+    async def close(self):
+        task, self.reader_task = self.reader_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except Exception:
+                pass
+            self.writer = None
+        self.fail_pending(ObsConnectionError("Соединение с OBS закрыто"))
+
+    def fail_pending(self, error):
+        pending, self.pending = self.pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    async def read_loop(self):
+        try:
+            while True:
+                message = await self.recv()
+                if message is None:
+                    break
+                # 7 = RequestResponse, 9 = RequestBatchResponse; events are not subscribed
+                if message.get("op") in (7, 9):
+                    future = self.pending.pop(message["d"].get("requestId"), None)
+                    # a response that arrives after its caller gave up is dropped here
+                    if future is not None and not future.done():
+                        future.set_result(message["d"])
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            pass
+        finally:
+            self.fail_pending(ObsConnectionError("Соединение с OBS потеряно"))
+
+    async def request(self, op, d, request_type, timeout):
+        await self.ensure_connected()
+        request_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+
+        started = time.perf_counter()
+        try:
+            await self.send({"op": op, "d": {**d, "requestId": request_id}})
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            metrics.obs_request_errors.inc(request_type=request_type)
+            # the connection stays usable: the late response has nobody to go to
+            raise ObsTimeoutError(f"OBS не ответил вовремя: {request_type}")
+        except Exception:
+            metrics.obs_request_errors.inc(request_type=request_type)
+            raise
+        finally:
+            self.pending.pop(request_id, None)
+            metrics.obs_request_seconds.observe(time.perf_counter() - started, request_type=request_type)
+
+    async def call(self, request_type, data=None, timeout=None) -> dict:
+        d = {"requestType": request_type}
+        if data:
+            d["requestData"] = data
+        response = await self.request(6, d, request_type, timeout)
+        status = response["requestStatus"]
+        if not status["result"]:
+            raise ObsRequestError(request_type, status.get("code"), status.get("comment"))
+        return response.get("responseData") or {}
+
+    async def send_batch(self, requests, halt_on_failure=False, execution_type=0, timeout=None) -> list:
+        # same contract as ObsActions.send_batch: raw results in request order, None
+        # for requests skipped after a halt_on_failure stop
+        if not requests:
+            return []
+        batch = []
+        for idx, (request_type, request_data) in enumerate(requests):
+            req = {"requestType": request_type, "requestId": str(idx)}
+            if request_data is not None:
+                req["requestData"] = request_data
+            batch.append(req)
+
+        response = await self.request(8, {
+            "haltOnFailure": halt_on_failure,
+            "executionType": execution_type,
+            "requests": batch
+        }, "RequestBatch", timeout)
+
+        results = [None] * len(requests)
+        for res in response.get("results", []):
+            results[int(res["requestId"])] = res
+        for (request_type, _), res in zip(requests, results):
+            metrics.obs_batch_requests.inc(request_type=request_type)
+            if res is not None and not res["requestStatus"]["result"]:
+                metrics.obs_request_errors.inc(request_type=request_type)
+        return results
+
+    async def send(self, message):
+        payload = json.dumps(message).encode("utf-8")
+        # client frames are always masked
+        header = bytes([0x81])
+        if len(payload) < 126:
+            header += bytes([0x80 | len(payload)])
+        elif len(payload) < 65536:
+            header += bytes([0x80 | 126]) + struct.pack(">H", len(payload))
+        else:
+            header += bytes([0x80 | 127]) + struct.pack(">Q", len(payload))
+        mask = os.urandom(4)
+        self.writer.write(header + mask + self.apply_mask(payload, mask))
+        await self.writer.drain()
+
+    async def send_control(self, opcode, data=b""):
+        mask = os.urandom(4)
+        self.writer.write(bytes([0x80 | opcode, 0x80 | len(data)]) + mask + self.apply_mask(data, mask))
+        await self.writer.drain()
+
+    @staticmethod
+    def apply_mask(data, mask) -> bytes:
+        if not data:
+            return data
+        key = (mask * (len(data) // 4 + 1))[:len(data)]
+        return (int.from_bytes(data, "big") ^ int.from_bytes(key, "big")).to_bytes(len(data), "big")
+
+    async def recv(self):
+        # one text message, reassembled from fragments; None once the server closes
+        payload = b""
+        while True:
+            b0, b1 = await self.reader.readexactly(2)
+            fin, opcode = b0 & 0x80, b0 & 0x0F
+            length = b1 & 0x7F
+            if length == 126:
+                length = struct.unpack(">H", await self.reader.readexactly(2))[0]
+            elif length == 127:
+                length = struct.unpack(">Q", await self.reader.readexactly(8))[0]
+            mask = await self.reader.readexactly(4) if b1 & 0x80 else None
+            data = await self.reader.readexactly(length) if length else b""
+            if mask:
+                data = self.apply_mask(data, mask)
+
+            if opcode == 0x8:
+                return None
+            if opcode == 0x9:
+                await self.send_control(0xA, data)
+                continue
+            if opcode in (0x0, 0x1, 0x2):
+                payload += data
+                if fin:
+                    return json.loads(payload.decode("utf-8"))
@@ -0,0 +1,97 @@
+import os
+import time
+import hashlib
+import threading
+
+from libs.config_store import serialize
+from libs.obs_reconciler import ObsReconciler
+
+class SceneCollections:
+    # every scenario lives in its own OBS scene collection. A collection is rebuilt
+    # only when the rendered scenario differs from the one it was built from (by
+    # content hash), otherwise switching is a single SetCurrentSceneCollection
+    def __init__(self, store, state_path, prefix: str = "", profile_reader=None):
+        self.store = store
+        self.state_path = state_path
+        self.prefix = prefix
+        self.profile_reader = profile_reader
+        self.lock = threading.Lock()
+        # the collection list OBS reported last, for listings that cannot ask it right now
+        self.listing = {"current": None, "available": None}
+
+    def name_for(self, scenario_name) -> str:
+        return f"{self.prefix}{scenario_name}"
+
+    @staticmethod
+    def digest(scenario_data) -> str:
+        return hashlib.sha256(serialize(scenario_data)).hexdigest()
+
+    def load_state(self) -> dict:
+        # collection name -> {"hash", "scenario", "built_at"}
+        if not os.path.exists(self.state_path):
+            return {}
+        return self.store.load(self.state_path)
+
+    def record(self, name, scenario_name, digest):
+        with self.lock:
+            state = self.load_state()
+            state[name] = {"hash": digest, "scenario": scenario_name, "built_at": time.time()}
+            self.store.write(self.state_path, state, delay=0)
+
+    def forget(self, name):
+        with self.lock:
+            state = self.load_state()
+            if state.pop(name, None) is not None:
+                self.store.write(self.state_path, state, delay=0)
+
+    def in_sync(self, scenario_name, digest, state=None) -> bool:
+        built = (self.load_state() if state is None else state).get(self.name_for(scenario_name))
+        return built is not None and built["hash"] == digest
+
+    def remember(self, current, available):
+        self.listing = {"current": current, "available": list(available)}
+
+    def modified(self, obs):
+        # something other than activate() changed the current collection (an export),
+        # so its recorded hash no longer describes it and the next switch rebuilds it
+        listing = obs.client.get_scene_collection_list()
+        self.remember(listing.current_scene_collection_name, listing.scene_collections)
+        self.forget(listing.current_scene_collection_name)
+
+    def activate(self, obs, scenario_name, scenario_data, force=False, progress=None):
+        name = self.name_for(scenario_name)
+        digest = self.digest(scenario_data)
+
+        listing = obs.client.get_scene_collection_list()
+        exists = name in listing.scene_collections
+        current = listing.current_scene_collection_name
+        built = self.load_state().get(name)
+        self.remember(name, listing.scene_collections + ([] if exists else [name]))
+
+        if exists and not force and built is not None and built["hash"] == digest:
+            if current != name:
+                obs.client.set_current_scene_collection(name)
+            return {"collection": name, "rebuilt": False, "switched": current != name}
+
+        if progress is not None:
+            progress("collection", collection=name, created=not exists)
+        # a new collection starts with OBS's default scene, the reconciler removes it;
+        # the collection belongs to the scenario, so extra scenes may always go
+        if not exists:
+            obs.client.create_scene_collection(name)
+        elif current != name:
+            obs.client.set_current_scene_collection(name)
+
+        # the recorded hash no longer describes the collection until the rebuild is done
+        self.forget(name)
+        plan = ObsReconciler(obs, allow_delete_scenes=True, progress=progress,
+                             profile_reader=self.profile_reader).apply(scenario_data)
+        self.record(name, scenario_name, digest)
+        return {"collection": name, "rebuilt": True, "switched": current != name, "summary": plan["summary"]}
+
+    def status(self, obs=None) -> dict:
+        # without obs, "current"/"available" are what OBS reported last and "live" is False
+        if obs is not None:
+            listing = obs.client.get_scene_collection_list()
+            self.remember(listing.current_scene_collection_name, listing.scene_collections)
+        return {"collections": self.load_state(), **self.listing, "live": obs is not None}
@@ -0,0 +1,165 @@
+import time
+import threading
+import traceback
+
+from libs import metrics
+from libs.obs_actions import ObsActions, ObsConnectionError
+from libs.obs_queue import is_timeout_error
+
+class ObsConnectionManager:
+    def __init__(self, cfg, settings, check_interval: float = 5.0,
+                 base_delay: float = 1.0, max_delay: float = 30.0, launch_wait: float = 10.0):
+        self.cfg = cfg
+        self.settings = settings
+        self.check_interval = check_interval
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # how long one attempt waits for a launched OBS to open its port
+        self.launch_wait = launch_wait
+
+        self.instance = None
+        self.state = "disconnected"
+        self.last_error = None
+        self.failures = 0
+        self.connected_at = None
+
+        self.listeners = []
+
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.wake_event = threading.Event()
+        self.thread = None
+
+    def get(self) -> ObsActions:
+        # requests never connect themselves: reconnecting (and launching OBS) is left
+        # to the health thread, so a request fails fast instead of sitting out retries
+        obs = self.instance
+        if obs is not None:
+            return obs
+        if self.state == "failed":
+            # the health thread retries on its own backoff
+            raise ObsConnectionError(f"OBS недоступен, повторите позже: {self.last_error}")
+        if self.state == "disconnected":
+            self.wake_event.set()
+        raise ObsConnectionError("OBS ещё подключается, повторите позже")
+
+    def connect(self) -> ObsActions:
+        with self.lock:
+            if self.instance is not None:
+                return self.instance
+
+            self.state = "connecting"
+            try:
+                with metrics.obs_connect_seconds.time():
+                    obs = self.open()
+            except Exception as e:
+                self.state = "failed"
+                self.last_error = str(e)
+                self.failures += 1
+                raise
+
+            self.instance = obs
+            self.state = "connected"
+            self.last_error = None
+            self.failures = 0
+            self.connected_at = time.time()
+
+        self.notify(obs)
+        return obs
+
+    def open(self) -> ObsActions:
+        # the local OBS is launched if it isn't running; one attempt per call, the
+        # health loop's backoff is the only retry policy
+        return ObsActions.ensure_obs_ready(self.cfg, self.settings, retries=1, base_delay=self.launch_wait)
+
+    def add_listener(self, fn):
+        # fn(obs) runs after every successful (re)connect, and right away if already connected
+        self.listeners.append(fn)
+        obs = self.instance
+        if obs is not None:
+            self.notify(obs, [fn])
+
+    def notify(self, obs, listeners=None):
+        for fn in listeners or list(self.listeners):
+            try:
+                fn(obs)
+            except Exception:
+                traceback.print_exc()
+
+    def mark_failed(self, error=None):
+        with self.lock:
+            obs, self.instance = self.instance, None
+            self.state = "disconnected"
+            if error is not None:
+                self.last_error = str(error)
+
+        if obs is not None:
+            try:
+                obs.client.disconnect()
+            except Exception:
+                pass
+
+    def report_error(self, error):
+        # called from request handlers: only connection-level failures drop the client.
+        # After a read timeout the late response is still in the socket, so that counts too
+        obs = self.instance
+        if obs is not None and (is_timeout_error(error) or not obs.is_alive()):
+            print(f"Соединение с OBS потеряно: {error}")
+            self.mark_failed(error)
+
+    def is_ready(self) -> bool:
+        return self.instance is not None
+
+    def status(self) -> dict:
+        return {
+            "ready": self.is_ready(),
+            "state": self.state,
+            "connected_at": self.connected_at,
+            "failures": self.failures,
+            "last_error": self.last_error
+        }
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.health_loop, name="obs-health", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=self.check_interval)
+        self.mark_failed()
+
+    def next_delay(self):
+        if self.failures == 0:
+            return self.check_interval
+        return ObsActions.backoff_delay(self.base_delay, self.failures, self.max_delay)
+
+    def health_loop(self):
+        # the first pass runs right away and doubles as the startup warm-up; a request
+        # that finds the connection dropped wakes the loop early
+        delay = 0
+        while not self.stop_event.is_set():
+            self.wake_event.wait(delay)
+            self.wake_event.clear()
+            if self.stop_event.is_set():
+                break
+            delay = self.next_delay()
+            obs = self.instance
+            if obs is not None and obs.is_alive():
+                continue
+
+            if obs is not None:
+                print("OBS не отвечает, переподключаюсь...")
+                self.mark_failed("connection lost")
+
+            try:
+                self.connect()
+            except ObsConnectionError:
+                pass
+            except Exception:
+                traceback.print_exc()
+            delay = self.next_delay()
@@ -1,230 +1,385 @@
-import json
-import obsws_python as obs
-
 from libs.hints import SKIP_NAMES
 from libs.obs_actions import ObsActions
+from libs.obs_probes import PROBE_SCENE
+from libs.obs_profiles import ObsProfileReader, CHANNEL_SETUPS, CHANNEL_COUNTS
+from libs.json_stream import JsonObject, save_json, load_json
+
 
 class OBSExportImport:
-    def __init__(self, obs: ObsActions):
+    def __init__(self, obs: ObsActions, profile_reader: ObsProfileReader = None, progress=None):
         self.obs = obs
+        self.profile_reader = profile_reader
+        # progress(stage, done, total, checkpoint=..., **info); may raise to cancel
+        # at checkpoints, so it is only called where stopping leaves OBS consistent
+        self.progress = progress
+
+    def report(self, stage, done=None, total=None, checkpoint=True, **info):
+        if self.progress is not None:
+            self.progress(stage, done, total, checkpoint=checkpoint, **info)
 
     def export_scene_collection(self):
-        result = self.obs.client.get_scene_list()
-        scenes = []
-        inputs = []
+        data = {}
+        for key, value in self.export_parts():
+            data[key] = list(value) if key == "scenes" else value
+        return data
 
-        try:
-            inputs_resp = self.obs.client.get_input_list()
-            for inp in inputs_resp.inputs:
-                if inp["inputName"] in SKIP_NAMES:
-                    try:
-                        settings_resp = self.obs.client.get_input_settings(inp["inputName"])
-                        inputs.append({
-                            "inputName": inp["inputName"],
-                            "inputKind": inp["inputKind"],
-                            "inputSettings": settings_resp.input_settings
-                        })
-                    except Exception:
-                        continue
-        except Exception:
-            pass
-
-        for scene in result.scenes:
-            scene_name = scene["sceneName"]
-            scene_data = {
-                "name": scene_name,
-                "items": [],
-                "filters": []
-            }
+    def export_parts(self, chunk_size=None):
+        # (key, value) pairs of the exported collection in file order; "scenes" is a
+        # generator that queries OBS chunk_size scenes at a time, so a streaming writer
+        # never holds more than one chunk. chunk_size=None reads everything in the
+        # same three round-trips as before
+        scene_list, input_list, transition_list, current_transition = self.query_batch([
+            ("GetSceneList", None),
+            ("GetInputList", None),
+            ("GetSceneTransitionList", None),
+            ("GetCurrentSceneTransition", None)
+        ])
+        scene_names = [s["sceneName"] for s in scene_list["scenes"] if s["sceneName"] != PROBE_SCENE]
+        self.report("scenes", 0, len(scene_names))
 
-            try:
-                flist = self.obs.client.get_source_filter_list(scene_name).filters
-                for f in flist:
-                    fsettings = self.obs.client.get_source_filter(scene_name, f["filterName"]).filterSettings
-                    scene_data["filters"].append({
-                        "name": f["filterName"],
-                        "kind": f["filterKind"],
-                        "settings": fsettings
-                    })
-            except Exception:
-                pass
+        size = chunk_size or max(len(scene_names), 1)
+        chunks = [scene_names[i:i + size] for i in range(0, len(scene_names), size)] or [[]]
+
+        # the settings of the inputs that are exported ride along with the first chunk
+        skip_inputs = [i for i in (input_list or {}).get("inputs", []) if i["inputName"] in SKIP_NAMES]
+        responses = self.query_batch(
+            [("GetInputSettings", {"inputName": i["inputName"]}) for i in skip_inputs]
+            + self.scene_requests(chunks[0])
+        )
 
-            items_resp = self.obs.client.get_scene_item_list(scene_name)
-            for item in items_resp.scene_items:
-                input_name = item["sourceName"]
-                filters = []
-
-                try:
-                    flist = self.obs.client.get_source_filter_list(input_name).filters
-                    for f in flist:
-                        fsettings = self.obs.client.get_source_filter(input_name, f["filterName"]).filterSettings
-                        filters.append({
-                            "name": f["filterName"],
-                            "kind": f["filterKind"],
-                            "settings": fsettings
-                        })
-                except Exception:
-                    pass
-
-                transform_resp = self.obs.client.get_scene_item_transform(scene_name, item["sceneItemId"])
-                transform = transform_resp.scene_item_transform
-
-                scene_data["items"].append({
-                    "sourceName": input_name,
-                    "transform": transform,
-                    "filters": filters
+        inputs = []
+        for inp, resp in zip(skip_inputs, responses[:len(skip_inputs)]):
+            if resp is not None:
+                inputs.append({
+                    "inputName": inp["inputName"],
+                    "inputKind": inp["inputKind"],
+                    "inputSettings": resp["inputSettings"]
                 })
 
-            scenes.append(scene_data)
+        yield "inputs", inputs
+        yield "scenes", self.iter_scenes(chunks, responses[len(skip_inputs):], len(scene_names))
+        yield "currentScene", scene_list["currentProgramSceneName"]
 
         transitions = []
-        try:
-            tlist = self.obs.client.get_transition_list().transitions
-            for t in tlist:
-                tsettings = self.obs.client.get_transition_settings(t["transitionName"]).transitionSettings
-                transitions.append({
-                    "name": t["transitionName"],
-                    "kind": t["transitionKind"],
-                    "settings": tsettings
-                })
-        except Exception:
-            pass
+        current_transition = current_transition or {}
+        for t in (transition_list or {}).get("transitions", []):
+            is_current = t["transitionName"] == current_transition.get("transitionName")
+            transitions.append({
+                "name": t["transitionName"],
+                "kind": t["transitionKind"],
+                "settings": (current_transition.get("transitionSettings") or {}) if is_current else {}
+            })
+        yield "transitions", transitions
 
-        profiles = []
-        current_profile = None
-        try:
-            plist = self.obs.client.get_profile_list().profiles
-            current_profile = self.obs.client.get_current_profile().profileName
-
-            for p in plist:
-                self.obs.client.set_current_profile(p["profileName"])
-                vsettings = self.obs.client.get_video_settings()
-                asettings = self.obs.client.get_audio_settings()
-
-                profiles.append({
-                    "name": p["profileName"],
-                    "video": {
-                        "baseWidth": vsettings.baseWidth,
-                        "baseHeight": vsettings.baseHeight,
-                        "outputWidth": vsettings.outputWidth,
-                        "outputHeight": vsettings.outputHeight,
-                        "fpsNumerator": vsettings.fpsNumerator,
-                        "fpsDenominator": vsettings.fpsDenominator
-                    },
-                    "audio": {
-                        "sampleRate": asettings.sampleRate,
-                        "channels": asettings.channels
-                    }
-                })
-        except Exception:
-            pass
+        self.report("profiles")
+        profiles, current_profile = self.export_profiles()
+        yield "profiles", profiles
+        yield "currentProfile", current_profile
+
+    @staticmethod
+    def scene_requests(scene_names):
+        # GetSceneItemList already carries every item's transform and GetSourceFilterList
+        # every filter's settings
+        return ([("GetSceneItemList", {"sceneName": name}) for name in scene_names]
+                + [("GetSourceFilterList", {"sourceName": name}) for name in scene_names])
+
+    def iter_scenes(self, chunks, first_responses, total):
+        # a source shared by several scenes has its filters queried once
+        source_filters = {}
+        done = 0
+        for index, chunk in enumerate(chunks):
+            responses = first_responses if index == 0 else self.query_batch(self.scene_requests(chunk))
+            items_resps = responses[:len(chunk)]
+            scene_filter_resps = responses[len(chunk):]
+
+            sources = []
+            for resp in items_resps:
+                for item in (resp or {}).get("sceneItems", []):
+                    if item["sourceName"] not in source_filters and item["sourceName"] not in sources:
+                        sources.append(item["sourceName"])
+            self.report("filters", 0, len(sources))
+            source_filters.update(zip(sources, (self.export_filters(resp) for resp in self.query_batch(
+                [("GetSourceFilterList", {"sourceName": src}) for src in sources]
+            ))))
+            self.report("filters", len(sources), len(sources))
+
+            for scene_name, items_resp, filters_resp in zip(chunk, items_resps, scene_filter_resps):
+                scene_data = {
+                    "name": scene_name,
+                    "items": [],
+                    "filters": self.export_filters(filters_resp)
+                }
+
+                for item in (items_resp or {}).get("sceneItems", []):
+                    input_name = item["sourceName"]
+                    scene_data["items"].append({
+                        "sourceName": input_name,
+                        "transform": item["sceneItemTransform"],
+                        "filters": source_filters.get(input_name, [])
+                    })
+
+                done += 1
+                self.report("scenes", done, total, scene=scene_name,
+                            items=len(scene_data["items"]), filters=len(scene_data["filters"]))
+                yield scene_data
+
+    @staticmethod
+    def live_profile_requests():
+        return [
+            ("GetVideoSettings", None),
+            ("GetProfileParameter", {"parameterCategory": "Audio", "parameterName": "SampleRate"}),
+            ("GetProfileParameter", {"parameterCategory": "Audio", "parameterName": "ChannelSetup"})
+        ]
+
+    @staticmethod
+    def live_profile(name, video, sample_rate, channel_setup):
+        if video is None:
+            return None
+
+        def param(resp, default):
+            value = (resp or {}).get("parameterValue") or (resp or {}).get("defaultParameterValue")
+            return value if value is not None else default
 
         return {
-            "inputs": inputs,
-            "scenes": scenes,
-            "currentScene": result.current_program_scene_name,
-            "transitions": transitions,
-            "profiles": profiles,
-            "currentProfile": current_profile
+            "name": name,
+            "video": {
+                "baseWidth": video["baseWidth"],
+                "baseHeight": video["baseHeight"],
+                "outputWidth": video["outputWidth"],
+                "outputHeight": video["outputHeight"],
+                "fpsNumerator": video["fpsNumerator"],
+                "fpsDenominator": video["fpsDenominator"]
+            },
+            "audio": {
+                "sampleRate": int(param(sample_rate, "48000")),
+                "channels": CHANNEL_COUNTS.get(param(channel_setup, "Stereo"), 2)
+            }
         }
 
-    def save_to_file(self, filename="scene_collection.json"):
-        data = self.export_scene_collection()
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+    def export_profiles(self):
+        # The live profile is read directly; other profiles come from their basic.ini.
+        # Switching is the last resort: at most one profile is read that way, in one
+        # batch that ends by restoring the original profile; the rest are skipped
+        profile_list, *live = self.query_batch([("GetProfileList", None)] + self.live_profile_requests())
+        if profile_list is None:
+            return [], None
+
+        current_profile = profile_list["currentProfileName"]
+        from_disk = self.profile_reader.get_profiles() if self.profile_reader else {}
+
+        found = {current_profile: self.live_profile(current_profile, *live)}
+        missing = []
+        for name in profile_list["profiles"]:
+            if name in found:
+                continue
+            if name in from_disk:
+                found[name] = from_disk[name]
+            else:
+                missing.append(name)
+
+        if missing:
+            name = missing.pop(0)
+            switched, *values = self.query_batch(
+                [("SetCurrentProfile", {"profileName": name})]
+                + self.live_profile_requests()
+                + [("SetCurrentProfile", {"profileName": current_profile})]
+            )[:4]
+            if switched is not None:
+                found[name] = self.live_profile(name, *values)
+            else:
+                missing.insert(0, name)
+
+        if missing:
+            print(f"Настройки профилей недоступны без переключения: {', '.join(missing)}")
+            self.report("profiles", checkpoint=False, unavailable=missing)
+
+        profiles = [found[name] for name in profile_list["profiles"] if found.get(name)]
+        return profiles, current_profile
+
+    def query_batch(self, requests):
+        results = self.obs.send_batch(requests, execution_type=ObsActions.BATCH_SERIAL_REALTIME)
+        return [
+            res.get("responseData", {}) if res and res["requestStatus"]["result"] else None
+            for res in results
+        ]
+
+    @staticmethod
+    def export_filters(resp):
+        return [{
+            "name": f["filterName"],
+            "kind": f["filterKind"],
+            "settings": f["filterSettings"]
+        } for f in (resp or {}).get("filters", [])]
+
+    def save_to_file(self, filename="scene_collection.json", fmt=None, chunk_size=20):
+        # streams scenes to disk as they are read; fmt is "json", "compact" or "gzip"
+        # (the default for a .gz filename). Returns every top-level value except the
+        # scenes, those are small
+        header = {}
+
+        def parts():
+            for key, value in self.export_parts(chunk_size):
+                if key != "scenes":
+                    header[key] = value
+                yield key, value
+
+        save_json(filename, JsonObject(parts()), fmt)
+        return header
 
     def import_scene_collection(self, data):
-        temp_scene = self.obs.ensure_unique_scene_name("TempImportScene")
+        lookup = self.obs.send_batch([("GetSceneList", None), ("GetInputList", None)])
+        self.check_results([("GetSceneList", None, False), ("GetInputList", None, False)], lookup)
+        existing_scenes = {s["sceneName"] for s in lookup[0]["responseData"]["scenes"]}
+        existing_inputs = {i["inputName"] for i in lookup[1]["responseData"]["inputs"]}
 
-        scenes = self.obs.client.get_scene_list().scenes
-        if not any(s["sceneName"] == temp_scene for s in scenes):
-            self.obs.client.create_scene(temp_scene)
+        temp_scene = self.obs.ensure_unique_scene_name("TempImportScene", existing_scenes)
+        structure, item_refs = self.plan_structure(data, temp_scene, existing_scenes, existing_inputs)
+        self.report("structure", 0, len(structure))
+
+        try:
+            results = self.send_plan(structure, halt_on_failure=False)
+            self.report("items", 0, len(item_refs), checkpoint=False)
+
+            details = []
+            created_filters = set()
+            for idx, scene_name, item in item_refs:
+                scene_item_id = results[idx]["responseData"]["sceneItemId"]
+                details.append(("SetSceneItemTransform", {
+                    "sceneName": scene_name,
+                    "sceneItemId": scene_item_id,
+                    "sceneItemTransform": item["transform"]
+                }, False))
+
+                src = item["sourceName"]
+                for f in item.get("filters", []):
+                    if (src, f["name"]) in created_filters:
+                        continue
+                    created_filters.add((src, f["name"]))
+                    details.append(("CreateSourceFilter", {
+                        "sourceName": src,
+                        "filterName": f["name"],
+                        "filterKind": f["kind"],
+                        "filterSettings": f["settings"]
+                    }, False))
+
+            self.send_plan(details, halt_on_failure=True)
+            self.report("items", len(item_refs), len(item_refs), checkpoint=False, filters=len(created_filters))
+            self.send_plan(self.plan_profiles(data), halt_on_failure=False)
+        finally:
+            try:
+                self.obs.client.remove_scene(temp_scene)
+            except Exception:
+                pass
+
+    def plan_structure(self, data, temp_scene, existing_scenes, existing_inputs):
+        steps = []
+        item_refs = []
+
+        if temp_scene not in existing_scenes:
+            steps.append(("CreateScene", {"sceneName": temp_scene}, False))
 
-        existing_inputs = {i["inputName"]: i for i in self.obs.client.get_input_list().inputs}
         for inp in data.get("inputs", []):
             name = inp["inputName"]
             if name in existing_inputs:
-                try:
-                    self.obs.client.set_input_settings(name, inp.get("inputSettings", {}), True)
-                except Exception:
-                    pass
+                steps.append(("SetInputSettings", {
+                    "inputName": name,
+                    "inputSettings": inp.get("inputSettings", {}),
+                    "overlay": True
+                }, True))
             else:
-                self.obs.client.create_input(
-                    sceneName=temp_scene,
-                    inputName=name,
-                    inputKind=inp["inputKind"],
-                    inputSettings=inp.get("inputSettings", {}),
-                    sceneItemEnabled=True
-                )
+                steps.append(("CreateInput", {
+                    "sceneName": temp_scene,
+                    "inputName": name,
+                    "inputKind": inp["inputKind"],
+                    "inputSettings": inp.get("inputSettings", {}),
+                    "sceneItemEnabled": True
+                }, False))
 
         for scene in data.get("scenes", []):
-            scene_name = scene["name"]
-            scenes = self.obs.client.get_scene_list().scenes
-            if not any(s["sceneName"] == scene_name for s in scenes):
-                self.obs.client.create_scene(scene_name)
-
-        current_scene = data.get("currentScene", "")
-        if current_scene:
-            existing_inputs = {i["inputName"]: i for i in self.obs.client.get_input_list().inputs}
-            for inp in data.get("inputs", []):
-                name = inp["inputName"]
-                if name in existing_inputs:
-                    try:
-                        self.obs.client.set_input_settings(name, inp.get("inputSettings", {}), True)
-                    except Exception:
-                        pass
-                else:
-                    self.obs.client.create_input(
-                        sceneName=current_scene,
-                        inputName=name,
-                        inputKind=inp["inputKind"],
-                        inputSettings=inp.get("inputSettings", {}),
-                        sceneItemEnabled=True
-                    )
+            if scene["name"] not in existing_scenes:
+                steps.append(("CreateScene", {"sceneName": scene["name"]}, False))
 
         for scene in data.get("scenes", []):
             scene_name = scene["name"]
 
             for f in scene.get("filters", []):
-                self.obs.client.create_source_filter(scene_name, f["name"], f["kind"], f["settings"])
+                steps.append(("CreateSourceFilter", {
+                    "sourceName": scene_name,
+                    "filterName": f["name"],
+                    "filterKind": f["kind"],
+                    "filterSettings": f["settings"]
+                }, False))
 
             for item in scene.get("items", []):
-                src = item["sourceName"]
-                si = self.obs.client.create_scene_item(scene_name, src)
-                self.obs.client.set_scene_item_transform(scene_name, si.scene_item_id, item["transform"])
+                item_refs.append((len(steps), scene_name, item))
+                steps.append(("CreateSceneItem", {
+                    "sceneName": scene_name,
+                    "sourceName": item["sourceName"],
+                    "sceneItemEnabled": True
+                }, False))
 
-                for f in item.get("filters", []):
-                    self.obs.client.create_source_filter(src, f["name"], f["kind"], f["settings"])
-
-        for t in data.get("transitions", []):
-            self.obs.client.create_transition(t["name"], t["kind"], t["settings"])
+        return steps, item_refs
 
+    @staticmethod
+    def plan_profiles(data):
+        steps = []
         for p in data.get("profiles", []):
-            self.obs.client.create_profile(p["name"])
-            self.obs.client.set_current_profile(p["name"])
-            self.obs.client.set_video_settings(
-                baseWidth=p["video"]["baseWidth"],
-                baseHeight=p["video"]["baseHeight"],
-                outputWidth=p["video"]["outputWidth"],
-                outputHeight=p["video"]["outputHeight"],
-                fpsNumerator=p["video"]["fpsNumerator"],
-                fpsDenominator=p["video"]["fpsDenominator"]
-            )
-            self.obs.client.set_audio_settings(
-                sampleRate=p["audio"]["sampleRate"],
-                channels=p["audio"]["channels"]
-            )
+            steps.append(("CreateProfile", {"profileName": p["name"]}, True))
+            steps.append(("SetCurrentProfile", {"profileName": p["name"]}, False))
+            steps.extend(OBSExportImport.profile_settings_steps(p))
 
         current_profile = data.get("currentProfile")
         if current_profile:
-            self.obs.client.set_current_profile(current_profile)
+            steps.append(("SetCurrentProfile", {"profileName": current_profile}, False))
 
-        try:
-            self.obs.client.remove_scene(temp_scene)
-        except Exception:
-            pass
+        return steps
+
+    @staticmethod
+    def profile_settings_steps(p):
+        # applied to whichever profile is current
+        return [
+            ("SetVideoSettings", {
+                "baseWidth": p["video"]["baseWidth"],
+                "baseHeight": p["video"]["baseHeight"],
+                "outputWidth": p["video"]["outputWidth"],
+                "outputHeight": p["video"]["outputHeight"],
+                "fpsNumerator": p["video"]["fpsNumerator"],
+                "fpsDenominator": p["video"]["fpsDenominator"]
+            }, False),
+            ("SetProfileParameter", {
+                "parameterCategory": "Audio",
+                "parameterName": "SampleRate",
+                "parameterValue": str(p["audio"]["sampleRate"])
+            }, False),
+            ("SetProfileParameter", {
+                "parameterCategory": "Audio",
+                "parameterName": "ChannelSetup",
+                "parameterValue": CHANNEL_SETUPS.get(p["audio"]["channels"], "Stereo")
+            }, False)
+        ]
+
+    def send_plan(self, steps, halt_on_failure):
+        if not steps:
+            return []
+        results = self.obs.send_batch(
+            [(request_type, request_data) for request_type, request_data, _ in steps],
+            halt_on_failure=halt_on_failure,
+            execution_type=ObsActions.BATCH_SERIAL_REALTIME
+        )
+        self.check_results(steps, results)
+        return results
+
+    @staticmethod
+    def check_results(steps, results):
+        for (request_type, request_data, optional), res in zip(steps, results):
+            if res is None or optional:
+                continue
+            status = res["requestStatus"]
+            if not status["result"]:
+                raise RuntimeError(
+                    f"OBS отклонил запрос {request_type} {request_data}: "
+                    f"{status.get('comment') or status.get('code')}"
+                )
 
     def load_from_file(self, filename="scene_collection.json"):
-        with open(filename, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        self.import_scene_collection(data)
+        self.import_scene_collection(load_json(filename))
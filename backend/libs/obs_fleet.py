@@ -0,0 +1,140 @@
+import os
+import time
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from libs.obs_actions import ObsActions
+from libs.obs_connection import ObsConnectionManager
+from libs.obs_queue import ObsRequestQueue, ObsTimeoutError
+
+class RemoteObsConnection(ObsConnectionManager):
+    # an OBS on another machine: connected to, never launched
+    def __init__(self, name, host, port=4455, password=None, connect_timeout: float = 5.0):
+        super().__init__({"ws_host": host, "ws_port": port}, {})
+        self.name = name
+        self.host = host
+        self.port = port
+        self.password = password
+        self.connect_timeout = connect_timeout
+        # every endpoint has its own queue, so hosts never wait on each other
+        self.queue = ObsRequestQueue()
+
+    def open(self) -> ObsActions:
+        return ObsActions(self.host, self.port, self.password, timeout=self.connect_timeout)
+
+    def get(self) -> ObsActions:
+        # no background warm-up thread here, so a host that is still being connected
+        # by another request is simply waited for
+        return self.instance or self.connect()
+
+    def status(self) -> dict:
+        return {"name": self.name, "host": self.host, "port": self.port, **super().status()}
+
+class ObsFleet:
+    def __init__(self, max_workers: int = 8, connect_timeout: float = 5.0):
+        self.connect_timeout = connect_timeout
+        self.endpoints = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="obs-fleet")
+
+    def sync(self, entries):
+        # entries: [{"name", "host", "port"}] from config.json; endpoints whose address
+        # did not change keep their connection
+        password = os.getenv("WS_PASSWORD")
+        wanted = {}
+        for entry in entries or []:
+            name = entry.get("name") or f"{entry['host']}:{entry.get('port', 4455)}"
+            wanted[name] = (entry["host"], entry.get("port", 4455), entry.get("password", password))
+
+        with self.lock:
+            stale = [
+                endpoint for name, endpoint in self.endpoints.items()
+                if (endpoint.host, endpoint.port, endpoint.password) != wanted.get(name)
+            ]
+            for endpoint in stale:
+                del self.endpoints[endpoint.name]
+            for name, (host, port, pw) in wanted.items():
+                if name not in self.endpoints:
+                    self.endpoints[name] = RemoteObsConnection(name, host, port, pw, self.connect_timeout)
+
+        for endpoint in stale:
+            endpoint.mark_failed()
+
+    def get(self, name):
+        return self.endpoints.get(name)
+
+    def names(self) -> list:
+        with self.lock:
+            return list(self.endpoints)
+
+    def status(self) -> list:
+        with self.lock:
+            endpoints = list(self.endpoints.values())
+        return [endpoint.status() for endpoint in endpoints]
+
+    def run_one(self, endpoint, operation, fn, expires_at):
+        # fn(obs) runs inside the endpoint's queue; the time left becomes its socket
+        # timeout, so a stalled host frees its worker instead of holding it
+        started = time.monotonic()
+        try:
+            obs = endpoint.get()
+            with endpoint.queue.turn(operation, deadline=expires_at - time.monotonic(), obs=obs):
+                result = fn(obs)
+            return {"status": "ok", **(result or {}), "elapsed": time.monotonic() - started}
+        except ObsTimeoutError as e:
+            if e.started:
+                endpoint.mark_failed(e)
+            return {"status": "timeout", "message": str(e), "elapsed": time.monotonic() - started}
+        except RuntimeError as e:
+            return {"status": "error", "message": str(e), "elapsed": time.monotonic() - started}
+        except Exception as e:
+            traceback.print_exc()
+            endpoint.report_error(e)
+            return {"status": "error", "message": str(e), "elapsed": time.monotonic() - started}
+
+    def run(self, names, operation, fn, deadline: float = 60.0, on_result=None):
+        # runs fn(obs) on every named host at once (bounded by max_workers) and returns
+        # {name: result}; the deadline covers the whole rollout, hosts still busy when
+        # it runs out are reported as timed out
+        expires_at = time.monotonic() + deadline
+        results = {}
+        futures = {}
+        reported = set()
+        report_lock = threading.Lock()
+
+        def report(name, result):
+            # every host reports once and only before run() returns: a straggler that
+            # finishes later must not emit into a job that has already settled
+            if on_result is None:
+                return
+            with report_lock:
+                if name in reported:
+                    return
+                reported.add(name)
+                on_result(name, result)
+
+        for name in names:
+            endpoint = self.get(name)
+            if endpoint is None:
+                results[name] = {"status": "error", "message": "Хост не найден"}
+                continue
+            future = self.executor.submit(self.run_one, endpoint, operation, fn, expires_at)
+            futures[future] = name
+            future.add_done_callback(lambda f, name=name: f.cancelled() or report(name, f.result()))
+
+        # a small grace lets the socket timeout inside run_one report first
+        done, pending = wait(futures, timeout=deadline + 1)
+        for future in done:
+            results[futures[future]] = future.result()
+        for future in pending:
+            future.cancel()
+            results[futures[future]] = {"status": "timeout", "message": f"Хост не ответил за {deadline} сек"}
+        for future, name in futures.items():
+            report(name, results[name])
+        return {name: results[name] for name in names}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for name in self.names():
+            self.endpoints[name].mark_failed()
@@ -0,0 +1,94 @@
+import threading
+import traceback
+
+PROBE_SCENE = "ObsManagerProbes"
+PROBE_PREFIX = "ObsManagerProbe_"
+
+# obs-websocket v5 RequestStatus.ResourceAlreadyExists
+RESOURCE_ALREADY_EXISTS = 601
+
+class ObsProbes:
+    def __init__(self):
+        self.obs = None
+        self.ready = set()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def input_name(kind: str) -> str:
+        return f"{PROBE_PREFIX}{kind}"
+
+    def attach(self, obs):
+        # probes left by a previous run are picked up through ResourceAlreadyExists
+        with self.lock:
+            self.obs = obs
+            self.ready = set()
+
+    def ensure(self, kinds):
+        missing = [k for k in kinds if k not in self.ready]
+        if not missing:
+            return
+
+        requests = [("CreateScene", {"sceneName": PROBE_SCENE})]
+        for kind in missing:
+            requests.append(("CreateInput", {
+                "sceneName": PROBE_SCENE,
+                "inputName": self.input_name(kind),
+                "inputKind": kind,
+                "inputSettings": {},
+                "sceneItemEnabled": False
+            }))
+
+        results = self.obs.send_batch(requests)
+        for kind, res in zip(missing, results[1:]):
+            status = res["requestStatus"]
+            if status["result"] or status["code"] == RESOURCE_ALREADY_EXISTS:
+                self.ready.add(kind)
+            else:
+                print(f"Не удалось создать пробный источник {kind}: {status.get('comment')}")
+
+    def list_property_items(self, queries, retry=True):
+        # queries: list of (inputKind, [propertyName candidates]); returns the items of
+        # the first candidate that worked for each query, or None
+        with self.lock:
+            if self.obs is None:
+                raise RuntimeError("Нет подключения к OBS")
+
+            self.ensure([kind for kind, _ in queries])
+
+            requests, targets = [], []
+            for idx, (kind, props) in enumerate(queries):
+                name = self.input_name(kind)
+                requests.append(("GetInputSettings", {"inputName": name}))
+                targets.append((idx, None))
+                for prop in props:
+                    requests.append(("GetInputPropertiesListPropertyItems", {"inputName": name, "propertyName": prop}))
+                    targets.append((idx, prop))
+
+            items = [None] * len(queries)
+            vanished = set()
+            for (idx, prop), res in zip(targets, self.obs.send_batch(requests)):
+                ok = res is not None and res["requestStatus"]["result"]
+                if prop is None:
+                    if not ok:
+                        vanished.add(queries[idx][0])
+                elif ok and items[idx] is None:
+                    items[idx] = res["responseData"]["propertyItems"]
+
+            # somebody removed the probe scene or inputs: recreate them once
+            self.ready -= vanished
+
+        if vanished and retry:
+            return self.list_property_items(queries, retry=False)
+        return items
+
+    def cleanup(self):
+        with self.lock:
+            if self.obs is None or not self.ready:
+                return
+            requests = [("RemoveInput", {"inputName": self.input_name(kind)}) for kind in sorted(self.ready)]
+            requests.append(("RemoveScene", {"sceneName": PROBE_SCENE}))
+            try:
+                self.obs.send_batch(requests)
+            except Exception:
+                traceback.print_exc()
+            self.ready = set()
@@ -0,0 +1,99 @@
+import os
+import sys
+import threading
+
+# process names as psutil reports them: obs64.exe on Windows, obs on Linux (including
+# flatpak) and "OBS" on macOS
+OBS_PROCESS_NAMES = ("obs64.exe", "obs32.exe", "obs.exe", "obs")
+
+def default_obs_path() -> str:
+    if sys.platform.startswith("win"):
+        return r"C:\Program Files\obs-studio\bin\64bit\obs64.exe"
+    if sys.platform == "darwin":
+        return "/Applications/OBS.app/Contents/MacOS/OBS"
+    return "/usr/bin/obs"
+
+class ObsProcessTracker:
+    # remembers the OBS process it launched or found and re-checks just that PID;
+    # the full process table is scanned only when nothing is tracked
+    def __init__(self, names=OBS_PROCESS_NAMES):
+        self.names = {n.lower() for n in names}
+        self.proc = None
+        self.lock = threading.Lock()
+
+    def add_name(self, path):
+        if path:
+            self.names.add(os.path.basename(path).lower())
+
+    def matches(self, name) -> bool:
+        return bool(name) and name.lower() in self.names
+
+    def remember(self, pid):
+        import psutil
+
+        try:
+            proc = psutil.Process(pid)
+        except psutil.Error:
+            return None
+        with self.lock:
+            self.proc = proc
+        return proc
+
+    def forget(self):
+        with self.lock:
+            self.proc = None
+
+    def tracked(self):
+        import psutil
+
+        proc = self.proc
+        if proc is None:
+            return None
+        try:
+            # is_running() also compares the creation time, so a recycled PID doesn't count
+            if proc.is_running() and proc.status() != psutil.STATUS_ZOMBIE:
+                return proc
+        except psutil.Error:
+            pass
+        self.forget()
+        return None
+
+    def scan(self):
+        import psutil
+
+        for proc in psutil.process_iter(["name"]):
+            if self.matches(proc.info["name"]):
+                with self.lock:
+                    self.proc = proc
+                return proc
+        return None
+
+    def find(self):
+        return self.tracked() or self.scan()
+
+    def is_running(self) -> bool:
+        return self.find() is not None
+
+    def launched(self, popen):
+        self.remember(popen.pid)
+
+    def terminate(self, grace_period: float = 5) -> bool:
+        import psutil
+
+        proc = self.find()
+        if proc is None:
+            return False
+
+        print("Попытка мягко завершить OBS...")
+        try:
+            proc.terminate()
+            try:
+                proc.wait(timeout=grace_period)
+                print("OBS завершён корректно.")
+            except psutil.TimeoutExpired:
+                print("OBS не завершился, убиваю процесс...")
+                proc.kill()
+        except psutil.NoSuchProcess:
+            pass
+        self.forget()
+        return True
@@ -0,0 +1,110 @@
+import os
+import sys
+import copy
+import threading
+import configparser
+
+CHANNEL_SETUPS = {1: "Mono", 2: "Stereo", 3: "2.1", 4: "4.0", 5: "4.1", 6: "5.1", 8: "7.1"}
+CHANNEL_COUNTS = {v: k for k, v in CHANNEL_SETUPS.items()}
+
+COMMON_FPS = {
+    "24 NTSC": (24000, 1001),
+    "25 PAL": (25, 1),
+    "29.97": (30000, 1001),
+    "50 PAL": (50, 1),
+    "59.94": (60000, 1001)
+}
+
+def default_config_dir() -> str:
+    if sys.platform.startswith("win"):
+        return os.path.join(os.getenv("APPDATA", os.path.expanduser("~")), "obs-studio")
+    if sys.platform == "darwin":
+        return os.path.expanduser("~/Library/Application Support/obs-studio")
+    return os.path.join(os.getenv("XDG_CONFIG_HOME", os.path.expanduser("~/.config")), "obs-studio")
+
+def parse_fps(video) -> tuple[int, int]:
+    fps_type = video.get("FPSType", "0")
+    try:
+        if fps_type == "1":
+            return int(video.get("FPSInt", "30")), 1
+        if fps_type == "2":
+            return int(video.get("FPSNum", "30")), int(video.get("FPSDen", "1"))
+        common = video.get("FPSCommon", "30")
+        return COMMON_FPS.get(common, (int(float(common)), 1))
+    except ValueError:
+        return 30, 1
+
+def parse_basic_ini(path) -> dict:
+    parser = configparser.RawConfigParser(strict=False)
+    parser.optionxform = str
+    with open(path, "r", encoding="utf-8-sig") as f:
+        parser.read_file(f)
+
+    general = parser["General"] if parser.has_section("General") else {}
+    video = parser["Video"] if parser.has_section("Video") else {}
+    audio = parser["Audio"] if parser.has_section("Audio") else {}
+
+    base_w = int(video.get("BaseCX", "1920"))
+    base_h = int(video.get("BaseCY", "1080"))
+    fps_num, fps_den = parse_fps(video)
+
+    return {
+        "name": general.get("Name") or os.path.basename(os.path.dirname(path)),
+        "video": {
+            "baseWidth": base_w,
+            "baseHeight": base_h,
+            "outputWidth": int(video.get("OutputCX", base_w)),
+            "outputHeight": int(video.get("OutputCY", base_h)),
+            "fpsNumerator": fps_num,
+            "fpsDenominator": fps_den
+        },
+        "audio": {
+            "sampleRate": int(audio.get("SampleRate", "48000")),
+            "channels": CHANNEL_COUNTS.get(audio.get("ChannelSetup", "Stereo"), 2)
+        }
+    }
+
+class ObsProfileReader:
+    def __init__(self, config_dir=None):
+        self.config_dir = config_dir or default_config_dir()
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    @property
+    def profiles_dir(self):
+        return os.path.join(self.config_dir, "basic", "profiles")
+
+    def read(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+
+        key = (st.st_mtime_ns, st.st_size)
+        with self.lock:
+            cached = self.cache.get(path)
+            if cached and cached[0] == key:
+                return cached[1]
+
+        try:
+            profile = parse_basic_ini(path)
+        except (OSError, configparser.Error, ValueError):
+            return None
+
+        with self.lock:
+            self.cache[path] = (key, profile)
+        return profile
+
+    def get_profiles(self) -> dict:
+        profiles = {}
+        try:
+            entries = list(os.scandir(self.profiles_dir))
+        except OSError:
+            return profiles
+
+        for entry in entries:
+            if entry.is_dir():
+                profile = self.read(os.path.join(entry.path, "basic.ini"))
+                if profile:
+                    profiles[profile["name"]] = copy.deepcopy(profile)
+        return profiles
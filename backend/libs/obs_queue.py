@@ -0,0 +1,118 @@
+import time
+import socket
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from libs import metrics
+
+class ObsTimeoutError(Exception):
+    def __init__(self, message, started=False):
+        super().__init__(message)
+        # started: the deadline ran out inside an OBS call, so the connection state is unknown
+        self.started = started
+
+def is_timeout_error(error) -> bool:
+    # obsws_python wraps socket timeouts in its own error; imported here so that
+    # importing the queue does not pull in the websocket stack
+    from websocket import WebSocketTimeoutException
+    from obsws_python.error import OBSSDKTimeoutError
+    return isinstance(error, (OBSSDKTimeoutError, WebSocketTimeoutException, socket.timeout))
+
+class ObsRequestQueue:
+    # OBS work runs one operation at a time, in arrival order. Each operation has a
+    # deadline covering both the wait for its turn and the OBS calls themselves
+    def __init__(self, deadlines=None, default_deadline: float = 30.0):
+        self.deadlines = dict(deadlines or {})
+        self.default_deadline = default_deadline
+
+        self.cond = threading.Condition()
+        self.waiting = deque()
+        self.active = None
+        self.local = threading.local()
+
+        self.completed = 0
+        self.expired = 0
+
+    def deadline_for(self, operation, deadline=None) -> float:
+        if deadline is not None:
+            return deadline
+        return self.deadlines.get(operation, self.default_deadline)
+
+    @contextmanager
+    def turn(self, operation, deadline=None, obs=None, check=None):
+        # nested turns from the thread that already holds the queue run inline.
+        # check() runs while waiting (and on every wake()); whatever it raises, such as
+        # a cancelled job's JobCancelled, gives up the place in the queue
+        if getattr(self.local, "holding", False):
+            yield
+            return
+
+        queued_at = time.monotonic()
+        expires_at = queued_at + self.deadline_for(operation, deadline)
+        ticket = (operation, expires_at)
+
+        with self.cond:
+            self.waiting.append(ticket)
+            try:
+                while self.active is not None or self.waiting[0] is not ticket:
+                    if check is not None:
+                        check()
+                    remaining = expires_at - time.monotonic()
+                    if remaining <= 0:
+                        self.expired += 1
+                        metrics.obs_queue_expired.inc(operation=operation)
+                        busy = self.active[0] if self.active else self.waiting[0][0]
+                        raise ObsTimeoutError(f"OBS занят ({busy}), {operation} не дождался очереди")
+                    self.cond.wait(remaining)
+            except BaseException:
+                # the ones behind us may be waiting for this ticket to leave the head
+                self.cond.notify_all()
+                raise
+            finally:
+                self.waiting.remove(ticket)
+                metrics.obs_queue_wait_seconds.observe(time.monotonic() - queued_at, operation=operation)
+            self.active = ticket
+
+        self.local.holding = True
+        previous = self.set_socket_timeout(obs, expires_at - time.monotonic())
+        try:
+            yield
+        except Exception as e:
+            if not is_timeout_error(e):
+                raise
+            self.expired += 1
+            metrics.obs_queue_expired.inc(operation=operation)
+            raise ObsTimeoutError(f"OBS не ответил вовремя: {operation}", started=True) from e
+        finally:
+            self.set_socket_timeout(obs, previous)
+            self.local.holding = False
+            with self.cond:
+                self.active = None
+                self.completed += 1
+                self.cond.notify_all()
+
+    def wake(self):
+        # waiters re-run their check(), e.g. after a job was cancelled
+        with self.cond:
+            self.cond.notify_all()
+
+    @staticmethod
+    def set_socket_timeout(obs, timeout):
+        # a blocked websocket read is the only thing that can overrun a deadline,
+        # so the socket itself gets the time that is left
+        ws = getattr(getattr(getattr(obs, "client", None), "base_client", None), "ws", None)
+        if ws is None:
+            return None
+        previous = ws.gettimeout()
+        ws.settimeout(None if timeout is None else max(timeout, 0.001))
+        return previous
+
+    def status(self) -> dict:
+        with self.cond:
+            return {
+                "active": self.active[0] if self.active else None,
+                "waiting": [operation for operation, _ in self.waiting],
+                "completed": self.completed,
+                "expired": self.expired
+            }
@@ -0,0 +1,346 @@
+from libs.obs_actions import ObsActions
+from libs.obs_export_import import OBSExportImport
+from libs.obs_probes import PROBE_SCENE
+
+FLOAT_TOLERANCE = 1e-6
+
+def values_differ(desired, live):
+    if isinstance(desired, dict):
+        if not isinstance(live, dict):
+            return True
+        return any(key not in live or values_differ(value, live[key]) for key, value in desired.items())
+    if isinstance(desired, bool) or isinstance(live, bool):
+        return desired != live
+    if isinstance(desired, (int, float)) and isinstance(live, (int, float)):
+        return abs(desired - live) > FLOAT_TOLERANCE
+    return desired != live
+
+class ObsReconciler:
+    def __init__(self, obs: ObsActions, allow_delete_scenes=False, progress=None, profile_reader=None):
+        self.obs = obs
+        self.exporter = OBSExportImport(obs, profile_reader, progress=progress)
+        self.allow_delete_scenes = allow_delete_scenes
+
+    def snapshot(self, data):
+        scene_list, input_list, profile_list, *live_profile = self.exporter.query_batch([
+            ("GetSceneList", None),
+            ("GetInputList", None),
+            ("GetProfileList", None)
+        ] + OBSExportImport.live_profile_requests())
+
+        state = {
+            "scenes": [s["sceneName"] for s in scene_list["scenes"]],
+            "inputs": {i["inputName"]: {"inputKind": i["inputKind"], "inputSettings": {}} for i in input_list["inputs"]},
+            "sceneItems": {},
+            "filters": {},
+            "profiles": [p for p in (profile_list or {}).get("profiles", [])],
+            "currentProfile": (profile_list or {}).get("currentProfileName")
+        }
+        # settings of existing profiles: the current one as OBS reports it, the others
+        # from their basic.ini when the OBS config dir is readable
+        state["profileSettings"] = {}
+        if data.get("profiles") and state["currentProfile"]:
+            if self.exporter.profile_reader is not None:
+                state["profileSettings"].update(self.exporter.profile_reader.get_profiles())
+            state["profileSettings"][state["currentProfile"]] = self.exporter.live_profile(
+                state["currentProfile"], *live_profile)
+
+        live_scenes = set(state["scenes"])
+        requests, targets = [], []
+
+        kinds = set()
+        for inp in data.get("inputs", []):
+            live = state["inputs"].get(inp["inputName"])
+            if live:
+                requests.append(("GetInputSettings", {"inputName": inp["inputName"]}))
+                targets.append(("settings", inp["inputName"]))
+                kinds.add(live["inputKind"])
+
+        for kind in sorted(kinds):
+            requests.append(("GetInputDefaultSettings", {"inputKind": kind}))
+            targets.append(("defaults", kind))
+
+        sources = []
+        for scene in data.get("scenes", []):
+            if scene["name"] in live_scenes:
+                requests.append(("GetSceneItemList", {"sceneName": scene["name"]}))
+                targets.append(("items", scene["name"]))
+                sources.append(scene["name"])
+            for item in scene.get("items", []):
+                src = item["sourceName"]
+                if (src in state["inputs"] or src in live_scenes) and src not in sources:
+                    sources.append(src)
+
+        for src in sources:
+            requests.append(("GetSourceFilterList", {"sourceName": src}))
+            targets.append(("filters", src))
+
+        defaults = {}
+        for (target, key), resp in zip(targets, self.exporter.query_batch(requests)):
+            if resp is None:
+                continue
+            if target == "settings":
+                state["inputs"][key]["inputSettings"] = resp["inputSettings"]
+            elif target == "defaults":
+                defaults[key] = resp["defaultInputSettings"]
+            elif target == "items":
+                state["sceneItems"][key] = resp["sceneItems"]
+            elif target == "filters":
+                state["filters"][key] = resp["filters"]
+
+        for live in state["inputs"].values():
+            if live["inputKind"] in defaults:
+                live["inputSettings"] = {**defaults[live["inputKind"]], **live["inputSettings"]}
+
+        return state
+
+    def diff(self, data, state):
+        changes = []
+
+        def change(action, target, request_type, request_data, **extra):
+            changes.append({
+                "action": action,
+                "target": target,
+                "requestType": request_type,
+                "requestData": request_data,
+                **extra
+            })
+
+        live_scenes = set(state["scenes"])
+        desired_scenes = [s["name"] for s in data.get("scenes", [])]
+        temp_scene = None
+        # RemoveInput takes the input's scene items and filters with it
+        removed_inputs = set()
+
+        for inp in data.get("inputs", []):
+            name = inp["inputName"]
+            settings = inp.get("inputSettings", {})
+            live = state["inputs"].get(name)
+
+            if live and live["inputKind"] != inp["inputKind"]:
+                change("remove", "input", "RemoveInput", {"inputName": name})
+                removed_inputs.add(name)
+                live = None
+
+            if not live:
+                if temp_scene is None:
+                    temp_scene = self.obs.ensure_unique_scene_name("TempImportScene", live_scenes)
+                    change("create", "scene", "CreateScene", {"sceneName": temp_scene}, temporary=True)
+                change("create", "input", "CreateInput", {
+                    "sceneName": temp_scene,
+                    "inputName": name,
+                    "inputKind": inp["inputKind"],
+                    "inputSettings": settings,
+                    "sceneItemEnabled": True
+                })
+            elif values_differ(settings, live["inputSettings"]):
+                change("update", "input", "SetInputSettings", {
+                    "inputName": name,
+                    "inputSettings": settings,
+                    "overlay": True
+                })
+
+        for name in desired_scenes:
+            if name not in live_scenes:
+                change("create", "scene", "CreateScene", {"sceneName": name})
+
+        if self.allow_delete_scenes:
+            for name in state["scenes"]:
+                if name not in desired_scenes and name != PROBE_SCENE:
+                    change("remove", "scene", "RemoveScene", {"sceneName": name})
+
+        desired_filters = {}
+        for scene in data.get("scenes", []):
+            desired_filters[scene["name"]] = list(scene.get("filters", []))
+            for item in scene.get("items", []):
+                known = desired_filters.setdefault(item["sourceName"], [])
+                for f in item.get("filters", []):
+                    if all(k["name"] != f["name"] for k in known):
+                        known.append(f)
+
+        for scene in data.get("scenes", []):
+            live_items = [
+                item for item in state["sceneItems"].get(scene["name"], [])
+                if item["sourceName"] not in removed_inputs
+            ]
+            self.diff_items(scene, live_items, change)
+
+        for source, filters in desired_filters.items():
+            live_filters = [] if source in removed_inputs else state["filters"].get(source, [])
+            self.diff_filters(source, filters, live_filters, change)
+
+        self.diff_profiles(data, state, changes)
+
+        if temp_scene is not None:
+            change("remove", "scene", "RemoveScene", {"sceneName": temp_scene}, temporary=True)
+
+        return changes
+
+    def diff_items(self, scene, live_items, change):
+        scene_name = scene["name"]
+        unmatched = list(live_items)
+        final_order = []
+
+        matches = []
+        for idx, item in enumerate(scene.get("items", [])):
+            live = next((li for li in unmatched if li["sourceName"] == item["sourceName"]), None)
+            if live:
+                unmatched.remove(live)
+            matches.append((idx, item, live))
+
+        for live in unmatched:
+            change("remove", "scene_item", "RemoveSceneItem", {
+                "sceneName": scene_name,
+                "sceneItemId": live["sceneItemId"]
+            })
+
+        for live in live_items:
+            match = next((m for m in matches if m[2] is live), None)
+            if match:
+                final_order.append(match[0])
+
+        for idx, item, live in matches:
+            if live:
+                if values_differ(item.get("transform", {}), live.get("sceneItemTransform", {})):
+                    change("update", "scene_item", "SetSceneItemTransform", {
+                        "sceneName": scene_name,
+                        "sceneItemId": live["sceneItemId"],
+                        "sceneItemTransform": item["transform"]
+                    })
+            else:
+                ref = f"{scene_name}#{idx}"
+                final_order.append(idx)
+                change("create", "scene_item", "CreateSceneItem", {
+                    "sceneName": scene_name,
+                    "sourceName": item["sourceName"],
+                    "sceneItemEnabled": True
+                }, ref=ref)
+                change("update", "scene_item", "SetSceneItemTransform", {
+                    "sceneName": scene_name,
+                    "sceneItemId": None,
+                    "sceneItemTransform": item.get("transform", {})
+                }, itemRef=ref)
+
+        if final_order != sorted(final_order):
+            for idx, item, live in matches:
+                extra = {} if live else {"itemRef": f"{scene_name}#{idx}"}
+                change("update", "scene_item", "SetSceneItemIndex", {
+                    "sceneName": scene_name,
+                    "sceneItemId": live["sceneItemId"] if live else None,
+                    "sceneItemIndex": idx
+                }, **extra)
+
+    def diff_filters(self, source, desired, live_filters, change):
+        live_by_name = {f["filterName"]: f for f in live_filters}
+
+        for f in desired:
+            live = live_by_name.pop(f["name"], None)
+            if live and live["filterKind"] != f["kind"]:
+                change("remove", "filter", "RemoveSourceFilter", {"sourceName": source, "filterName": f["name"]})
+                live = None
+
+            if not live:
+                change("create", "filter", "CreateSourceFilter", {
+                    "sourceName": source,
+                    "filterName": f["name"],
+                    "filterKind": f["kind"],
+                    "filterSettings": f["settings"]
+                })
+            elif values_differ(f["settings"], live.get("filterSettings", {})):
+                change("update", "filter", "SetSourceFilterSettings", {
+                    "sourceName": source,
+                    "filterName": f["name"],
+                    "filterSettings": f["settings"],
+                    "overlay": True
+                })
+
+        for name in live_by_name:
+            change("remove", "filter", "RemoveSourceFilter", {"sourceName": source, "filterName": name})
+
+    def diff_profiles(self, data, state, changes):
+        # only "profiles"/"currentProfile" are applied; a template's "profile" block
+        # just supplies ${...} variables for rendering
+        steps = []
+        for p in data.get("profiles", []):
+            if p["name"] not in state["profiles"]:
+                steps.append(("CreateProfile", {"profileName": p["name"]}, True))
+            else:
+                # an existing profile whose settings cannot be read is rewritten
+                known = state["profileSettings"].get(p["name"])
+                if known is not None and not values_differ(p["video"], known["video"]) \
+                        and not values_differ(p["audio"], known["audio"]):
+                    continue
+            steps.append(("SetCurrentProfile", {"profileName": p["name"]}, False))
+            steps.extend(OBSExportImport.profile_settings_steps(p))
+
+        for request_type, request_data, _ in steps:
+            changes.append({
+                "action": "create" if request_type == "CreateProfile" else "update",
+                "target": "profile",
+                "requestType": request_type,
+                "requestData": request_data
+            })
+
+        # switching profiles above leaves the last one current
+        current_profile = data.get("currentProfile") or state["currentProfile"]
+        if current_profile and (steps or current_profile != state["currentProfile"]):
+            changes.append({
+                "action": "update",
+                "target": "profile",
+                "requestType": "SetCurrentProfile",
+                "requestData": {"profileName": current_profile}
+            })
+
+    @staticmethod
+    def summarize(changes):
+        summary = {"create": 0, "update": 0, "remove": 0}
+        for c in changes:
+            if not c.get("temporary"):
+                summary[c["action"]] += 1
+        return summary
+
+    def apply(self, data, dry_run=False):
+        state = self.snapshot(data)
+        changes = self.diff(data, state)
+        result = {"changes": changes, "summary": self.summarize(changes)}
+        self.exporter.report("diff", total=len(changes), **result["summary"])
+        if dry_run or not changes:
+            return result
+
+        structure = [c for c in changes if "itemRef" not in c and not (c.get("temporary") and c["action"] == "remove")]
+        deferred = [c for c in changes if c not in structure]
+
+        # last point where a cancel leaves OBS untouched
+        self.exporter.report("apply", 0, len(changes))
+        try:
+            results = self.send_changes(structure, halt_on_failure=True)
+        except Exception:
+            self.send_changes([c for c in deferred if c.get("temporary")], halt_on_failure=False)
+            raise
+
+        item_ids = {
+            c["ref"]: res["responseData"]["sceneItemId"]
+            for c, res in zip(structure, results)
+            if "ref" in c
+        }
+
+        for c in deferred:
+            if "itemRef" in c:
+                c["requestData"]["sceneItemId"] = item_ids[c["itemRef"]]
+        self.exporter.report("apply", len(structure), len(changes), checkpoint=False)
+        self.send_changes(deferred, halt_on_failure=False)
+        self.exporter.report("apply", len(changes), len(changes), checkpoint=False)
+
+        return result
+
+    def send_changes(self, changes, halt_on_failure):
+        steps = [(c["requestType"], c["requestData"], c.get("temporary", False)) for c in changes]
+        if not steps:
+            return []
+        results = self.obs.send_batch(
+            [(request_type, request_data) for request_type, request_data, _ in steps],
+            halt_on_failure=halt_on_failure,
+            execution_type=ObsActions.BATCH_SERIAL_REALTIME
+        )
+        OBSExportImport.check_results(steps, results)
+        return results
@@ -0,0 +1,171 @@
+import io
+import csv
+import json
+
+from pydantic import ValidationError
+from sqlalchemy import select
+
+from models import Student
+from schemas import StudentCreate
+from libs.student_listing import STUDENT_FIELDS
+
+# every column except id, in COPY order
+BULK_COLUMNS = STUDENT_FIELDS[1:]
+COUNTER_COLUMNS = ("chapter", "paragraph", "section", "position", "task_number")
+CHUNK_ROWS = 5000
+MAX_REPORTED_ERRORS = 1000
+
+STAGING_DDL = """
+CREATE TEMP TABLE students_staging (
+    seq bigint NOT NULL,
+    first_name varchar(100),
+    last_name varchar(100),
+    email varchar(255),
+    city varchar(100),
+    address varchar(255),
+    phone varchar(50),
+    chapter integer,
+    paragraph integer,
+    section integer,
+    position integer,
+    task_number integer
+) ON COMMIT DROP
+"""
+
+UPSERT_SQL = f"""
+INSERT INTO students ({", ".join(BULK_COLUMNS)})
+SELECT DISTINCT ON (email) {", ".join(BULK_COLUMNS)}
+FROM students_staging
+ORDER BY email, seq DESC
+ON CONFLICT (email) DO UPDATE SET
+    {", ".join(f"{c} = EXCLUDED.{c}" for c in BULK_COLUMNS if c != "email")}
+RETURNING (xmax = 0) AS inserted
+"""
+
+def detect_format(mimetype, fmt=None) -> str:
+    fmt = (fmt or "").lower()
+    if fmt in ("csv", "ndjson"):
+        return fmt
+    if mimetype in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json"):
+        return "ndjson"
+    return "csv"
+
+def read_rows(stream, fmt):
+    # yields (line number, dict or error text) without reading the whole body
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, {k: v for k, v in row.items() if k is not None and v != ""}
+        return
+
+    for line_no, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, f"invalid JSON: {e}"
+            continue
+        if isinstance(row, dict):
+            yield line_no, row
+        else:
+            yield line_no, "expected a JSON object"
+
+def validate_row(row):
+    student = StudentCreate.model_validate(row)
+    values = student.model_dump(exclude={"scenario_ids"})
+    for column in COUNTER_COLUMNS:
+        if values[column] is None:
+            values[column] = 0
+    return values
+
+def import_students(db, stream, fmt) -> dict:
+    conn = db.connection().connection
+    cursor = conn.cursor()
+    cursor.execute(STAGING_DDL)
+
+    copy_sql = f"COPY students_staging (seq, {', '.join(BULK_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+    errors, rejected, accepted = [], 0, 0
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    pending = 0
+
+    def flush():
+        buffer.seek(0)
+        cursor.copy_expert(copy_sql, buffer)
+        buffer.seek(0)
+        buffer.truncate()
+
+    for line_no, row in read_rows(stream, fmt):
+        if isinstance(row, str):
+            problems = [{"loc": [], "msg": row}]
+        else:
+            try:
+                values = validate_row(row)
+                problems = None
+            except ValidationError as e:
+                problems = [{"loc": list(err["loc"]), "msg": err["msg"]} for err in e.errors()]
+
+        if problems:
+            rejected += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"line": line_no, "errors": problems})
+            continue
+
+        # NULL in COPY csv is an unquoted empty field
+        writer.writerow([line_no] + [values[c] for c in BULK_COLUMNS])
+        accepted += 1
+        pending += 1
+        if pending >= CHUNK_ROWS:
+            flush()
+            pending = 0
+
+    if pending:
+        flush()
+
+    inserted = updated = 0
+    if accepted:
+        cursor.execute(UPSERT_SQL)
+        for (was_inserted,) in cursor:
+            if was_inserted:
+                inserted += 1
+            else:
+                updated += 1
+    cursor.close()
+    db.commit()
+
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        # rows repeating an email within the upload collapse into the last one
+        "duplicates": accepted - inserted - updated,
+        "rejected": rejected,
+        "errors": errors,
+        "errors_truncated": rejected > len(errors)
+    }
+
+def export_students(db, fmt, fields=STUDENT_FIELDS, batch_size=1000):
+    stmt = (
+        select(*[getattr(Student, name) for name in fields])
+        .order_by(Student.id)
+        .execution_options(stream_results=True, yield_per=batch_size)
+    )
+    result = db.execute(stmt)
+
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for partition in result.partitions():
+            writer.writerows(partition)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+        return
+
+    for partition in result.partitions():
+        yield "".join(json.dumps(dict(zip(fields, row)), ensure_ascii=False) + "\n" for row in partition)
@@ -0,0 +1,152 @@
+import json
+import base64
+
+from sqlalchemy import select, and_, or_
+
+from models import Student, Scenario, student_scenario
+
+STUDENT_FIELDS = (
+    "id", "first_name", "last_name", "email", "city", "address", "phone",
+    "chapter", "paragraph", "section", "position", "task_number"
+)
+SORT_FIELDS = ("id", "last_name", "city", "chapter")
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+def encode_cursor(value, student_id) -> str:
+    raw = json.dumps([value, student_id], ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, student_id = json.loads(raw.decode("utf-8"))
+        return value, int(student_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+def parse_fields(fields) -> list:
+    if not fields:
+        return list(STUDENT_FIELDS)
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in STUDENT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+def parse_sort(sort) -> tuple:
+    sort = sort or "id"
+    descending = sort.startswith("-")
+    name = sort.lstrip("-")
+    if name not in SORT_FIELDS:
+        raise ValueError(f"Unsupported sort: {name}")
+    return name, descending
+
+def parse_limit(limit):
+    if limit is None or limit == "":
+        return None
+    limit = int(limit)
+    if limit <= 0:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_LIMIT)
+
+def after_cursor(column, value, student_id, descending):
+    # keyset condition on (column, id) for an ordering with NULLs last ascending
+    # and first descending, which is PostgreSQL's default and what the indexes hold
+    if column is Student.id:
+        return Student.id < student_id if descending else Student.id > student_id
+
+    if not descending:
+        if value is None:
+            return and_(column.is_(None), Student.id > student_id)
+        return or_(column > value, and_(column == value, Student.id > student_id), column.is_(None))
+
+    if value is None:
+        return or_(and_(column.is_(None), Student.id < student_id), column.is_not(None))
+    return or_(column < value, and_(column == value, Student.id < student_id))
+
+def build_query(args) -> tuple:
+    # args: request.args-like mapping; returns (statement, fields, sort name, limit)
+    fields = parse_fields(args.get("fields"))
+    sort, descending = parse_sort(args.get("sort"))
+    limit = parse_limit(args.get("limit"))
+    # "after" is the same keyset cursor under the name the UI uses
+    cursor = args.get("after") or args.get("cursor")
+    if cursor and limit is None:
+        limit = DEFAULT_LIMIT
+
+    # the cursor needs id and the sort column even when they are not requested
+    selected = list(dict.fromkeys(fields + ["id", sort]))
+    stmt = select(*[getattr(Student, name) for name in selected])
+
+    last_name = args.get("last_name")
+    if last_name:
+        stmt = stmt.where(Student.last_name.startswith(last_name, autoescape=True))
+    city = args.get("city")
+    if city:
+        stmt = stmt.where(Student.city == city)
+    chapter = args.get("chapter")
+    if chapter not in (None, ""):
+        stmt = stmt.where(Student.chapter == int(chapter))
+
+    column = getattr(Student, sort)
+    if cursor:
+        value, student_id = decode_cursor(cursor)
+        stmt = stmt.where(after_cursor(column, value, student_id, descending))
+
+    if column is Student.id:
+        stmt = stmt.order_by(Student.id.desc() if descending else Student.id)
+    elif descending:
+        stmt = stmt.order_by(column.desc().nulls_first(), Student.id.desc())
+    else:
+        stmt = stmt.order_by(column.asc().nulls_last(), Student.id)
+
+    if limit is not None:
+        # one extra row tells whether there is a next page
+        stmt = stmt.limit(limit + 1)
+
+    return stmt, fields, sort, limit
+
+def scenarios_by_student(db, student_ids) -> dict:
+    # one query for the whole page, the same IN-batch selectinload would issue
+    result = {student_id: [] for student_id in student_ids}
+    if not student_ids:
+        return result
+
+    stmt = (
+        select(student_scenario.c.student_id, Scenario.id, Scenario.name)
+        .join(Scenario, Scenario.id == student_scenario.c.scenario_id)
+        .where(student_scenario.c.student_id.in_(student_ids))
+        .order_by(student_scenario.c.student_id, Scenario.id)
+    )
+    for student_id, scenario_id, name in db.execute(stmt):
+        result[student_id].append({"id": scenario_id, "name": name})
+    return result
+
+def serialize_rows(db, rows, fields, include):
+    items = [{name: row[name] for name in fields} for row in rows]
+    if "scenarios" in include:
+        scenarios = scenarios_by_student(db, [row["id"] for row in rows])
+        for item, row in zip(items, rows):
+            item["scenarios"] = scenarios[row["id"]]
+    return items
+
+def list_students(db, args):
+    stmt, fields, sort, limit = build_query(args)
+    include = {name.strip() for name in (args.get("include") or "").split(",") if name.strip()}
+    rows = [row._mapping for row in db.execute(stmt)]
+
+    if limit is None:
+        return serialize_rows(db, rows, fields, include)
+
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor(last[sort], last["id"])
+
+    return {
+        "items": serialize_rows(db, page, fields, include),
+        "next_cursor": next_cursor,
+        "limit": limit
+    }
@@ -0,0 +1,131 @@
+import re
+import copy
+import json
+import threading
+from collections import OrderedDict
+
+# "${name}" placeholders anywhere in a JSON template; a dotted name such as
+# ${camera_settings.1.boundsWidth} is looked up through nested dicts and lists
+PLACEHOLDER_RE = re.compile(r"\$\{([A-Za-z_][\w.]*)\}")
+
+MISSING = object()
+
+def resolve(variables, name):
+    if name in variables:
+        return variables[name]
+    value = variables
+    for part in name.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return MISSING
+    return value
+
+class CompiledTemplate:
+    def __init__(self, document, digest):
+        self.document = document
+        self.digest = digest
+        # (path to the value, original string, placeholder name if the string is
+        # nothing but one placeholder, in which case the value keeps its type)
+        self.slots = []
+        self.names = set()
+        self.collect(document, ())
+
+    def collect(self, node, path):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                self.collect(value, path + (key,))
+        elif isinstance(node, list):
+            for idx, value in enumerate(node):
+                self.collect(value, path + (idx,))
+        elif isinstance(node, str):
+            names = PLACEHOLDER_RE.findall(node)
+            if names:
+                exact = PLACEHOLDER_RE.fullmatch(node)
+                self.slots.append((path, node, exact.group(1) if exact else None))
+                self.names.update(names)
+
+    def variables_key(self, variables) -> str:
+        # only the variables this template uses take part in the cache key
+        used = {}
+        for name in sorted(self.names):
+            value = resolve(variables, name)
+            used[name] = None if value is MISSING else value
+        return json.dumps(used, sort_keys=True, ensure_ascii=False, default=str)
+
+    def render(self, variables):
+        # unknown placeholders are left as they are
+        document = copy.deepcopy(self.document)
+        for path, text, exact in self.slots:
+            if exact is not None:
+                value = resolve(variables, exact)
+                if value is MISSING:
+                    continue
+            else:
+                value = PLACEHOLDER_RE.sub(lambda m: self.substitute(variables, m), text)
+
+            parent = document
+            for part in path[:-1]:
+                parent = parent[part]
+            parent[path[-1]] = value
+        return document
+
+    @staticmethod
+    def substitute(variables, match):
+        value = resolve(variables, match.group(1))
+        return match.group(0) if value is MISSING else str(value)
+
+class TemplateRenderer:
+    # templates are compiled once per content hash, rendered documents are kept per
+    # (template hash, used variables) so an unchanged export skips the render
+    def __init__(self, store, max_rendered: int = 32):
+        self.store = store
+        self.max_rendered = max_rendered
+        self.compiled = {}
+        self.rendered = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self, path) -> CompiledTemplate:
+        document, digest = self.store.entry(path)
+        with self.lock:
+            compiled = self.compiled.get(digest)
+        if compiled is None:
+            compiled = CompiledTemplate(copy.deepcopy(document), digest)
+            with self.lock:
+                self.compiled[digest] = compiled
+        return compiled
+
+    def render(self, compiled: CompiledTemplate, variables):
+        key = (compiled.digest, compiled.variables_key(variables))
+        with self.lock:
+            document = self.rendered.get(key)
+            if document is not None:
+                self.rendered.move_to_end(key)
+                self.hits += 1
+        if document is None:
+            document = compiled.render(variables)
+            with self.lock:
+                self.misses += 1
+                self.rendered[key] = document
+                while len(self.rendered) > self.max_rendered:
+                    self.rendered.popitem(last=False)
+                # compiled templates nobody renders any more go with their documents
+                live = {digest for digest, _ in self.rendered}
+                for digest in [d for d in self.compiled if d not in live and d != compiled.digest]:
+                    del self.compiled[digest]
+        # callers adjust the document (device inputs), the cached one stays intact
+        return copy.deepcopy(document)
+
+    def status(self) -> dict:
+        with self.lock:
+            return {
+                "templates": len(self.compiled),
+                "rendered": len(self.rendered),
+                "hits": self.hits,
+                "misses": self.misses
+            }
@@ -1,21 +1,12 @@
-import os
-import json
 from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config, pool
 from alembic import context
 
 from models import Base
+from db import load_db_settings, database_url
 
-with open(os.path.join("__settings__", "settings.json")) as f:
-    settings = json.load(f)["db"]
-
-db_password = os.getenv("DB_PASSWORD")
-
-DATABASE_URL = (
-    f"postgresql+psycopg2://{settings['user']}:{db_password}@"
-    f"{settings['host']}:{settings['port']}/{settings['database']}"
-)
+DATABASE_URL = database_url(load_db_settings())
 
 config = context.config
 
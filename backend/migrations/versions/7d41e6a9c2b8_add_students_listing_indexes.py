@@ -0,0 +1,37 @@
+"""add students listing indexes
+
+Revision ID: 7d41e6a9c2b8
+Revises: 3b2f9c7a12ef
+Create Date: 2026-10-18 12:10:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d41e6a9c2b8'
+down_revision: Union[str, Sequence[str], None] = '3b2f9c7a12ef'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_students_last_name_id", "students", ["last_name", "id"])
+    op.create_index("ix_students_city_id", "students", ["city", "id"])
+    op.create_index("ix_students_chapter_id", "students", ["chapter", "id"])
+    # prefix search on last_name (LIKE 'abc%') regardless of the database collation
+    op.create_index(
+        "ix_students_last_name_pattern",
+        "students",
+        ["last_name"],
+        postgresql_ops={"last_name": "varchar_pattern_ops"}
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_students_last_name_pattern", table_name="students")
+    op.drop_index("ix_students_chapter_id", table_name="students")
+    op.drop_index("ix_students_city_id", table_name="students")
+    op.drop_index("ix_students_last_name_id", table_name="students")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Table, CheckConstraint
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Table, CheckConstraint, Index
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -35,6 +35,10 @@ class Student(Base):
         CheckConstraint('section >= 0', name='check_section_nonnegative'),
         CheckConstraint('position >= 0', name='check_position_nonnegative'),
         CheckConstraint('task_number >= 0', name='check_task_number_nonnegative'),
+        Index('ix_students_last_name_id', 'last_name', 'id'),
+        Index('ix_students_city_id', 'city', 'id'),
+        Index('ix_students_chapter_id', 'chapter', 'id'),
+        Index('ix_students_last_name_pattern', 'last_name', postgresql_ops={'last_name': 'varchar_pattern_ops'}),
     )
 
 
@@ -1,20 +1,20 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 from typing import List, Optional
 
 
 class StudentBase(BaseModel):
-    first_name: str
-    last_name: str
-    email: EmailStr
-    city: Optional[str] = None
-    address: Optional[str] = None
-    phone: Optional[str] = None
+    first_name: str = Field(min_length=1, max_length=100)
+    last_name: str = Field(min_length=1, max_length=100)
+    email: EmailStr = Field(max_length=255)
+    city: Optional[str] = Field(default=None, max_length=100)
+    address: Optional[str] = Field(default=None, max_length=255)
+    phone: Optional[str] = Field(default=None, max_length=50)
 
-    chapter: Optional[int] = 0
-    paragraph: Optional[int] = 0
-    section: Optional[int] = 0
-    position: Optional[int] = 0
-    task_number: Optional[int] = 0
+    chapter: Optional[int] = Field(default=0, ge=0)
+    paragraph: Optional[int] = Field(default=0, ge=0)
+    section: Optional[int] = Field(default=0, ge=0)
+    position: Optional[int] = Field(default=0, ge=0)
+    task_number: Optional[int] = Field(default=0, ge=0)
 
 
 class StudentCreate(StudentBase):
@@ -38,14 +38,6 @@ class StudentUpdate(BaseModel):
     scenario_ids: Optional[List[int]] = None
 
 
-class Student(StudentBase):
-    id: int
-    scenarios: List[Scenario] = []
-
-    class Config:
-        orm_mode = True
-
-
 class ScenarioBase(BaseModel):
     name: str
     description: str
@@ -63,5 +55,11 @@ class ScenarioUpdate(BaseModel):
 class Scenario(ScenarioBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class Student(StudentBase):
+    id: int
+    scenarios: List[Scenario] = []
+
+    model_config = ConfigDict(from_attributes=True)
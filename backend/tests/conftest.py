@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.fake_obs_server import FakeObsServer, FakeObsState
+from libs.obs_actions import ObsActions
+
+@pytest.fixture
+def fake_obs():
+    state = FakeObsState()
+    state.populate(3, 4, 1)
+    server = FakeObsServer(state=state).start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def obs(fake_obs):
+    actions = ObsActions("127.0.0.1", fake_obs.port, timeout=5)
+    yield actions
+    actions.client.disconnect()
@@ -0,0 +1,176 @@
+import json
+import time
+import asyncio
+import threading
+
+import pytest
+
+import app as backend
+from asgi import ObsAsgiApp, WsgiBridge
+
+def http_scope(path, method="GET", query=b"", headers=()):
+    return {
+        "type": "http",
+        "http_version": "1.1",
+        "method": method,
+        "path": path,
+        "query_string": query,
+        "headers": list(headers),
+        "server": ("127.0.0.1", 5000),
+        "client": ("127.0.0.1", 50000)
+    }
+
+async def request(application, scope, body=b"", disconnect=None):
+    # runs one request through the ASGI app; disconnect: an asyncio.Event that ends the
+    # request from the client side
+    messages = []
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        if disconnect is None:
+            await asyncio.Event().wait()
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+    status = messages[0]["status"]
+    return status, b"".join(m.get("body", b"") for m in messages[1:])
+
+def slow_wsgi(release, started):
+    def wsgi(environ, start_response):
+        if environ["PATH_INFO"] == "/slow":
+            started.set()
+            release.wait(5)
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [environ["PATH_INFO"].encode()]
+    return wsgi
+
+def test_bridge_serves_other_requests_while_one_blocks():
+    release, started = threading.Event(), threading.Event()
+    bridge = WsgiBridge(slow_wsgi(release, started), workers=4)
+
+    async def main():
+        slow = asyncio.create_task(request(bridge, http_scope("/slow")))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        fast = await asyncio.wait_for(request(bridge, http_scope("/fast")), 2)
+        assert not slow.done()
+        release.set()
+        return fast, await slow
+
+    try:
+        assert asyncio.run(main()) == ((200, b"/fast"), (200, b"/slow"))
+    finally:
+        release.set()
+        bridge.shutdown()
+
+@pytest.fixture
+def connected(fake_obs):
+    previous = dict(backend.obs_connection.cfg)
+    backend.obs_connection.cfg.update({"ws_host": "127.0.0.1", "ws_port": fake_obs.port})
+    backend.obs_connection.connect()
+    try:
+        yield fake_obs
+    finally:
+        backend.obs_connection.mark_failed()
+        backend.obs_connection.cfg.clear()
+        backend.obs_connection.cfg.update(previous)
+
+def test_collections_are_listed_while_the_obs_queue_is_held(connected):
+    application = ObsAsgiApp(backend.app, workers=4)
+    holding, release = threading.Event(), threading.Event()
+
+    def export():
+        with backend.obs_queue.turn("export", deadline=10):
+            holding.set()
+            release.wait(5)
+
+    worker = threading.Thread(target=export)
+    worker.start()
+    holding.wait(5)
+
+    async def main():
+        try:
+            return await asyncio.wait_for(request(application, http_scope("/api/collections")), 5)
+        finally:
+            await application.obs.close()
+
+    try:
+        status, body = asyncio.run(main())
+        assert backend.obs_queue.status()["active"] == "export"
+    finally:
+        release.set()
+        worker.join()
+        application.bridge.shutdown()
+
+    listing = json.loads(body)
+    assert status == 200
+    assert listing["current"] == "Untitled"
+    assert "Untitled" in listing["available"]
+    assert listing["scenarios"]
+    assert all(entry["in_sync"] is False for entry in listing["scenarios"].values())
+
+def test_job_events_are_streamed_without_a_worker_thread():
+    application = ObsAsgiApp(backend.app, workers=1)
+    go = threading.Event()
+
+    def work(job):
+        job.start()
+        go.wait(5)
+        job.progress("apply", 1, 2)
+        return {"status": "ok"}
+
+    job, _ = backend.jobs.submit("test", f"stream-{time.monotonic()}", work)
+
+    async def main():
+        stream = asyncio.create_task(request(application, http_scope(f"/api/jobs/{job.id}/events")))
+        await asyncio.sleep(0.1)
+        # the only worker thread is free while the stream waits
+        fast = await asyncio.wait_for(request(application, http_scope("/api/jobs")), 2)
+        go.set()
+        return fast, await asyncio.wait_for(stream, 5)
+
+    try:
+        (fast_status, _), (status, body) = asyncio.run(main())
+    finally:
+        go.set()
+        application.bridge.shutdown()
+
+    assert fast_status == 200 and status == 200
+    events = [line.split(": ", 1)[1] for line in body.decode().splitlines() if line.startswith("event: ")]
+    assert events == ["running", "progress", "done"]
+    assert job.watchers == []
+
+def test_job_stream_stops_when_the_client_goes_away():
+    application = ObsAsgiApp(backend.app, workers=1)
+    go = threading.Event()
+
+    def work(job):
+        job.start()
+        go.wait(5)
+        return {}
+
+    job, _ = backend.jobs.submit("test", f"gone-{time.monotonic()}", work)
+
+    async def main():
+        disconnect = asyncio.Event()
+        stream = asyncio.create_task(request(application, http_scope(f"/api/jobs/{job.id}/events"),
+                                             disconnect=disconnect))
+        await asyncio.sleep(0.1)
+        disconnect.set()
+        return await asyncio.wait_for(stream, 2)
+
+    try:
+        status, _ = asyncio.run(main())
+        assert status == 200
+        assert job.watchers == []
+        assert not job.finished
+    finally:
+        go.set()
+        application.bridge.shutdown()
@@ -0,0 +1,103 @@
+import os
+import time
+
+from libs.backup_store import BackupStore
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+def blobs(store):
+    return sorted(os.listdir(store.blobs_dir))
+
+def test_identical_files_are_stored_once(tmp_path):
+    store = BackupStore(str(tmp_path))
+    store.add("backup_1", {"config.json": b"{}", "scenario.json": b"[1]"})
+    store.add("backup_2", {"config.json": b"{}", "scenario.json": b"[2]"})
+
+    assert len(blobs(store)) == 3
+    snapshot, files = store.read("backup_1")
+    assert files == {"config.json": b"{}", "scenario.json": b"[1]"}
+    assert store.get()["name"] == "backup_2"
+
+def test_duplicate_names_get_a_suffix(tmp_path):
+    store = BackupStore(str(tmp_path))
+    store.add("nightly", {"config.json": b"1"})
+    assert store.add("nightly", {"config.json": b"2"})["name"] == "nightly_2"
+
+def test_retention_keeps_last_hourly_and_daily(tmp_path):
+    store = BackupStore(str(tmp_path), keep_last=2, keep_hourly=2, keep_daily=3)
+    now = time.time()
+    # ten days, one snapshot every twelve hours, oldest first
+    for i in range(20):
+        store.add(f"b{i:02d}", {"config.json": str(i).encode()}, created=now - (19 - i) * 12 * HOUR, prune=False)
+
+    removed = store.prune()
+    kept = [s["name"] for s in store.list()]
+
+    # the two newest, plus the newest snapshot of each of the last three days
+    assert kept[:2] == ["b19", "b18"]
+    assert len(kept) <= 2 + 2 + 3
+    assert "b00" in removed and "b00" not in kept
+    days = {time.strftime("%Y-%m-%d", time.localtime(store.get(name)["created"])) for name in kept}
+    assert len(days) >= 3
+    # blobs of removed snapshots are gone, the rest are still readable
+    assert len(blobs(store)) == len(kept)
+    for name in kept:
+        assert store.read(name)[1]["config.json"] == str(int(name[1:])).encode()
+
+def test_shared_blob_survives_pruning(tmp_path):
+    store = BackupStore(str(tmp_path), keep_last=1, keep_hourly=0, keep_daily=0)
+    store.add("old", {"config.json": b"same", "scenario.json": b"old"}, created=time.time() - DAY)
+    store.add("new", {"config.json": b"same", "scenario.json": b"new"})
+
+    assert [s["name"] for s in store.list()] == ["new"]
+    assert store.read("new")[1] == {"config.json": b"same", "scenario.json": b"new"}
+    assert len(blobs(store)) == 2
+
+def test_manifest_is_replayed_and_survives_a_torn_line(tmp_path):
+    store = BackupStore(str(tmp_path), keep_last=1, keep_hourly=0, keep_daily=0)
+    store.add("a", {"config.json": b"a"}, created=time.time() - 10)
+    store.add("b", {"config.json": b"b"})
+    with open(store.manifest_path, "a", encoding="utf-8") as f:
+        f.write('{"op": "add", "name": "tor')
+
+    reopened = BackupStore(str(tmp_path))
+    assert [s["name"] for s in reopened.list()] == ["b"]
+    assert reopened.read()[1] == {"config.json": b"b"}
+
+def test_snapshot_added_after_a_torn_line_survives(tmp_path):
+    store = BackupStore(str(tmp_path), keep_last=2, keep_hourly=0, keep_daily=0)
+    store.add("a", {"config.json": b"a"}, created=time.time() - 10)
+    with open(store.manifest_path, "a", encoding="utf-8") as f:
+        f.write('{"op": "add", "name": "tor')
+
+    reopened = BackupStore(str(tmp_path), keep_last=2, keep_hourly=0, keep_daily=0)
+    reopened.add("c", {"config.json": b"c"})
+
+    replayed = BackupStore(str(tmp_path), keep_last=2, keep_hourly=0, keep_daily=0)
+    assert [s["name"] for s in replayed.list()] == ["c", "a"]
+    assert replayed.read("c")[1] == {"config.json": b"c"}
+    assert len(blobs(replayed)) == 2
+
+def test_unterminated_complete_line_is_kept(tmp_path):
+    store = BackupStore(str(tmp_path))
+    store.add("a", {"config.json": b"a"})
+    with open(store.manifest_path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        f.truncate()
+
+    reopened = BackupStore(str(tmp_path))
+    reopened.add("b", {"config.json": b"b"})
+    assert [s["name"] for s in BackupStore(str(tmp_path)).list()] == ["b", "a"]
+
+def test_legacy_folders_are_imported_once(tmp_path):
+    legacy = tmp_path / "backup_20240101"
+    legacy.mkdir()
+    (legacy / "config.json").write_bytes(b'{"old": true}')
+
+    store = BackupStore(str(tmp_path))
+    assert store.read("backup_20240101")[1] == {"config.json": b'{"old": true}'}
+
+    (tmp_path / "backup_20240102").mkdir()
+    (tmp_path / "backup_20240102" / "config.json").write_bytes(b"{}")
+    assert [s["name"] for s in BackupStore(str(tmp_path)).list()] == ["backup_20240101"]
@@ -0,0 +1,68 @@
+import json
+import os
+
+from libs.config_store import ConfigStore, serialize
+
+def test_load_is_cached_until_the_file_changes(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"a": 1}), encoding="utf-8")
+    store = ConfigStore()
+
+    first = store.load(path)
+    first["a"] = 2
+    assert store.load(path) == {"a": 1}
+
+    path.write_text(json.dumps({"a": 3, "b": 4}), encoding="utf-8")
+    assert store.load(path) == {"a": 3, "b": 4}
+
+def test_unchanged_document_is_not_rewritten(tmp_path):
+    path = str(tmp_path / "config.json")
+    store = ConfigStore()
+    store.write(path, {"a": 1}, delay=0)
+    # every real write replaces the file, so an unchanged inode means no write
+    inode = os.stat(path).st_ino
+    digest = store.digest(path)
+
+    assert store.write_file(os.path.abspath(path), {"a": 1}, serialize({"a": 1})) is False
+    store.write(path, {"a": 1}, delay=0)
+    assert os.stat(path).st_ino == inode
+    assert store.digest(path) == digest
+
+    store.write(path, {"a": 2}, delay=0)
+    assert store.load(path) == {"a": 2}
+    assert store.digest(path) != digest
+
+def test_debounced_writes_coalesce(tmp_path, monkeypatch):
+    path = str(tmp_path / "config.json")
+    store = ConfigStore()
+    written = []
+    write_file = store.write_file
+    monkeypatch.setattr(store, "write_file", lambda p, data, payload: written.append(data) or write_file(p, data, payload))
+
+    for value in range(5):
+        store.write(path, {"value": value}, delay=60)
+    # readers see the pending document before it reaches the disk
+    assert store.load(path) == {"value": 4}
+    assert not os.path.exists(path)
+
+    store.flush()
+    assert written == [{"value": 4}]
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {"value": 4}
+
+def test_immediate_write_cancels_pending_one(tmp_path):
+    path = str(tmp_path / "config.json")
+    store = ConfigStore()
+    store.write(path, {"value": "debounced"}, delay=60)
+    store.write(path, {"value": "now"}, delay=0)
+    store.flush()
+    assert store.load(path) == {"value": "now"}
+
+def test_invalidate_drops_pending_write(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"value": "restored"}), encoding="utf-8")
+    store = ConfigStore()
+    store.write(str(path), {"value": "stale"}, delay=60)
+    store.invalidate(str(path))
+    store.flush()
+    assert store.load(str(path)) == {"value": "restored"}
@@ -0,0 +1,62 @@
+import threading
+from types import SimpleNamespace
+
+from libs.device_inventory import DeviceInventory
+from libs.obs_probes import PROBE_PREFIX
+
+class CountingScan:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {"cameras": [self.calls], "microphones": []}
+
+def test_served_from_cache_until_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("libs.device_inventory.time.monotonic", lambda: now[0])
+    scan = CountingScan()
+    inventory = DeviceInventory(scan, ttl=10)
+
+    assert inventory.get() == inventory.get()
+    assert scan.calls == 1
+
+    now[0] += 11
+    assert inventory.get()["cameras"] == [2]
+    assert inventory.get(refresh=True)["cameras"] == [3]
+
+def test_input_events_invalidate_but_probes_do_not():
+    scan = CountingScan()
+    inventory = DeviceInventory(scan)
+    inventory.get()
+
+    inventory.on_input_settings_changed(SimpleNamespace(input_name=f"{PROBE_PREFIX}camera"))
+    inventory.get()
+    assert scan.calls == 1
+
+    inventory.on_input_created(SimpleNamespace(input_name="USB Camera"))
+    inventory.get()
+    assert scan.calls == 2
+
+def test_scan_overtaken_by_an_event_is_not_cached():
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def scan():
+        calls.append(1)
+        if len(calls) == 1:
+            started.set()
+            release.wait(5)
+        return {"scan": len(calls)}
+
+    inventory = DeviceInventory(scan)
+    worker = threading.Thread(target=inventory.get)
+    worker.start()
+    started.wait(5)
+    inventory.on_input_removed(SimpleNamespace(input_name="USB Camera"))
+    release.set()
+    worker.join(5)
+
+    # the first result was returned to its caller but not kept
+    assert inventory.data is None
+    assert inventory.get() == {"scan": 2}
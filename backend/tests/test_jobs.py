@@ -0,0 +1,188 @@
+import time
+import threading
+
+from libs.jobs import JobManager, JobCancelled
+from libs.obs_queue import ObsRequestQueue
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def blocking_job(release):
+    def work(job):
+        job.start()
+        release.wait(5)
+        job.progress("apply", 1, 1)
+        return {"status": "ok"}
+    return work
+
+def test_same_key_joins_the_active_job():
+    jobs = JobManager()
+    release = threading.Event()
+    first, created = jobs.submit("export", "Math", blocking_job(release))
+    again, created_again = jobs.submit("export", "Math", blocking_job(release))
+    other, created_other = jobs.submit("export", "Physics", blocking_job(release))
+
+    assert created and not created_again and created_other
+    assert again is first and other is not first
+    release.set()
+    assert first.wait(5) and other.wait(5)
+
+    # a finished job is never handed out again
+    fresh, created = jobs.submit("export", "Math", blocking_job(release))
+    assert created and fresh is not first
+    assert fresh.wait(5)
+
+def test_settled_job_has_left_the_active_map():
+    jobs = JobManager()
+    seen = []
+
+    def work(job):
+        def on_event():
+            # the terminal event is emitted only after the job left the active map
+            if job.finished and not seen:
+                seen.append(jobs.submit("export", "Math", lambda j: {})[1])
+        job.watch(on_event)
+        return {}
+
+    job, _ = jobs.submit("export", "Math", work)
+    wait_until(lambda: seen)
+    assert seen == [True]
+
+def test_queued_job_is_cancelled_right_away_and_leaves_the_queue():
+    jobs = JobManager()
+    queue = ObsRequestQueue(default_deadline=10)
+    holding, release = threading.Event(), threading.Event()
+    ran = []
+
+    def hold():
+        with queue.turn("export"):
+            holding.set()
+            release.wait(5)
+
+    def queued(job):
+        with queue.turn("import", check=job.check_cancelled):
+            job.start()
+            ran.append(job.id)
+        return {}
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    holding.wait(5)
+
+    job, _ = jobs.submit("import", "Math", queued)
+    wait_until(lambda: queue.status()["waiting"] == ["import"])
+    assert jobs.cancel(job)
+    assert job.state == "cancelled" and job.error_type == "JobCancelled"
+
+    # its thread gives up its place without waiting for the holder
+    queue.wake()
+    wait_until(lambda: queue.status()["waiting"] == [])
+    assert queue.status()["active"] == "export"
+
+    release.set()
+    holder.join()
+    time.sleep(0.05)
+    assert ran == []
+    assert [e["event"] for e in job.events].count("cancelled") == 1
+    assert not jobs.cancel(job)
+
+def test_jobs_behind_a_cancelled_one_are_not_delayed():
+    queue = ObsRequestQueue(default_deadline=10)
+    holding, release = threading.Event(), threading.Event()
+    cancelled = threading.Event()
+    order = []
+
+    def hold():
+        with queue.turn("export"):
+            holding.set()
+            release.wait(5)
+
+    def check():
+        if cancelled.is_set():
+            raise JobCancelled("Задача отменена")
+
+    def cancelled_waiter():
+        try:
+            with queue.turn("import", check=check):
+                order.append("import")
+        except JobCancelled:
+            order.append("gave up")
+
+    def next_waiter():
+        with queue.turn("switch"):
+            order.append("switch")
+
+    threads = [threading.Thread(target=hold)]
+    threads[0].start()
+    holding.wait(5)
+    for fn, name in ((cancelled_waiter, "import"), (next_waiter, "switch")):
+        t = threading.Thread(target=fn)
+        t.start()
+        threads.append(t)
+        wait_until(lambda: name in queue.status()["waiting"])
+
+    cancelled.set()
+    queue.wake()
+    wait_until(lambda: order == ["gave up"])
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert order == ["gave up", "switch"]
+
+def test_running_job_stops_at_its_next_checkpoint():
+    jobs = JobManager()
+    started, proceed = threading.Event(), threading.Event()
+    steps = []
+
+    def work(job):
+        job.start()
+        started.set()
+        proceed.wait(5)
+        job.progress("apply", 1, 3)
+        steps.append("after checkpoint")
+        return {}
+
+    job, _ = jobs.submit("export", "Math", work)
+    started.wait(5)
+    assert jobs.cancel(job)
+    assert job.state == "running" and job.cancel_requested
+    proceed.set()
+
+    assert job.wait(5)
+    assert job.state == "cancelled"
+    assert steps == []
+    assert [e["event"] for e in job.events] == ["running", "cancelling", "progress", "cancelled"]
+
+def test_failed_job_reports_the_error():
+    jobs = JobManager()
+
+    def work(job):
+        job.start()
+        raise RuntimeError("OBS отклонил запрос")
+
+    job, _ = jobs.submit("export", "Math", work)
+    assert job.wait(5)
+    assert (job.state, job.error, job.error_type) == ("failed", "OBS отклонил запрос", "RuntimeError")
+
+def test_events_stream_over_sse_and_resume_after_last_id():
+    import app as backend
+
+    release = threading.Event()
+    job, _ = backend.jobs.submit("test", f"sse-{time.monotonic()}", blocking_job(release))
+    client = backend.app.test_client()
+
+    response = client.get(f"/api/jobs/{job.id}/events")
+    assert response.mimetype == "text/event-stream"
+    release.set()
+    body = response.get_data(as_text=True)
+    events = [line[len("event: "):] for line in body.splitlines() if line.startswith("event: ")]
+    assert events == ["running", "progress", "done"]
+
+    # EventSource resends the last id it saw after a reconnect
+    resumed = client.get(f"/api/jobs/{job.id}/events", headers={"Last-Event-ID": "2"}).get_data(as_text=True)
+    assert [line for line in resumed.splitlines() if line.startswith("id: ")] == ["id: 3"]
+
+    assert client.get("/api/jobs/missing/events").status_code == 404
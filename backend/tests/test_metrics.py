@@ -0,0 +1,106 @@
+import threading
+
+import pytest
+
+from libs import metrics
+from libs.metrics import Registry, statement_label
+from libs.obs_queue import ObsRequestQueue, ObsTimeoutError
+
+def samples(text):
+    return [line for line in text.splitlines() if not line.startswith("#")]
+
+def test_exposition_format():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Handled requests", ["route"])
+    active = registry.gauge("active", "Active operation", ["operation"])
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+    requests.inc(route="/api/export")
+    requests.inc(2, route="/api/export")
+    requests.inc(route='say "hi"\n')
+    active.set(1, operation="export")
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value)
+
+    text = registry.render()
+    assert "# HELP requests_total Handled requests\n# TYPE requests_total counter\n" in text
+    assert "# TYPE active gauge" in text and "# TYPE latency_seconds histogram" in text
+    assert samples(text) == [
+        'requests_total{route="/api/export"} 3',
+        'requests_total{route="say \\"hi\\"\\n"} 1',
+        'active{operation="export"} 1',
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1.0"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        'latency_seconds_sum 4.05',
+        'latency_seconds_count 4'
+    ]
+    assert text.endswith("\n")
+
+def test_replace_swaps_the_labelled_series():
+    registry = Registry()
+    jobs = registry.gauge("jobs", "Jobs", ["kind", "state"])
+    jobs.replace([(2, {"kind": "export", "state": "running"}), (1, {"kind": "import", "state": "queued"})])
+    jobs.replace([(1, {"kind": "export", "state": "done"})])
+    assert samples(registry.render()) == ['jobs{kind="export",state="done"} 1']
+    jobs.replace([])
+    assert samples(registry.render()) == []
+
+def test_scrape_never_sees_a_half_rebuilt_gauge():
+    registry = Registry()
+    hosts = registry.gauge("ready", "Host ready", ["host"])
+    series = [(1, {"host": f"pc{i}"}) for i in range(20)]
+    hosts.replace(series)
+    stop = threading.Event()
+
+    def collector():
+        while not stop.is_set():
+            hosts.replace(series)
+
+    worker = threading.Thread(target=collector)
+    worker.start()
+    try:
+        for _ in range(500):
+            assert len(samples(registry.render())) == 20
+    finally:
+        stop.set()
+        worker.join()
+
+def test_failing_collector_does_not_break_the_scrape(capsys):
+    registry = Registry()
+    registry.gauge("up", "Up").set(1)
+    registry.add_collector(lambda: 1 / 0)
+    assert samples(registry.render()) == ["up 1"]
+    assert "Не удалось собрать метрики" in capsys.readouterr().out
+
+def test_expired_queue_waits_are_counted():
+    queue = ObsRequestQueue(default_deadline=0.05)
+    before = metrics.obs_queue_expired.values.get(("devices",), 0)
+    holding, release = threading.Event(), threading.Event()
+
+    def hold():
+        with queue.turn("export", deadline=5):
+            holding.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    holding.wait(5)
+    try:
+        with pytest.raises(ObsTimeoutError):
+            with queue.turn("devices"):
+                pass
+    finally:
+        release.set()
+        holder.join()
+
+    assert metrics.obs_queue_expired.values[("devices",)] == before + 1
+    text = metrics.registry.render()
+    assert "# TYPE obs_queue_expired_total counter" in text
+    assert 'obs_queue_expired_total{operation="devices"}' in text
+
+def test_statement_label_is_bounded():
+    assert statement_label('SELECT * FROM "students" WHERE id = 1') == "SELECT students"
+    assert statement_label("INSERT INTO student_scenarios VALUES (1, 2)") == "INSERT student_scenarios"
+    assert statement_label("BEGIN") == "BEGIN"
+    assert statement_label("") == "other"
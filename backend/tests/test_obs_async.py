@@ -0,0 +1,76 @@
+import time
+import asyncio
+
+import pytest
+
+from libs.obs_async import AsyncObsClient, ObsRequestError
+from libs.obs_actions import ObsConnectionError
+from libs.obs_queue import ObsTimeoutError
+
+def run(fake_obs, body):
+    async def main():
+        client = AsyncObsClient("127.0.0.1", fake_obs.port, connect_timeout=2)
+        try:
+            return await body(client)
+        finally:
+            await client.close()
+    return asyncio.run(main())
+
+def test_requests_are_pipelined_over_one_connection(fake_obs):
+    fake_obs.request_latency = 0.05
+
+    async def body(client):
+        await client.call("GetVersion")
+        started = time.perf_counter()
+        results = await asyncio.gather(*[client.call("GetSceneList") for _ in range(6)])
+        return results, time.perf_counter() - started
+
+    results, elapsed = run(fake_obs, body)
+    assert all(len(r["scenes"]) == 4 for r in results)
+    # all six are in flight at once; the fake answers them one after another
+    assert elapsed < 6 * 0.05 + 0.5
+
+def test_failed_request_raises_and_batch_keeps_order(fake_obs):
+    async def body(client):
+        with pytest.raises(ObsRequestError) as error:
+            await client.call("GetInputSettings", {"inputName": "missing"})
+        assert error.value.code == 600
+        return await client.send_batch([
+            ("GetSceneList", None),
+            ("GetInputSettings", {"inputName": "missing"}),
+            ("GetVersion", None)
+        ], halt_on_failure=True)
+
+    results = run(fake_obs, body)
+    assert results[0]["requestStatus"]["result"]
+    assert not results[1]["requestStatus"]["result"]
+    assert results[2] is None
+
+def test_timeout_leaves_the_connection_usable(fake_obs):
+    fake_obs.request_latency = 0.3
+
+    async def body(client):
+        await client.ensure_connected()
+        with pytest.raises(ObsTimeoutError):
+            await client.call("GetSceneList", timeout=0.05)
+        # the late response is dropped, the next one is matched by its own id
+        return await client.call("GetVersion", timeout=2)
+
+    assert run(fake_obs, body)["rpcVersion"] == 1
+
+def test_reconnects_after_the_server_drops(fake_obs):
+    async def body(client):
+        await client.call("GetVersion")
+        client.writer.transport.abort()
+        await asyncio.sleep(0.05)
+        assert not client.connected
+        return await client.call("GetVersion")
+
+    assert run(fake_obs, body)["rpcVersion"] == 1
+
+def test_unreachable_obs_is_a_connection_error():
+    async def main():
+        client = AsyncObsClient("127.0.0.1", 1, connect_timeout=1)
+        with pytest.raises(ObsConnectionError):
+            await client.call("GetVersion")
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+import json
+
+from libs.obs_export_import import OBSExportImport
+
+class ScriptedSocket:
+    # stands in for the websocket: answers a batch with whatever the test queued
+    def __init__(self, replies):
+        self.replies = replies
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(json.loads(message))
+
+    def recv(self):
+        batch_id = self.sent[-1]["d"]["requestId"]
+        return json.dumps(self.replies.pop(0)(batch_id))
+
+def result(request_id, ok=True, **data):
+    return {"requestId": str(request_id), "requestStatus": {"result": ok, "code": 100 if ok else 600},
+            "responseData": data}
+
+def test_results_follow_request_order(obs):
+    results = obs.send_batch([("GetSceneList", None), ("GetVersion", None), ("GetInputList", None)])
+    assert "scenes" in results[0]["responseData"]
+    assert "obsWebSocketVersion" in results[1]["responseData"]
+    assert "inputs" in results[2]["responseData"]
+
+def test_halted_requests_come_back_as_none(obs):
+    results = obs.send_batch([
+        ("GetSceneList", None),
+        ("RemoveScene", {"sceneName": "NoSuchScene"}),
+        ("GetInputList", None)
+    ], halt_on_failure=True)
+    assert results[0]["requestStatus"]["result"]
+    assert not results[1]["requestStatus"]["result"]
+    assert results[2] is None
+
+def test_responses_are_matched_by_batch_and_request_id(obs):
+    ws = ScriptedSocket([
+        # an event and the late answer of an earlier batch arrive first
+        lambda batch_id: {"op": 5, "d": {"eventType": "SceneCreated"}},
+        lambda batch_id: {"op": 9, "d": {"requestId": "stale", "results": [result(0, value="stale")]}},
+        lambda batch_id: {"op": 9, "d": {"requestId": batch_id, "results": [
+            result(1, value="second"), result(0, value="first")
+        ]}}
+    ])
+    real_ws, obs.client.base_client.ws = obs.client.base_client.ws, ws
+    try:
+        results = obs.send_batch([("GetA", None), ("GetB", {"x": 1})])
+    finally:
+        obs.client.base_client.ws = real_ws
+    assert [r["responseData"]["value"] for r in results] == ["first", "second"]
+    assert ws.sent[0]["d"]["requests"][1] == {"requestType": "GetB", "requestId": "1", "requestData": {"x": 1}}
+
+def test_export_round_trips_do_not_grow_with_scenes(fake_obs, obs):
+    # three for the scenes, inputs and filters, one for the profiles
+    fake_obs.reset_counts()
+    data = OBSExportImport(obs).export_scene_collection()
+    assert fake_obs.counts()["messages"] == 4
+    assert [s["name"] for s in data["scenes"]] == ["Scene", "Scene1", "Scene2", "Scene3"]
+    assert all(item["filters"] for s in data["scenes"][1:] for item in s["items"])
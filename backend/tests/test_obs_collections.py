@@ -0,0 +1,82 @@
+import time
+import threading
+
+import pytest
+
+from libs.config_store import ConfigStore
+from libs.obs_collections import SceneCollections
+
+SCENARIO = {
+    "inputs": [{"inputName": "Camera", "inputKind": "color_source_v3", "inputSettings": {}}],
+    "scenes": [{"name": "Main", "items": [{"sourceName": "Camera", "transform": {}}]}]
+}
+
+@pytest.fixture
+def collections(tmp_path):
+    return SceneCollections(ConfigStore(), str(tmp_path / "scene_collections.json"), prefix="Class ")
+
+def test_collection_is_rebuilt_only_when_the_scenario_changes(fake_obs, obs, collections):
+    first = collections.activate(obs, "Math", SCENARIO)
+    assert first["rebuilt"] and first["collection"] == "Class Math"
+    assert collections.in_sync("Math", SceneCollections.digest(SCENARIO))
+
+    obs.client.set_current_scene_collection("Untitled")
+    again = collections.activate(obs, "Math", SCENARIO)
+    assert again == {"collection": "Class Math", "rebuilt": False, "switched": True}
+    assert fake_obs.state.current_collection == "Class Math"
+
+    changed = {**SCENARIO, "scenes": SCENARIO["scenes"] + [{"name": "Extra", "items": []}]}
+    assert collections.activate(obs, "Math", changed)["rebuilt"]
+
+def test_export_into_a_collection_forgets_its_hash(obs, collections):
+    collections.activate(obs, "Math", SCENARIO)
+    collections.modified(obs)
+    assert not collections.in_sync("Math", SceneCollections.digest(SCENARIO))
+    assert collections.activate(obs, "Math", SCENARIO)["rebuilt"]
+
+def test_status_falls_back_to_the_last_listing(obs, collections):
+    assert collections.status() == {"collections": {}, "current": None, "available": None, "live": False}
+    collections.activate(obs, "Math", SCENARIO)
+
+    live = collections.status(obs)
+    assert live["live"] and live["current"] == "Class Math"
+    cached = collections.status()
+    assert not cached["live"]
+    assert (cached["current"], cached["available"]) == (live["current"], live["available"])
+
+def test_listing_does_not_wait_behind_a_running_export(fake_obs):
+    import app as backend
+
+    previous = dict(backend.obs_connection.cfg)
+    backend.obs_connection.cfg.update({"ws_host": "127.0.0.1", "ws_port": fake_obs.port})
+    backend.obs_connection.connect()
+    client = backend.app.test_client()
+    holding, release = threading.Event(), threading.Event()
+
+    def export():
+        with backend.obs_queue.turn("export", deadline=10):
+            holding.set()
+            release.wait(5)
+
+    try:
+        assert client.get("/api/collections").get_json()["live"]
+
+        worker = threading.Thread(target=export)
+        worker.start()
+        holding.wait(5)
+        started = time.monotonic()
+        listing = client.get("/api/collections").get_json()
+        elapsed = time.monotonic() - started
+        release.set()
+        worker.join()
+
+        assert elapsed < 2
+        assert not listing["live"]
+        assert listing["current"] == "Untitled"
+        # the connection is left alone, nothing was sent to OBS
+        assert backend.obs_connection.is_ready()
+    finally:
+        release.set()
+        backend.obs_connection.mark_failed()
+        backend.obs_connection.cfg.clear()
+        backend.obs_connection.cfg.update(previous)
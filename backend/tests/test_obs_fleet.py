@@ -0,0 +1,123 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from benchmarks.fake_obs_server import FakeObsServer, FakeObsState
+from libs.obs_fleet import ObsFleet
+
+@pytest.fixture
+def servers():
+    started = []
+
+    def start(**kwargs):
+        server = FakeObsServer(state=FakeObsState(), **kwargs).start()
+        started.append(server)
+        return server
+
+    yield start
+    for server in started:
+        server.stop()
+
+@pytest.fixture
+def fleet():
+    fleet = ObsFleet(max_workers=4, connect_timeout=2)
+    yield fleet
+    fleet.shutdown()
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def scene_count(obs):
+    return {"scenes": len(obs.client.get_scene_list().scenes)}
+
+def test_every_host_reports_within_the_deadline(servers, fleet):
+    fast = servers()
+    slow = servers(request_latencies={"GetSceneList": 3})
+    fleet.sync([
+        {"name": "fast", "host": "127.0.0.1", "port": fast.port},
+        {"name": "slow", "host": "127.0.0.1", "port": slow.port},
+        {"name": "down", "host": "127.0.0.1", "port": closed_port()}
+    ])
+
+    started = time.monotonic()
+    results = fleet.run(["fast", "slow", "down", "missing"], "export", scene_count, deadline=1.0)
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 2.5
+    assert results["fast"] == {"status": "ok", "scenes": 1, "elapsed": results["fast"]["elapsed"]}
+    assert results["slow"]["status"] == "timeout"
+    assert results["down"]["status"] == "error"
+    assert results["missing"] == {"status": "error", "message": "Хост не найден"}
+    # a host that timed out mid-call is reconnected next time
+    assert not fleet.get("slow").is_ready()
+    assert fleet.get("fast").is_ready()
+
+def test_hosts_run_in_parallel(servers, fleet):
+    hosts = [servers(request_latencies={"GetSceneList": 0.3}) for _ in range(4)]
+    fleet.sync([{"name": f"h{i}", "host": "127.0.0.1", "port": s.port} for i, s in enumerate(hosts)])
+    fleet.run(fleet.names(), "warm-up", lambda obs: None)
+
+    started = time.monotonic()
+    results = fleet.run(fleet.names(), "export", scene_count, deadline=5)
+    assert all(r["status"] == "ok" for r in results.values())
+    assert time.monotonic() - started < 1.0
+
+def test_results_are_reported_as_hosts_finish(servers, fleet):
+    server = servers()
+    fleet.sync([{"name": "a", "host": "127.0.0.1", "port": server.port}])
+    seen = []
+    done = threading.Event()
+
+    def on_result(name, result):
+        seen.append((name, result["status"]))
+        done.set()
+
+    fleet.run(["a"], "export", scene_count, deadline=5, on_result=on_result)
+    assert done.wait(1)
+    assert seen == [("a", "ok")]
+
+def test_stragglers_do_not_report_after_the_rollout(servers, fleet):
+    fast, slow = servers(), servers()
+    fleet.sync([
+        {"name": "fast", "host": "127.0.0.1", "port": fast.port},
+        {"name": "slow", "host": "127.0.0.1", "port": slow.port}
+    ])
+    finished = threading.Event()
+    seen = []
+
+    def apply(obs):
+        # busy outside OBS, so no socket timeout can cut it short
+        if obs.client.base_client.ws.sock.getpeername()[1] == slow.port:
+            time.sleep(2)
+            finished.set()
+        return scene_count(obs)
+
+    results = fleet.run(["fast", "slow"], "export", apply, deadline=0.3,
+                        on_result=lambda name, result: seen.append((name, result["status"])))
+    returned = list(seen)
+    assert finished.wait(3)
+    time.sleep(0.1)
+
+    assert results["slow"]["status"] == "timeout"
+    # both hosts were reported before run() returned, the straggler's late result was dropped
+    assert sorted(returned) == [("fast", "ok"), ("slow", "timeout")]
+    assert seen == returned
+
+def test_sync_keeps_unchanged_endpoints(servers, fleet):
+    server = servers()
+    entry = {"name": "a", "host": "127.0.0.1", "port": server.port}
+    fleet.sync([entry])
+    endpoint = fleet.get("a")
+
+    fleet.sync([entry])
+    assert fleet.get("a") is endpoint
+
+    fleet.sync([{**entry, "port": closed_port()}])
+    assert fleet.get("a") is not endpoint
+
+    fleet.sync([])
+    assert fleet.names() == []
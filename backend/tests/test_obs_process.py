@@ -0,0 +1,57 @@
+import subprocess
+import sys
+import time
+
+import psutil
+import pytest
+
+from libs.obs_process import ObsProcessTracker
+
+@pytest.fixture
+def child():
+    # a stand-in for OBS that sleeps until it is told to stop
+    popen = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+    yield popen
+    if popen.poll() is None:
+        popen.kill()
+    popen.wait()
+
+def no_scan(*args, **kwargs):
+    raise AssertionError("the process table was scanned")
+
+def test_launched_process_is_checked_by_pid(child, monkeypatch):
+    tracker = ObsProcessTracker(names=("not-obs",))
+    tracker.launched(child)
+    monkeypatch.setattr(psutil, "process_iter", no_scan)
+
+    assert tracker.is_running()
+    assert tracker.find().pid == child.pid
+
+def test_exited_process_is_forgotten(child, monkeypatch):
+    tracker = ObsProcessTracker(names=("not-obs",))
+    tracker.launched(child)
+    child.kill()
+    # until it is reaped the PID belongs to a zombie, which does not count as running
+    deadline = time.monotonic() + 5
+    while psutil.Process(child.pid).status() != psutil.STATUS_ZOMBIE and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert tracker.tracked() is None
+    assert tracker.proc is None
+    monkeypatch.setattr(psutil, "process_iter", lambda attrs: iter([]))
+    assert not tracker.is_running()
+
+def test_scan_finds_process_by_name_and_tracks_it(child):
+    name = psutil.Process(child.pid).name()
+    tracker = ObsProcessTracker(names=(name,))
+
+    found = tracker.find()
+    assert found is not None and tracker.proc is found
+
+def test_terminate_stops_tracked_process(child):
+    tracker = ObsProcessTracker(names=("not-obs",))
+    tracker.launched(child)
+
+    assert tracker.terminate(grace_period=5)
+    assert child.wait(timeout=5) is not None
+    assert tracker.proc is None
@@ -0,0 +1,125 @@
+import random
+
+import pytest
+
+from libs.obs_reconciler import ObsReconciler
+
+def item(source, x=0.0, filters=()):
+    return {"sourceName": source, "transform": {"positionX": x}, "filters": list(filters)}
+
+def color_filter(name="Filter1", kind="color_filter_v2", **settings):
+    return {"name": name, "kind": kind, "settings": settings or {"opacity": 1.0, "gamma": 0.0}}
+
+def scenario(*scenes, inputs=()):
+    return {"inputs": list(inputs), "scenes": [{"name": name, "items": items, "filters": []} for name, items in scenes]}
+
+def live_items(fake_obs, scene):
+    return [i["sourceName"] for i in fake_obs.state.scenes[scene]]
+
+def live_filters(fake_obs, source):
+    return {f["filterName"]: (f["filterKind"], f["filterSettings"]) for f in fake_obs.state.filters.get(source, [])}
+
+def test_random_reorders_come_out_in_order(fake_obs, obs):
+    rng = random.Random(7)
+    # Scene1 holds Input1_1..Input1_4; Scene2's inputs can be added to it
+    pool = [f"Input1_{i}" for i in range(1, 5)] + [f"Input2_{i}" for i in range(1, 3)]
+    for _ in range(40):
+        sources = rng.sample(pool, rng.randint(1, len(pool)))
+        data = scenario(("Scene1", [item(s, x=float(i)) for i, s in enumerate(sources)]))
+
+        ObsReconciler(obs).apply(data)
+        assert live_items(fake_obs, "Scene1") == sources
+        transforms = [i["sceneItemTransform"]["positionX"] for i in fake_obs.state.scenes["Scene1"]]
+        assert transforms == [float(i) for i in range(len(sources))]
+        # applying the same scenario again finds nothing to do
+        assert ObsReconciler(obs).apply(data, dry_run=True)["changes"] == []
+
+def test_items_are_added_and_removed(fake_obs, obs):
+    data = scenario(("Scene1", [item("Input1_2"), item("Input2_1", x=5.0), item("Input1_4")]))
+    plan = ObsReconciler(obs).apply(data)
+
+    assert live_items(fake_obs, "Scene1") == ["Input1_2", "Input2_1", "Input1_4"]
+    requests = [c["requestType"] for c in plan["changes"]]
+    assert requests.count("RemoveSceneItem") == 2
+    assert requests.count("CreateSceneItem") == 1
+    # the new item's transform waits for its id from the first batch
+    added = fake_obs.state.scenes["Scene1"][1]
+    assert added["sceneItemTransform"]["positionX"] == 5.0
+
+def test_new_scene_is_created_with_its_items(fake_obs, obs):
+    data = scenario(("Fresh", [item("Input1_1"), item("Input3_2", x=2.0)]))
+    ObsReconciler(obs).apply(data)
+    assert live_items(fake_obs, "Fresh") == ["Input1_1", "Input3_2"]
+    # without allow_delete_scenes the other scenes stay
+    assert "Scene1" in fake_obs.state.scenes
+
+def test_input_with_a_new_kind_is_recreated_with_its_items(fake_obs, obs):
+    data = scenario(
+        ("Scene1", [item("Input1_1", filters=[color_filter()]), item("Input1_2")]),
+        ("Scene2", [item("Input2_1"), item("Input1_1", x=3.0)]),
+        inputs=[{"inputName": "Input1_1", "inputKind": "image_source", "inputSettings": {"file": "a.png"}}]
+    )
+    plan = ObsReconciler(obs).apply(data)
+
+    assert fake_obs.state.inputs["Input1_1"] == {"kind": "image_source", "settings": {"file": "a.png"}}
+    # RemoveInput took the old items with it; the diff must not reuse their ids
+    assert live_items(fake_obs, "Scene1") == ["Input1_1", "Input1_2"]
+    assert live_items(fake_obs, "Scene2") == ["Input2_1", "Input1_1"]
+    assert fake_obs.state.scenes["Scene2"][1]["sceneItemTransform"]["positionX"] == 3.0
+    assert live_filters(fake_obs, "Input1_1") == {"Filter1": ("color_filter_v2", {"opacity": 1.0, "gamma": 0.0})}
+    # the input was created in a temporary scene that is gone again
+    assert not any(name.startswith("TempImportScene") for name in fake_obs.state.scenes)
+    assert [c["requestType"] for c in plan["changes"]].count("RemoveInput") == 1
+    assert ObsReconciler(obs).apply(data, dry_run=True)["changes"] == []
+
+def test_input_settings_are_overlaid(fake_obs, obs):
+    data = scenario(("Scene1", [item("Input1_1")]), inputs=[
+        {"inputName": "Input1_1", "inputKind": "color_source_v3", "inputSettings": {"color": 1}},
+        {"inputName": "Input1_2", "inputKind": "color_source_v3", "inputSettings": {"color": 4278190081}}
+    ])
+    plan = ObsReconciler(obs).apply(data)
+    updates = [c["requestData"]["inputName"] for c in plan["changes"] if c["requestType"] == "SetInputSettings"]
+    # Input1_2 already has that color
+    assert updates == ["Input1_1"]
+    assert fake_obs.state.inputs["Input1_1"]["settings"] == {"color": 1}
+
+def test_filters_are_created_updated_and_removed(fake_obs, obs):
+    data = scenario(("Scene1", [
+        # kind changed, plus a new one
+        item("Input1_1", filters=[color_filter(kind="sharpness_filter_v2", sharpness=0.5), color_filter("Filter2")]),
+        # settings changed
+        item("Input1_2", filters=[color_filter(opacity=0.5, gamma=0.0)]),
+        # unchanged
+        item("Input1_3", filters=[color_filter()]),
+        # not wanted any more
+        item("Input1_4")
+    ]))
+    plan = ObsReconciler(obs).apply(data)
+
+    assert live_filters(fake_obs, "Input1_1") == {
+        "Filter1": ("sharpness_filter_v2", {"sharpness": 0.5}),
+        "Filter2": ("color_filter_v2", {"opacity": 1.0, "gamma": 0.0})
+    }
+    assert live_filters(fake_obs, "Input1_2")["Filter1"][1] == {"opacity": 0.5, "gamma": 0.0}
+    assert live_filters(fake_obs, "Input1_4") == {}
+    touched = {(c["requestType"], c["requestData"]["sourceName"]) for c in plan["changes"] if c["target"] == "filter"}
+    assert touched == {
+        ("RemoveSourceFilter", "Input1_1"), ("CreateSourceFilter", "Input1_1"),
+        ("SetSourceFilterSettings", "Input1_2"), ("RemoveSourceFilter", "Input1_4")
+    }
+
+def test_dry_run_leaves_obs_untouched(fake_obs, obs):
+    before = {name: live_items(fake_obs, name) for name in fake_obs.state.scenes}
+    data = scenario(("Scene1", [item("Input1_4"), item("Input1_1")]), ("New", [item("Input2_2")]))
+
+    plan = ObsReconciler(obs).apply(data, dry_run=True)
+    assert plan["summary"]["create"] > 0
+    assert {name: live_items(fake_obs, name) for name in fake_obs.state.scenes} == before
+
+def test_failed_apply_still_removes_the_temporary_scene(fake_obs, obs):
+    data = scenario(("Scene1", [item("Input1_1"), item("NoSuchSource")]), inputs=[
+        {"inputName": "Brand new", "inputKind": "color_source_v3", "inputSettings": {}}
+    ])
+    with pytest.raises(RuntimeError):
+        ObsReconciler(obs).apply(data)
+    assert not any(name.startswith("TempImportScene") for name in fake_obs.state.scenes)
@@ -0,0 +1,98 @@
+import csv
+import io
+import json
+from types import SimpleNamespace
+
+from libs import student_bulk
+from libs.student_bulk import import_students, BULK_COLUMNS
+
+class StagingCursor:
+    # the part of a psycopg2 cursor import_students uses: COPY lands in a list and
+    # the upsert answers like PostgreSQL would for the emails already in the table
+    def __init__(self, existing):
+        self.existing = existing
+        self.staged = []
+        self.rows = []
+
+    def execute(self, sql):
+        if "INSERT INTO students" in sql:
+            latest = {}
+            for row in sorted(self.staged, key=lambda r: int(r[0])):
+                latest[row[1 + BULK_COLUMNS.index("email")]] = row
+            self.rows = [(email not in self.existing,) for email in latest]
+
+    def copy_expert(self, sql, buffer):
+        self.staged.extend(csv.reader(io.StringIO(buffer.read())))
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def close(self):
+        pass
+
+class StagingSession:
+    def __init__(self, existing=()):
+        self.staging = StagingCursor(set(existing))
+        self.committed = False
+
+    def connection(self):
+        # session.connection().connection is the raw DB-API connection
+        return SimpleNamespace(connection=SimpleNamespace(cursor=lambda: self.staging))
+
+    def commit(self):
+        self.committed = True
+
+def csv_body(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=["first_name", "last_name", "email", "chapter"])
+    writer.writeheader()
+    writer.writerows(rows)
+    return io.BytesIO(buffer.getvalue().encode("utf-8"))
+
+def student(n, **extra):
+    return {"first_name": f"Имя{n}", "last_name": f"Фамилия{n}", "email": f"s{n}@example.com", **extra}
+
+def test_csv_report_counts_and_line_numbers():
+    db = StagingSession(existing={"s1@example.com"})
+    body = csv_body([
+        student(1),
+        student(2),
+        student(3, email="not-an-email"),
+        student(4, chapter="-1"),
+        student(2, first_name="Повтор")
+    ])
+
+    report = import_students(db, body, "csv")
+
+    assert (report["inserted"], report["updated"], report["duplicates"], report["rejected"]) == (1, 1, 1, 2)
+    # the header is line 1
+    assert [e["line"] for e in report["errors"]] == [4, 5]
+    assert report["errors"][0]["errors"][0]["loc"] == ["email"]
+    assert report["errors"][1]["errors"][0]["loc"] == ["chapter"]
+    assert not report["errors_truncated"]
+    assert db.committed
+
+def test_ndjson_reports_broken_lines():
+    lines = [json.dumps(student(1)), "{broken", "", "[1, 2]", json.dumps(student(2))]
+    report = import_students(StagingSession(), io.BytesIO("\n".join(lines).encode("utf-8")), "ndjson")
+
+    assert report["inserted"] == 2
+    assert [e["line"] for e in report["errors"]] == [2, 4]
+    assert report["errors"][0]["errors"][0]["msg"].startswith("invalid JSON")
+
+def test_error_list_is_truncated(monkeypatch):
+    monkeypatch.setattr(student_bulk, "MAX_REPORTED_ERRORS", 2)
+    body = csv_body([student(n, email="bad") for n in range(5)])
+    report = import_students(StagingSession(), body, "csv")
+
+    assert report["rejected"] == 5
+    assert len(report["errors"]) == 2
+    assert report["errors_truncated"]
+
+def test_rows_are_copied_in_chunks(monkeypatch):
+    monkeypatch.setattr(student_bulk, "CHUNK_ROWS", 2)
+    db = StagingSession()
+    report = import_students(db, csv_body([student(n) for n in range(5)]), "csv")
+
+    assert report["inserted"] == 5
+    assert [int(row[0]) for row in db.staging.staged] == [2, 3, 4, 5, 6]
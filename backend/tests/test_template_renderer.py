@@ -0,0 +1,81 @@
+import json
+
+from libs.config_store import ConfigStore
+from libs.template_renderer import TemplateRenderer
+
+TEMPLATE = {
+    "profile": {"settings": {"video": {"output_width": 1280}}},
+    "inputs": [{"inputName": "Camera", "inputSettings": {"width": "${boundsWidth}", "label": "cam ${name}"}}],
+    "scenes": [{"name": "Main", "items": [{"transform": {"boundsWidth": "${camera_settings.1.boundsWidth}"}}]}],
+    "untouched": "${unknown}"
+}
+
+def write(path, document):
+    path.write_text(json.dumps(document), encoding="utf-8")
+    return str(path)
+
+def make(tmp_path, document=TEMPLATE):
+    store = ConfigStore()
+    renderer = TemplateRenderer(store, max_rendered=2)
+    return store, renderer, write(tmp_path / "scenario_template.json", document)
+
+def test_placeholders_keep_type_and_unknown_ones_stay(tmp_path):
+    _, renderer, path = make(tmp_path)
+    document = renderer.render(renderer.compile(path), {
+        "boundsWidth": 320, "name": "A", "camera_settings": [{}, {"boundsWidth": 640}]
+    })
+
+    assert document["inputs"][0]["inputSettings"] == {"width": 320, "label": "cam A"}
+    assert document["scenes"][0]["items"][0]["transform"]["boundsWidth"] == 640
+    assert document["untouched"] == "${unknown}"
+
+def test_only_used_variables_key_the_cache(tmp_path):
+    _, renderer, path = make(tmp_path)
+    compiled = renderer.compile(path)
+    variables = {"boundsWidth": 320, "name": "A", "camera_settings": [{}, {"boundsWidth": 640}]}
+
+    renderer.render(compiled, variables)
+    renderer.render(compiled, {**variables, "output_width": 1920})
+    assert (renderer.hits, renderer.misses) == (1, 1)
+
+    renderer.render(compiled, {**variables, "camera_settings": [{}, {"boundsWidth": 800}]})
+    assert renderer.misses == 2
+
+def test_cached_document_is_not_shared_with_callers(tmp_path):
+    _, renderer, path = make(tmp_path)
+    compiled = renderer.compile(path)
+    variables = {"boundsWidth": 320, "name": "A"}
+
+    first = renderer.render(compiled, variables)
+    first["inputs"].append({"inputName": "DefaultCamera"})
+    assert len(renderer.render(compiled, variables)["inputs"]) == 1
+
+def test_edited_template_is_recompiled(tmp_path):
+    store, renderer, path = make(tmp_path)
+    compiled = renderer.compile(path)
+    assert renderer.compile(path) is compiled
+
+    edited = dict(TEMPLATE, untouched="${name}!")
+    write(tmp_path / "scenario_template.json", edited)
+    recompiled = renderer.compile(path)
+    assert recompiled is not compiled and recompiled.digest != compiled.digest
+    assert renderer.render(recompiled, {"name": "B"})["untouched"] == "B!"
+
+    # the same edit through the store (a debounced write) is seen before it reaches the disk
+    store.write(path, dict(TEMPLATE, untouched="pending"), delay=60)
+    assert renderer.render(renderer.compile(path), {})["untouched"] == "pending"
+    store.invalidate(path)
+
+def test_render_cache_is_bounded_and_drops_unused_templates(tmp_path):
+    _, renderer, path = make(tmp_path)
+    old = renderer.compile(path)
+    renderer.render(old, {"name": "A"})
+
+    write(tmp_path / "scenario_template.json", dict(TEMPLATE, untouched="v2"))
+    new = renderer.compile(path)
+    renderer.render(new, {"name": "A"})
+    renderer.render(new, {"name": "B"})
+
+    status = renderer.status()
+    assert status["rendered"] == 2
+    assert status["templates"] == 1
@@ -18,6 +18,61 @@ function handleResponse(promise) {
     })
 }
 
+// polls the job once its event stream is gone (evicted job, dropped connection)
+function pollJob(jobId, onProgress, resolve, reject) {
+  const poll = () => {
+    handleResponse(axios.get(`/api/jobs/${jobId}`))
+      .then((job) => {
+        if (job.state === 'done') {
+          resolve(job.result)
+        } else if (job.state === 'failed' || job.state === 'cancelled') {
+          reject(new Error(job.error || 'Задача не выполнена'))
+        } else {
+          if (onProgress && job.progress) onProgress(job.progress)
+          setTimeout(poll, 1000)
+        }
+      })
+      .catch(reject)
+  }
+  poll()
+}
+
+// follows a backend job over SSE and resolves with its result
+function waitForJob(jobId, onProgress = null) {
+  return new Promise((resolve, reject) => {
+    const source = new EventSource(`/api/jobs/${jobId}/events`)
+    let settled = false
+    const finish = (event, ok) => {
+      settled = true
+      source.close()
+      const job = JSON.parse(event.data)
+      if (ok) {
+        resolve(job.result)
+      } else {
+        reject(new Error(job.error || 'Задача не выполнена'))
+      }
+    }
+    source.addEventListener('progress', (event) => {
+      if (onProgress) onProgress(JSON.parse(event.data))
+    })
+    source.addEventListener('done', (event) => finish(event, true))
+    source.addEventListener('failed', (event) => finish(event, false))
+    source.addEventListener('cancelled', (event) => finish(event, false))
+    // a 404 or a dropped stream: stop the browser's reconnects and ask the job directly,
+    // which also rejects if the job no longer exists
+    source.addEventListener('error', () => {
+      if (settled) return
+      settled = true
+      source.close()
+      pollJob(jobId, onProgress, resolve, reject)
+    })
+  })
+}
+
+function submitJob(url, cfg, onProgress) {
+  return handleResponse(axios.post(url, cfg)).then((data) => waitForJob(data.job_id, onProgress))
+}
+
 export const api = {
   getConfig: (scenarioName = null) => {
     const url = scenarioName
@@ -28,18 +83,31 @@ export const api = {
   updateConfig: (cfg) => {
     return handleResponse(axios.put('/api/config', cfg))
   },
-  restoreBackup: (scenarioName) => {
-    return handleResponse(axios.post(`/api/backup/restore/${scenarioName}`))
+  listBackups: (scenarioName) => {
+    return handleResponse(axios.get(`/api/backup/${scenarioName}`))
   },
-  listDevices: () => handleResponse(axios.get('/api/devices')),
-  exportTo: (cfg) => {
-    return handleResponse(axios.post('/api/export', cfg))
+  restoreBackup: (scenarioName, name = null) => {
+    return handleResponse(axios.post(`/api/backup/restore/${scenarioName}`, name ? { name } : {}))
   },
-  importFrom: (cfg) => {
-    return handleResponse(axios.post('/api/import', cfg))
+  listDevices: (refresh = false) => {
+    const url = refresh ? '/api/devices?refresh=1' : '/api/devices'
+    return handleResponse(axios.get(url))
   },
+  exportTo: (cfg, onProgress = null) => submitJob('/api/export', cfg, onProgress),
+  importFrom: (cfg, onProgress = null) => submitJob('/api/import', cfg, onProgress),
+  switchScenario: (cfg, onProgress = null) => submitJob('/api/switch', cfg, onProgress),
+  listCollections: () => handleResponse(axios.get('/api/collections')),
+  getFleet: () => handleResponse(axios.get('/api/fleet')),
+  exportToFleet: (cfg, onProgress = null) => submitJob('/api/fleet/export', cfg, onProgress),
+  getJob: (jobId) => handleResponse(axios.get(`/api/jobs/${jobId}`)),
+  cancelJob: (jobId) => handleResponse(axios.post(`/api/jobs/${jobId}/cancel`)),
 
-  listStudents: () => handleResponse(axios.get('/api/students')),
+  listStudents: (params = {}) => handleResponse(axios.get('/api/students', { params })),
+  importStudents: (file, format = 'csv') =>
+    handleResponse(axios.post(`/api/students/bulk?format=${format}`, file, {
+      headers: { 'Content-Type': format === 'csv' ? 'text/csv' : 'application/x-ndjson' }
+    })),
+  exportStudentsUrl: (format = 'csv') => `/api/students/export?format=${format}`,
   getStudent: (id) => handleResponse(axios.get(`/api/students/${id}`)),
   createStudent: (student) => handleResponse(axios.post('/api/students', student)),
   updateStudent: (id, student) => handleResponse(axios.put(`/api/students/${id}`, student)),
@@ -51,5 +119,8 @@ export const api = {
   updateScenario: (id, scenario) => handleResponse(axios.put(`/api/scenarios/${id}`, scenario)),
   deleteScenario: (id) => handleResponse(axios.delete(`/api/scenarios/${id}`)),
   assignScenario: (studentId, scenarioId) =>
-    handleResponse(axios.post(`/api/students/${studentId}/scenarios/${scenarioId}`))
+    handleResponse(axios.post(`/api/students/${studentId}/scenarios/${scenarioId}`)),
+  assignScenarioBulk: (scenarioId, studentIds) =>
+    handleResponse(axios.post(`/api/scenarios/${scenarioId}/students`, { student_ids: studentIds })),
+  listScenarioStudents: (scenarioId) => handleResponse(axios.get(`/api/scenarios/${scenarioId}/students`))
 }